@@ -1,22 +1,42 @@
 """主应用程序 - UI和主逻辑"""
 import os
 import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext, messagebox
+from tkinter import ttk, filedialog, scrolledtext, messagebox, simpledialog
 import threading
+import time
+import logging
 from queue import Queue, Empty
 import subprocess
+import multiprocessing
 
+from archive_searcher import split_archive_path
 from cache_manager import CacheManager
-from config_manager import ConfigManager
+from document_text import is_document
+from config_manager import MIN_LIVE_INTERVAL, ConfigManager, setup_logging
 from file_searcher import FileSearcher
-from utils import parse_keywords, parse_extensions
+from path_store import PathStore, SearchResult
+from preview import PAGE_SIZE, FilePreview
+from result_exporter import ResultExporter
+from result_history import ResultHistory, reverify
+from search_checkpoint import search_request
+from search_server import RemoteSearcher, SearchClient
+from ignore_rules import IgnoreRules
+from live_search import LiveSearchMonitor
+from query import QuerySyntaxError, is_boolean_query, parse_query, positive_terms
+from read_backends import DEFAULT_BACKEND, available_backends
+from utils import parse_keywords, parse_extensions, parse_folders
+
+logger = logging.getLogger(__name__)
+
+# 启动耗时预算（毫秒）：从进程入口到窗口首次空闲，超出时记录警告
+STARTUP_BUDGET_MS = 500
 
 
 class FileFinderApp:
     def __init__(self, root):
         self.root = root
         self.root.title("文件搜索工具")
-        self.root.geometry("1000x750")  # 增加高度以容纳排序按钮
+        self.root.geometry("1000x900")  # 增加高度以容纳排序按钮和预览区
         
         # 初始化管理器
         config_file = os.path.join(os.path.expanduser("~"), ".file_finder_config.json")
@@ -24,10 +44,30 @@ class FileFinderApp:
         
         self.config_manager = ConfigManager(config_file)
         self.cache_manager = CacheManager(cache_dir)
-        self.searcher = FileSearcher()
+        self.result_history = ResultHistory(cache_dir)
+        # 本地搜索服务在运行时作为它的客户端，共享服务端的热缓存和线程池
+        client = SearchClient.connect_if_running()
+        self.remote = client is not None
+        self.searcher = RemoteSearcher(client) if self.remote else FileSearcher()
+        if self.remote:
+            logger.info(f"已连接本地搜索服务: {client.address}")
         
-        # 当前搜索结果（用于排序）
+        # 当前搜索结果（SearchResult 列表，与搜索器返回的是同一份，用于排序）
         self.current_results = []
+        # 当前搜索是否被用户停止（停止的搜索不保存到结果历史）
+        self.search_stopped = False
+        
+        # 结果预览：当前预览的文件、已显示内容的结束偏移，以及用于高亮的最近一次搜索的关键字
+        self.preview = None
+        self.preview_end = 0
+        self.preview_keywords = []
+        self.preview_max_errors = 0
+        # 每次切换预览的文件加一，丢弃过时的后台读取结果
+        self.preview_generation = 0
+        self.preview_lock = threading.Lock()
+        
+        # 实时搜索监视器（有保存的实时搜索时才创建）
+        self.live_monitor = None
         
         # 排除关键字框的显示状态
         self.exclude_frame = None
@@ -49,6 +89,49 @@ class FileFinderApp:
         # 启动UI队列处理
         self.root.after(50, self.process_ui_queue)
 
+    def on_window_ready(self, start_time=None):
+        """窗口显示后执行：记录启动耗时，并在后台预热上次文件夹的文件列表缓存"""
+        if start_time is not None:
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            if elapsed_ms > STARTUP_BUDGET_MS:
+                logger.warning(f"启动耗时 {elapsed_ms:.0f}ms，超出预算 {STARTUP_BUDGET_MS}ms")
+            else:
+                logger.info(f"启动耗时 {elapsed_ms:.0f}ms")
+        
+        # 连接搜索服务时由服务端维护缓存，无需本地预热
+        folders = parse_folders(self.config_manager.get_last_search_state().get("folder_path", ""))
+        if folders and not self.remote:
+            warm_thread = threading.Thread(target=self._warm_up_folders,
+                                           args=(folders, self._build_ignore_rules()))
+            warm_thread.daemon = True
+            warm_thread.start()
+        
+        if self.config_manager.get_saved_searches():
+            self._ensure_live_monitor()
+    
+    def _build_ignore_rules(self, save=False):
+        """根据高级选项中的设置构建遍历剪枝规则"""
+        dir_blacklist = self.dir_blacklist_var.get().split()
+        path_excludes = self.path_excludes_var.get().strip()
+        use_ignore_files = self.use_ignore_files_var.get()
+        if save:
+            self.config_manager.save_ignore_settings(dir_blacklist, path_excludes, use_ignore_files)
+        return IgnoreRules(path_excludes.split(), dir_blacklist, use_ignore_files)
+    
+    def _warm_up_folders(self, folders, rules):
+        """后台校验/重建文件列表缓存，使第一次搜索直接命中缓存"""
+        for folder in folders:
+            try:
+                start = time.perf_counter()
+                files = self.cache_manager.prefetch_file_cache(
+                    folder, lambda f: self.searcher.get_all_files(
+                        f, rules, os.path.join(self.cache_manager.cache_dir, "index_build")), rules)
+                if files is not None:
+                    logger.info(f"已预热文件列表缓存: {folder}，共 {len(files)} 个文件，"
+                                f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+            except Exception as e:
+                logger.error(f"预热文件列表缓存失败: {e}")
+    
     def run_on_ui_thread(self, func, *args, **kwargs):
         """将UI更新任务投递到主线程"""
         self.ui_queue.put((func, args, kwargs))
@@ -178,6 +261,76 @@ class FileFinderApp:
             text='忽略注释（每行“$”后内容）',
             variable=self.ignore_comments_var
         ).grid(row=1, column=0, columnspan=3, sticky=tk.W, pady=2)
+
+        self.search_archives_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.exclude_frame,
+            text='搜索压缩包内容（.zip .gz .tar .bz2 .xz，流式解压不落盘）',
+            variable=self.search_archives_var
+        ).grid(row=2, column=0, columnspan=3, sticky=tk.W, pady=2)
+
+        self.locality_order_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.exclude_frame,
+            text='机械硬盘/网络盘优化（按磁盘位置顺序读取，限制每个磁盘的并发读取）',
+            variable=self.locality_order_var
+        ).grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=2)
+
+        self.dedupe_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.exclude_frame,
+            text='内容相同的文件只搜索一次（适合含大量副本的目录）',
+            variable=self.dedupe_var
+        ).grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=2)
+
+        ttk.Label(self.exclude_frame, text="排除路径:").grid(row=6, column=0, sticky=tk.W, pady=5)
+        self.path_excludes_var = tk.StringVar()
+        ttk.Entry(self.exclude_frame, textvariable=self.path_excludes_var, width=58).grid(
+            row=6, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        ttk.Label(self.exclude_frame, text='(gitignore 语法，空格分隔如: build/ *.min.js)').grid(row=6, column=2, sticky=tk.W, pady=5)
+
+        ttk.Label(self.exclude_frame, text="目录黑名单:").grid(row=7, column=0, sticky=tk.W, pady=5)
+        self.dir_blacklist_var = tk.StringVar()
+        ttk.Entry(self.exclude_frame, textvariable=self.dir_blacklist_var, width=58).grid(
+            row=7, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        ttk.Label(self.exclude_frame, text='(目录名，空格分隔，不进入这些目录)').grid(row=7, column=2, sticky=tk.W, pady=5)
+
+        self.use_ignore_files_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            self.exclude_frame,
+            text='遵守 .gitignore / .ignore 文件（被忽略的目录不扫描、不缓存）',
+            variable=self.use_ignore_files_var
+        ).grid(row=8, column=0, columnspan=3, sticky=tk.W, pady=2)
+
+        ttk.Label(self.exclude_frame, text="导出到:").grid(row=9, column=0, sticky=tk.W, pady=5)
+        self.export_path_var = tk.StringVar()
+        ttk.Entry(self.exclude_frame, textvariable=self.export_path_var, width=58).grid(
+            row=9, column=1, sticky=(tk.W, tk.E), padx=5, pady=5)
+        ttk.Button(self.exclude_frame, text="选择...", command=self.browse_export_file).grid(row=9, column=2, sticky=tk.W, padx=5, pady=5)
+
+        export_options = ttk.Frame(self.exclude_frame)
+        export_options.grid(row=10, column=0, columnspan=3, sticky=tk.W, pady=2)
+        self.export_size_var = tk.BooleanVar(value=False)
+        self.export_mtime_var = tk.BooleanVar(value=False)
+        self.export_offset_var = tk.BooleanVar(value=False)
+        self.export_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_options, text='字节大小', variable=self.export_size_var).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(export_options, text='修改时间', variable=self.export_mtime_var).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(export_options, text='命中偏移', variable=self.export_offset_var).pack(side=tk.LEFT, padx=2)
+        ttk.Checkbutton(export_options, text='仅导出（不在列表中显示）', variable=self.export_only_var).pack(side=tk.LEFT, padx=10)
+
+        ttk.Label(self.exclude_frame, text="模糊匹配:").grid(row=11, column=0, sticky=tk.W, pady=5)
+        self.max_errors_var = tk.IntVar(value=0)
+        ttk.Spinbox(self.exclude_frame, from_=0, to=3, textvariable=self.max_errors_var, width=5,
+                    state='readonly').grid(row=11, column=1, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(self.exclude_frame, text='(每个关键字允许的错误字符数，0 为精确匹配)').grid(row=11, column=2, sticky=tk.W, pady=5)
+
+        ttk.Label(self.exclude_frame, text="读取方式:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.read_backend_var = tk.StringVar(value=DEFAULT_BACKEND)
+        ttk.Combobox(
+            self.exclude_frame, textvariable=self.read_backend_var,
+            values=available_backends(), state='readonly', width=12
+        ).grid(row=4, column=1, sticky=tk.W, padx=5, pady=5)
         
         # 搜索按钮
         button_frame = ttk.Frame(main_frame)
@@ -187,9 +340,12 @@ class FileFinderApp:
         self.search_button.pack(side=tk.LEFT, padx=5)
         self.stop_button = ttk.Button(button_frame, text="停止搜索 (Esc)", command=self.stop_search, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="继续上次搜索", command=self.resume_search).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="清空结果", command=self.clear_results).pack(side=tk.LEFT, padx=5)
         self.toggle_exclude_btn = ttk.Button(button_frame, text="高级选项 ▼", command=self.toggle_exclude_frame)
         self.toggle_exclude_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="实时搜索...", command=self.show_live_searches).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="历史结果...", command=self.show_result_history).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="帮助", command=self.show_help).pack(side=tk.LEFT, padx=5)
         
         # 进度显示框
@@ -233,6 +389,19 @@ class FileFinderApp:
         # 绑定双击和右键
         self.result_tree.bind('<Double-Button-1>', self.on_double_click)
         self.result_tree.bind('<Button-3>', self.show_tree_context_menu)
+        self.result_tree.bind('<<TreeviewSelect>>', self.on_result_select)
+        
+        # 预览区：选中结果后只读取命中位置附近的内容，大文件也无需打开外部编辑器
+        preview_bar = ttk.Frame(result_frame)
+        preview_bar.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.preview_label = ttk.Label(preview_bar, text="选中结果后在此预览匹配位置附近的内容")
+        self.preview_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(preview_bar, text="向下翻页", command=self.preview_next_page).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(preview_bar, text="下一处匹配", command=self.preview_next_hit).pack(side=tk.RIGHT, padx=5)
+        self.preview_text = scrolledtext.ScrolledText(result_frame, height=8, wrap=tk.NONE, state=tk.DISABLED)
+        self.preview_text.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.preview_text.tag_configure('hit', background='yellow')
+        self.preview_text.tag_configure('separator', foreground='gray')
         
         # 排序按钮
         sort_frame = ttk.Frame(main_frame)
@@ -251,42 +420,76 @@ class FileFinderApp:
         self.instruction_frame = instruction_frame
         instruction_frame.grid(row=8, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=8)
         instruction_text = (
-            "1. 选择文件夹并输入关键字（空格分隔，需全部匹配）。\n"
+            "1. 选择文件夹并输入关键字（空格分隔，需全部匹配）；多个文件夹用分号 ; 分隔，同时搜索。\n"
             "2. 后缀名过滤可选，多个后缀用空格分隔（如：.py .txt .log）。\n"
-            "3. 双击结果打开文件，右键可打开文件夹或复制路径。\n"
+            "3. 单击结果在下方预览匹配位置，双击打开文件，右键可打开文件夹或复制路径。\n"
             "4. 快捷键：Enter 开始搜索，Esc 停止搜索。"
         )
         ttk.Label(instruction_frame, text=instruction_text, justify=tk.LEFT, wraplength=920).grid(row=0, column=0, sticky=tk.W)
     
+    def browse_export_file(self):
+        """选择导出文件"""
+        path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if path:
+            self.export_path_var.set(path)
+    
+    def _create_exporter(self):
+        """根据高级选项创建结果导出器，未设置导出路径时返回 None"""
+        export_path = self.export_path_var.get().strip()
+        if not export_path:
+            return None
+        columns = []
+        if self.export_size_var.get():
+            columns.append('size')
+        if self.export_mtime_var.get():
+            columns.append('mtime')
+        if self.export_offset_var.get():
+            columns.append('hit_offset')
+        return ResultExporter(export_path, columns)
+    
     def browse_folder(self):
         """浏览文件夹"""
         folder = filedialog.askdirectory()
         if folder:
             self.folder_var.set(folder)
     
-    def start_search(self):
-        """开始搜索"""
+    def start_search(self, resume=False):
+        """开始搜索（resume 为 True 时从检查点继续，只搜索上次未完成的文件）"""
         folder = self.folder_var.get().strip()
         keywords_text = self.keywords_var.get().strip()
         
-        # 验证输入
-        if not folder:
+        # 验证输入（多个文件夹用分号分隔）
+        folders = parse_folders(folder)
+        if not folders:
             messagebox.showwarning("警告", "请选择文件夹路径")
             return
         
-        if not os.path.isdir(folder):
-            messagebox.showerror("错误", "指定的文件夹不存在")
+        missing = [f for f in folders if not os.path.isdir(f)]
+        if missing:
+            messagebox.showerror("错误", f"指定的文件夹不存在: {missing[0]}")
             return
         
         if not keywords_text:
             messagebox.showwarning("警告", "请输入至少一个关键字")
             return
         
-        # 解析关键字（支持引号）
-        keywords = parse_keywords(keywords_text)
-        if not keywords:
-            messagebox.showwarning("警告", "请输入有效的关键字")
-            return
+        # 使用了 AND/OR/NOT 或路径条件时按查询语法解析，否则按空格分隔关键字（支持引号）
+        query = None
+        if is_boolean_query(keywords_text):
+            try:
+                keywords = positive_terms(parse_query(keywords_text))
+            except QuerySyntaxError as e:
+                messagebox.showwarning("警告", f"查询语法错误: {str(e)}")
+                return
+            query = keywords_text
+        else:
+            keywords = parse_keywords(keywords_text)
+            if not keywords:
+                messagebox.showwarning("警告", "请输入有效的关键字")
+                return
         
         # 添加到搜索历史
         self.config_manager.add_search_history(keywords_text)
@@ -317,6 +520,7 @@ class FileFinderApp:
         self.progress_bar['value'] = 0
         
         # 禁用搜索按钮，启用停止按钮
+        self.search_stopped = False
         self.search_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
 
@@ -324,30 +528,67 @@ class FileFinderApp:
         def safe_update_progress(message, current=0, total=0):
             self.run_on_ui_thread(self.update_progress, message, current, total)
 
-        def safe_display_result(filepath, size_kb):
-            self.run_on_ui_thread(self.display_result, filepath, size_kb)
+        def safe_display_result(result):
+            self.run_on_ui_thread(self.display_result, result)
 
         def safe_update_stats(count):
             self.run_on_ui_thread(self.update_stats, count)
         
         ignore_comments = self.ignore_comments_var.get()
+        search_archives = self.search_archives_var.get()
+        locality_order = self.locality_order_var.get()
+        read_backend = self.read_backend_var.get()
+        dedupe = self.dedupe_var.get()
+        max_errors = self.max_errors_var.get()
+        ignore_rules = self._build_ignore_rules(save=True)
+        self.preview_keywords, self.preview_max_errors = keywords, max_errors
+        try:
+            exporter = self._create_exporter()
+        except OSError as e:
+            messagebox.showerror("错误", f"无法创建导出文件: {str(e)}")
+            self.search_button.config(state=tk.NORMAL)
+            self.stop_button.config(state=tk.DISABLED)
+            return
+        export_only = exporter is not None and self.export_only_var.get()
 
         # 在新线程中执行搜索
         def search_thread_func():
             try:
                 results = self.searcher.search_files_parallel(
-                    folder, keywords, extensions, exclude_keywords,
+                    folders if len(folders) > 1 else folders[0], keywords, extensions, exclude_keywords,
                     ignore_comments,
                     self.cache_manager,
                     safe_update_progress,
                     safe_display_result,
-                    safe_update_stats
+                    safe_update_stats,
+                    search_archives=search_archives,
+                    locality_order=locality_order,
+                    read_backend=read_backend,
+                    dedupe=dedupe,
+                    ignore_rules=ignore_rules,
+                    exporter=exporter,
+                    export_only=export_only,
+                    max_errors=max_errors,
+                    query=query,
+                    resume=resume
                 )
                 # 保存当前结果供排序使用
                 self.current_results = results
+                # 完成的搜索保存到结果历史，之后可以立即重新打开
+                if not export_only and not self.search_stopped:
+                    folder_path = folders if len(folders) > 1 else folders[0]
+                    last_generation = getattr(self.searcher, "last_generation", None)
+                    generation = last_generation[1] if last_generation and last_generation[0] == folder_path else None
+                    self.result_history.save(
+                        search_request(folder_path, keywords, extensions, exclude_keywords, ignore_comments,
+                                       search_archives, dedupe, max_errors, query, ignore_rules),
+                        keywords_text, generation, results)
             except Exception as e:
                 self.run_on_ui_thread(messagebox.showerror, "错误", f"搜索过程中出错: {str(e)}")
             finally:
+                if exporter is not None:
+                    exporter.close()
+                    safe_update_progress(f"已导出 {exporter.count} 条结果到 {exporter.export_path}")
                 # 重新启用搜索按钮
                 self.run_on_ui_thread(self.search_button.config, state=tk.NORMAL)
                 self.run_on_ui_thread(self.stop_button.config, state=tk.DISABLED)
@@ -356,8 +597,34 @@ class FileFinderApp:
         search_thread.daemon = True
         search_thread.start()
     
+    def resume_search(self):
+        """继续最近一次被停止（或因关闭程序、崩溃而中断）的搜索：恢复搜索条件后只搜索剩余文件"""
+        checkpoint = self.cache_manager.load_search_checkpoint()
+        if not checkpoint:
+            messagebox.showinfo("提示", "没有可继续的搜索")
+            return
+        
+        self._restore_request_fields(checkpoint["request"])
+        self.start_search(resume=True)
+    
+    def _restore_request_fields(self, request):
+        """把保存的搜索条件（search_request 的结果）填回输入框和选项"""
+        def join_keywords(keywords):
+            return " ".join(f'"{kw}"' if " " in kw else kw for kw in keywords)
+        
+        folder_path = request["folder_path"]
+        self.folder_var.set(folder_path if isinstance(folder_path, str) else "; ".join(folder_path))
+        self.keywords_var.set(request["query"] or join_keywords(request["keywords"]))
+        self.extensions_var.set(" ".join(request["extensions"] or []))
+        self.exclude_var.set(join_keywords(request["exclude_keywords"]))
+        self.ignore_comments_var.set(request["ignore_comments"])
+        self.search_archives_var.set(request["search_archives"])
+        self.dedupe_var.set(request["dedupe"])
+        self.max_errors_var.set(request["max_errors"])
+    
     def stop_search(self):
         """停止搜索"""
+        self.search_stopped = True
         self.searcher.stop_search()
         self.update_progress("正在停止搜索...")
         self.search_button.config(state=tk.NORMAL)
@@ -370,6 +637,10 @@ class FileFinderApp:
         self.stats_label.config(text="找到 0 个文件")
         self.current_results = []
         self.progress_bar['value'] = 0
+        self.preview = None
+        self.preview_generation += 1
+        self._clear_preview()
+        self.preview_label.config(text="选中结果后在此预览匹配位置附近的内容")
     
     def sort_by_size_asc(self):
         """按文件大小升序"""
@@ -377,7 +648,8 @@ class FileFinderApp:
             messagebox.showinfo("提示", "没有搜索结果可排序")
             return
         
-        sorted_results = sorted(self.current_results, key=lambda x: x[1])
+        # 大小未知的结果（.bz2 压缩包成员）排在最小的一端
+        sorted_results = sorted(self.current_results, key=lambda r: -1 if r.size_kb is None else r.size_kb)
         self._display_sorted_results(sorted_results, "升序")
     
     def sort_by_size_desc(self):
@@ -386,7 +658,8 @@ class FileFinderApp:
             messagebox.showinfo("提示", "没有搜索结果可排序")
             return
         
-        sorted_results = sorted(self.current_results, key=lambda x: x[1], reverse=True)
+        sorted_results = sorted(self.current_results, key=lambda r: -1 if r.size_kb is None else r.size_kb,
+                                reverse=True)
         self._display_sorted_results(sorted_results, "降序")
     
     def _display_sorted_results(self, sorted_results, sort_type):
@@ -396,16 +669,17 @@ class FileFinderApp:
             self.result_tree.delete(item)
         
         # 重新添加排序后的结果
-        for filepath, size_kb in sorted_results:
-            filename = os.path.basename(filepath)
-            self.result_tree.insert('', tk.END, values=(filename, filepath, f"{size_kb:.2f}"))
+        for result in sorted_results:
+            self.display_result(result)
         
         self.update_progress(f"已按大小{sort_type}排列，共 {len(sorted_results)} 个文件", 0, 0)
     
-    def display_result(self, filepath, size_kb):
-        """在结果表格中显示找到的文件"""
+    def display_result(self, result):
+        """在结果表格中显示找到的文件（result 为 SearchResult，路径按需解析）"""
+        filepath = result.path
         filename = os.path.basename(filepath)
-        self.result_tree.insert('', tk.END, values=(filename, filepath, f"{size_kb:.2f}"))
+        size_text = "?" if result.size_kb is None else f"{result.size_kb:.2f}"
+        self.result_tree.insert('', tk.END, values=(filename, filepath, size_text))
     
     def on_double_click(self, event):
         """双击打开文件"""
@@ -415,6 +689,132 @@ class FileFinderApp:
             filepath = item['values'][1]  # 路径在第二列
             self.open_file(filepath)
     
+    def on_result_select(self, event):
+        """选中结果时预览第一处匹配附近的内容"""
+        selection = self.result_tree.selection()
+        if not selection:
+            return
+        filepath = str(self.result_tree.item(selection[0])['values'][1])
+        if self.preview is not None and self.preview.filepath == filepath:
+            return
+        self.preview = None
+        self.preview_end = 0
+        self.preview_generation += 1
+        self._clear_preview()
+        if split_archive_path(filepath)[1] is not None:
+            self.preview_label.config(text="压缩包内的文件不支持预览")
+            return
+        self.preview_label.config(text="正在读取...")
+        keywords, max_errors = self.preview_keywords, self.preview_max_errors
+        document_cache = self.cache_manager.document_text_cache
+        
+        def load():
+            # 文档预览搜索时提取出的文本
+            text_path = None
+            if is_document(filepath):
+                st = os.stat(filepath)
+                text_path = document_cache.lookup(filepath, st.st_size, st.st_mtime)
+                if text_path is None:
+                    raise ValueError("文档的文本尚未提取（搜索过该文档后可以预览）")
+            preview = FilePreview(filepath, keywords, max_errors, text_path)
+            # 没有找到匹配（如容错匹配的近似结果）时显示文件开头
+            return preview, preview.next_hit() or preview.window(0, PAGE_SIZE)
+        
+        def show(loaded):
+            self.preview, window = loaded
+            self._append_preview(window)
+        self._run_preview(load, show)
+    
+    def preview_next_hit(self):
+        """在预览区追加下一处匹配附近的内容"""
+        preview = self.preview
+        if preview is None:
+            return
+        
+        def show(window):
+            if window is None:
+                self._update_preview_label("没有更多匹配")
+                return
+            self._append_preview(window)
+        self._run_preview(preview.next_hit, show)
+    
+    def preview_next_page(self):
+        """在预览区追加紧接当前内容之后的一页"""
+        preview = self.preview
+        if preview is None:
+            return
+        
+        def show(window):
+            if window is None:
+                self._update_preview_label("已到文件末尾")
+                return
+            self._append_preview(window, contiguous=True)
+        self._run_preview(lambda: preview.page_after(self.preview_end), show)
+    
+    def _run_preview(self, work, on_done):
+        """在后台线程中读取预览内容，完成后在 UI 线程中显示（期间切换了文件则丢弃）"""
+        generation = self.preview_generation
+        
+        def run():
+            with self.preview_lock:
+                if generation != self.preview_generation:
+                    return
+                try:
+                    result, error = work(), None
+                except Exception as e:
+                    result, error = None, e
+            
+            def done():
+                if generation != self.preview_generation:
+                    return
+                if error is not None:
+                    self.preview_label.config(text=f"无法预览: {str(error)}")
+                else:
+                    on_done(result)
+            self.run_on_ui_thread(done)
+        
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+    
+    def _clear_preview(self):
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete('1.0', tk.END)
+        self.preview_text.config(state=tk.DISABLED)
+    
+    def _append_preview(self, window, contiguous=False):
+        """追加一个预览窗口并高亮关键字；不连续的窗口之间插入分隔行"""
+        text = self.preview_text
+        text.config(state=tk.NORMAL)
+        if not contiguous:
+            text.insert(tk.END, f"—— 偏移 {window.start} ——\n", 'separator')
+        section_start = text.index('end-1c')
+        text.insert(tk.END, window.text)
+        length = tk.IntVar()
+        for keyword in self.preview.keywords:
+            if not keyword:
+                continue
+            pos = section_start
+            while True:
+                pos = text.search(keyword, pos, stopindex=tk.END, nocase=True, count=length)
+                if not pos or not length.get():
+                    break
+                end = f"{pos}+{length.get()}c"
+                text.tag_add('hit', pos, end)
+                pos = end
+        text.config(state=tk.DISABLED)
+        text.see(section_start if not contiguous else tk.END)
+        self.preview_end = window.end
+        self._update_preview_label()
+    
+    def _update_preview_label(self, note=None):
+        preview = self.preview
+        label = (f"{os.path.basename(preview.filepath)}：已读取 {preview.bytes_read / 1024:.1f} KB，"
+                 f"文件共 {preview.file_size / 1024 / 1024:.1f} MB")
+        if note:
+            label += f"（{note}）"
+        self.preview_label.config(text=label)
+    
     def show_tree_context_menu(self, event):
         """显示表格右键菜单"""
         # 选中点击的行
@@ -424,7 +824,7 @@ class FileFinderApp:
             item = self.result_tree.item(item_id)
             filepath = item['values'][1]  # 路径在第二列
             
-            if os.path.exists(filepath):
+            if os.path.exists(split_archive_path(filepath)[0]):
                 menu = tk.Menu(self.result_tree, tearoff=False)
                 menu.add_command(label="打开文件", command=lambda: self.open_file(filepath))
                 menu.add_command(label="打开所在文件夹", command=lambda: self.open_folder(filepath))
@@ -455,8 +855,9 @@ class FileFinderApp:
             pass
     
     def open_file(self, filepath):
-        """打开文件"""
+        """打开文件（压缩包内的结果打开压缩包本身）"""
         try:
+            filepath = split_archive_path(filepath)[0]
             # 检查文件是否存在
             if not os.path.isfile(filepath):
                 messagebox.showerror("错误", f"文件不存在: {filepath}")
@@ -472,6 +873,7 @@ class FileFinderApp:
     def open_folder(self, filepath):
         """打开文件所在的文件夹"""
         try:
+            filepath = split_archive_path(filepath)[0]
             # 获取文件所在目录
             folder_path = os.path.dirname(filepath)
             
@@ -583,6 +985,207 @@ class FileFinderApp:
             # 更新排除历史
             self.update_exclude_history_ui()
     
+    def _ensure_live_monitor(self):
+        """创建并启动实时搜索监视器"""
+        if self.live_monitor is None:
+            self.live_monitor = LiveSearchMonitor(
+                self.config_manager, self.cache_manager,
+                lambda name, results: self.run_on_ui_thread(self.on_live_matches, name, results),
+                lambda message: self.run_on_ui_thread(self.update_progress, message))
+            self.live_monitor.start()
+        return self.live_monitor
+    
+    def on_live_matches(self, name, results):
+        """实时搜索有新命中：追加到结果列表"""
+        for result in results:
+            self.current_results.append(result)
+            self.display_result(result)
+        self.update_progress(f"实时搜索「{name}」新增 {len(results)} 个匹配（{time.strftime('%H:%M:%S')}）")
+    
+    def save_live_search(self, listbox=None):
+        """把当前的搜索条件保存为实时搜索"""
+        folder = self.folder_var.get().strip()
+        keywords_text = self.keywords_var.get().strip()
+        if not parse_folders(folder) or not keywords_text:
+            messagebox.showwarning("警告", "请先填写文件夹和关键字")
+            return
+        name = simpledialog.askstring("保存实时搜索", "名称:", initialvalue=keywords_text[:30], parent=self.root)
+        if not name:
+            return
+        self.config_manager.save_saved_search(
+            name.strip(), folder, keywords_text, self.extensions_var.get().strip(),
+            self.exclude_var.get().strip(), self.max_errors_var.get())
+        self._ensure_live_monitor().run_soon()
+        if listbox is not None:
+            self._refresh_live_list(listbox)
+    
+    def _refresh_live_list(self, listbox):
+        listbox.delete(0, tk.END)
+        for saved in self.config_manager.get_saved_searches():
+            status = "启用" if saved.get("enabled", True) else "停用"
+            last = saved.get("last_evaluated")
+            last_text = time.strftime('%m-%d %H:%M:%S', time.localtime(last)) if last else "未评估"
+            listbox.insert(tk.END, f"[{status}] {saved['name']}  —  {saved['keywords']}  @ {saved['folder_path']}"
+                                   f"  （上次: {last_text}）")
+    
+    def show_live_searches(self):
+        """实时搜索管理窗口"""
+        window = tk.Toplevel(self.root)
+        window.title("实时搜索")
+        window.geometry("700x320")
+        
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        header = ttk.Frame(frame)
+        header.pack(fill=tk.X)
+        ttk.Label(header, text="实时搜索每隔").pack(side=tk.LEFT)
+        interval_var = tk.IntVar(value=int(self.config_manager.get_live_interval()))
+        
+        def apply_interval(event=None):
+            try:
+                self.config_manager.set_live_interval(interval_var.get())
+            except (tk.TclError, ValueError):
+                return
+            interval_var.set(int(self.config_manager.get_live_interval()))
+            if self.live_monitor is not None:
+                self.live_monitor.run_soon()
+        
+        interval_box = ttk.Spinbox(header, from_=int(MIN_LIVE_INTERVAL), to=3600, increment=5, width=6,
+                                   textvariable=interval_var, command=apply_interval)
+        interval_box.pack(side=tk.LEFT, padx=3)
+        interval_box.bind('<Return>', apply_interval)
+        interval_box.bind('<FocusOut>', apply_interval)
+        ttk.Label(header, text="秒只检查新建或修改过的文件，新的匹配会追加到结果列表。").pack(side=tk.LEFT)
+        
+        listbox = tk.Listbox(frame, height=10)
+        listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+        self._refresh_live_list(listbox)
+        
+        def selected_name():
+            selection = listbox.curselection()
+            if not selection:
+                return None
+            return self.config_manager.get_saved_searches()[selection[0]]["name"]
+        
+        def toggle():
+            name = selected_name()
+            if name is None:
+                return
+            saved = next(s for s in self.config_manager.get_saved_searches() if s["name"] == name)
+            self.config_manager.update_saved_search(name, enabled=not saved.get("enabled", True))
+            self._refresh_live_list(listbox)
+        
+        def delete():
+            name = selected_name()
+            if name is None:
+                return
+            self.config_manager.delete_saved_search(name)
+            self._refresh_live_list(listbox)
+        
+        buttons = ttk.Frame(frame)
+        buttons.pack(anchor=tk.E)
+        ttk.Button(buttons, text="保存当前搜索", command=lambda: self.save_live_search(listbox)).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="启用/停用", command=toggle).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="删除", command=delete).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="立即检查", command=lambda: self._ensure_live_monitor().run_soon()).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="关闭", command=window.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def reopen_history(self, key):
+        """重新打开保存的搜索结果：未变化的文件立即显示，变化过的文件在后台重新验证"""
+        loaded = self.result_history.load(key)
+        if loaded is None:
+            messagebox.showwarning("警告", "该历史结果已不存在")
+            return
+        request, generation, unchanged, changed, removed = loaded
+        self._restore_request_fields(request)
+        self.clear_results()
+        self.preview_keywords, self.preview_max_errors = request["keywords"], request["max_errors"]
+        
+        store = PathStore()
+        for path, size_kb in unchanged:
+            result = SearchResult(store, store.add(path), size_kb)
+            self.current_results.append(result)
+            self.display_result(result)
+        self.update_stats(len(self.current_results))
+        message = f"已打开历史结果：{len(unchanged)} 个未变化"
+        if removed:
+            message += f"，{removed} 个已删除"
+        last_generation = getattr(self.searcher, "last_generation", None)
+        if generation and last_generation and last_generation[0] == request["folder_path"] \
+                and last_generation[1] != generation:
+            message += "；文件列表已变化，重新搜索可找到新的匹配"
+        if not changed:
+            self.update_progress(message)
+            return
+        self.update_progress(f"{message}，正在重新验证 {len(changed)} 个修改过的文件...")
+        
+        def verify():
+            # 使用独立的搜索器，不影响正在进行或随后开始的搜索
+            verifier = FileSearcher(max_workers=2)
+            verifier.document_cache = self.cache_manager.document_text_cache
+            try:
+                hits = reverify(verifier, request, changed)
+            finally:
+                verifier.shutdown()
+            
+            def show():
+                for path, size_kb, hit_offset in hits:
+                    result = SearchResult(store, store.add(path), size_kb, hit_offset)
+                    self.current_results.append(result)
+                    self.display_result(result)
+                self.update_stats(len(self.current_results))
+                self.update_progress(f"{message}，{len(changed)} 个修改过的文件中 {len(hits)} 个仍然匹配")
+            self.run_on_ui_thread(show)
+        
+        thread = threading.Thread(target=verify)
+        thread.daemon = True
+        thread.start()
+    
+    def show_result_history(self):
+        """结果历史窗口：列出保存的搜索，双击或点击“打开”立即重新显示结果"""
+        window = tk.Toplevel(self.root)
+        window.title("历史结果")
+        window.geometry("700x320")
+        
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text="打开时只重新验证修改过的文件，未变化的结果立即显示。").pack(anchor=tk.W)
+        
+        listbox = tk.Listbox(frame, height=10)
+        listbox.pack(fill=tk.BOTH, expand=True, pady=5)
+        entries = []
+        
+        def refresh():
+            entries[:] = self.result_history.entries()
+            listbox.delete(0, tk.END)
+            for entry in entries:
+                saved_at = time.strftime("%m-%d %H:%M", time.localtime(entry["saved_at"]))
+                listbox.insert(tk.END, f"{saved_at}  {entry['label']}  ({entry['count']} 个)  {entry['folder_path']}")
+        
+        def selected_key():
+            selection = listbox.curselection()
+            return entries[selection[0]]["key"] if selection else None
+        
+        def reopen(event=None):
+            key = selected_key()
+            if key is not None:
+                window.destroy()
+                self.reopen_history(key)
+        
+        def delete():
+            key = selected_key()
+            if key is not None:
+                self.result_history.delete(key)
+                refresh()
+        
+        refresh()
+        listbox.bind('<Double-Button-1>', reopen)
+        buttons = ttk.Frame(frame)
+        buttons.pack(anchor=tk.E)
+        ttk.Button(buttons, text="打开", command=reopen).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="删除", command=delete).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="关闭", command=window.destroy).pack(side=tk.LEFT, padx=5)
+    
     def show_help(self):
         """显示帮助窗口"""
         help_window = tk.Toplevel(self.root)
@@ -612,24 +1215,54 @@ class FileFinderApp:
         help_content = """【快速上手】
 
 1. 选择文件夹 → 输入关键字 → 点击“开始搜索”。
+   多个文件夹用分号 ; 分隔，会并发搜索，重复的文件只搜索一次。
 2. 多个关键字用空格分隔，需全部匹配；引号可包住短语。
+   也可以使用查询语法：AND / OR / NOT（大写）和括号，如
+   error AND (timeout OR "connection reset") NOT debug
+   路径条件 ext:py、name:test_*、path:*/src/* 在读取文件前过滤；
+   元数据条件 size:>1mb、size:1k..5m、mtime:<7d（7 天内修改过）
+   使用文件列表中记录的大小和修改时间，同样不读取文件，
+   如 ext:log mtime:<3d timeout 只会读取最近修改的日志。
 3. 后缀名可选：如 .py .txt .log；留空表示全部。
 
 【高级选项】
 
 • 排除关键字：包含任一排除词的文件会被过滤。
 • 忽略注释：勾选后，忽略每行“$”后的内容。
+• 模糊匹配：允许关键字有 1~3 个字符的拼写错误（增、删、改），如 1 时 configuraton 也能匹配 configuration；短关键字自动减少容错数，排除关键字始终精确匹配。
+• 排除路径 / 目录黑名单 / .gitignore：遍历时直接跳过这些目录和文件，不扫描也不缓存。
+• 导出到：搜索时把结果逐条写入 CSV/JSONL 文件，可附加大小、修改时间、命中偏移列；勾选“仅导出”时不在列表中显示，适合结果很多的搜索。
+• 内容去重：先按大小和内容哈希找出相同的文件，只搜索其中一个，结果中仍列出全部副本。
+• 读取方式：buffered 为普通读取；pooled 复用读取缓冲区；fadvise 提示系统顺序预读并丢弃已读页（仅 Linux）。
+• 机械硬盘/网络盘优化：按磁盘位置顺序读取，减少寻道；SSD 上无需勾选。
+  不勾选时小文件、最近修改的文件和以往命中过的文件优先搜索，结果出现得更快。
+• 搜索压缩包内容：勾选后在 .zip/.gz/.tar 等压缩包内搜索，结果显示为“压缩包!/内部路径”。
+• .docx/.xlsx/.pptx/.pdf 文档会提取文字后搜索。第一次搜索需要提取，之后直接使用缓存的文本，
+  文档修改后重新提取；扫描件和加密 PDF 没有可提取的文字。
+
+【实时搜索】
+
+• 点击“实时搜索...”可把当前搜索条件保存为实时搜索（如日志目录中的错误特征）。
+• 保存后先完整搜索一次作为基线，之后每 30 秒只检查新建或修改过的文件，新的匹配追加到结果列表。
 
 【结果操作】
 
 • 右键结果可打开文件/打开所在文件夹/复制路径。
+• 单击结果在下方预览区显示第一处匹配附近的内容并高亮关键字；“下一处匹配”和“向下翻页”
+  按需继续读取。预览只读取匹配位置附近的几 KB，几 GB 的日志也能立即查看。
 • 支持按文件大小升序/降序排序。
 
 【提示】
 
 • 第一次搜索较慢是正常的，会自动缓存文件列表。
 • 搜索不区分大小写。
-• Esc 可停止搜索。
+• FIFO、socket、设备文件会被自动跳过；网络盘上读取卡住超过 15 秒的文件会被跳过，
+  不会让搜索一直无法结束。
+• 完成的搜索结果会自动保存，点击“历史结果...”可立即重新打开，
+  只有修改过的文件会重新验证。
+• Esc 可停止搜索。停止、关闭程序或程序异常退出后，点击“继续上次搜索”
+  会恢复搜索条件并只搜索剩余的文件（文件列表变化时重新开始）。
+• 多个窗口或脚本同时使用时，可先运行 python src/search_server.py serve 启动本地搜索服务，之后打开的窗口会自动连接，共享缓存和线程池。
 """
         
         help_text.insert(tk.END, help_content)
@@ -672,6 +1305,12 @@ class FileFinderApp:
         # 排除关键字不自动恢复上次输入
         self.exclude_var.set("")
         
+        # 遍历剪枝设置
+        dir_blacklist, path_excludes, use_ignore_files = self.config_manager.get_ignore_settings()
+        self.dir_blacklist_var.set(" ".join(dir_blacklist))
+        self.path_excludes_var.set(path_excludes)
+        self.use_ignore_files_var.set(use_ignore_files)
+        
         # 加载搜索历史到下拉框
         self.update_search_history()
         self.update_folder_history_ui()
@@ -728,14 +1367,20 @@ class FileFinderApp:
     def on_closing(self):
         """程序关闭时的处理"""
         self.save_config()
+        if self.live_monitor is not None:
+            self.live_monitor.stop()
         self.searcher.stop_search()
         self.searcher.shutdown()
         self.root.destroy()
 
 
 def main():
+    multiprocessing.freeze_support()  # 打包后的exe中使用进程池需要
+    start_time = time.perf_counter()
+    setup_logging()
     root = tk.Tk()
     app = FileFinderApp(root)
+    root.after_idle(app.on_window_ready, start_time)
     root.mainloop()
 
 
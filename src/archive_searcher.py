@@ -0,0 +1,211 @@
+"""压缩包内容搜索模块（仅使用标准库，流式解压，不落盘）"""
+import os
+import gzip
+import bz2
+import lzma
+import tarfile
+import zipfile
+
+from encoding_utils import UTF16_ENCODINGS, ChunkMatcher, candidate_encodings, detect_encoding
+from query import keyword_plan
+
+
+# 结果路径中压缩包与内部路径的分隔符，如 archive.zip!/inner/path
+ARCHIVE_SEPARATOR = '!/'
+
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+# 单文件压缩格式：后缀 -> 打开函数
+SINGLE_FILE_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+ARCHIVE_EXTENSIONS = TAR_EXTENSIONS + ('.zip',) + tuple(SINGLE_FILE_OPENERS)
+
+# 压缩包内跳过的二进制成员
+_SKIP_MEMBER_EXTENSIONS = {
+    '.exe', '.dll', '.so', '.jpg', '.jpeg', '.png', '.gif', '.mp3', '.mp4', '.avi',
+    '.class', '.pyc', '.zip', '.gz', '.tar', '.7z', '.rar', '.jar',
+}
+
+_CHUNK_SIZE = 131072
+_OVERLAP_SIZE = 1024
+
+
+def is_archive(filepath):
+    """是否为支持搜索的压缩包"""
+    return filepath.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def split_archive_path(filepath):
+    """把 archive.zip!/inner/path 拆分为 (压缩包路径, 内部路径)，普通路径内部路径为 None"""
+    if ARCHIVE_SEPARATOR in filepath:
+        archive_path, inner_path = filepath.split(ARCHIVE_SEPARATOR, 1)
+        return archive_path, inner_path
+    return filepath, None
+
+
+def _match_stream(stream, evaluation):
+    """流式读取解压数据，用与普通文件相同的查询求值判断是否命中"""
+    previous_chunk = b''
+    encodings = None
+
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        if encodings is None:
+            encoding = detect_encoding(chunk)
+            if encoding not in UTF16_ENCODINGS and chunk[:4096].count(b'\x00') > 50:
+                return False
+            encodings = candidate_encodings(encoding)
+
+        state = evaluation.scan(ChunkMatcher(previous_chunk + chunk, encodings))
+        if state is not None:
+            return state
+
+        previous_chunk = chunk[-_OVERLAP_SIZE:]
+
+    return evaluation.finish()
+
+
+def _skip_member(name):
+    return os.path.splitext(name)[1].lower() in _SKIP_MEMBER_EXTENSIONS
+
+
+def _iter_members(archive_path):
+    """依次产出 (内部路径, 解压后大小, 可读流)，流只在迭代到该成员时有效
+
+    单文件压缩格式（.gz/.bz2/.xz）的大小从文件末尾的元数据读取，.bz2 为 None（未知）。
+    """
+    lower = archive_path.lower()
+
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.file_size == 0 or _skip_member(info.filename):
+                    continue
+                with zf.open(info) as stream:
+                    yield info.filename, info.file_size, stream
+        return
+
+    if lower.endswith(TAR_EXTENSIONS):
+        # 'r|*' 为顺序流模式，不需要随机访问也不会整体解压
+        with tarfile.open(archive_path, 'r|*') as tf:
+            for member in tf:
+                if not member.isfile() or member.size == 0 or _skip_member(member.name):
+                    continue
+                stream = tf.extractfile(member)
+                if stream is not None:
+                    yield member.name, member.size, stream
+        return
+
+    for ext, opener in SINGLE_FILE_OPENERS.items():
+        if lower.endswith(ext):
+            inner_name = os.path.basename(archive_path)[:-len(ext)]
+            size = _single_file_size(archive_path)
+            with opener(archive_path, 'rb') as stream:
+                yield inner_name, size, stream
+            return
+
+
+def _varint(data, pos):
+    """xz 索引中的变长整数（每字节 7 位，最高位为继续标志），返回 (值, 下一个位置)"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        value |= (byte & 0x7F) << shift
+        pos += 1
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("xz 索引中的整数过长")
+
+
+def _xz_size(f):
+    """从每个流末尾的索引中累加各块解压后的大小（多个流从后向前依次读取）"""
+    pos = f.seek(0, os.SEEK_END)
+    total = 0
+    while pos > 0:
+        # 流之间可以有 4 字节对齐的零填充
+        while pos >= 4:
+            f.seek(pos - 4)
+            if f.read(4) != b'\0\0\0\0':
+                break
+            pos -= 4
+        if pos < 24:
+            return None
+        f.seek(pos - 12)
+        footer = f.read(12)
+        if footer[10:] != b'YZ':
+            return None
+        index_size = (int.from_bytes(footer[4:8], 'little') + 1) * 4
+        if index_size > pos - 24:
+            return None
+        f.seek(pos - 12 - index_size)
+        index = f.read(index_size)
+        if index[0] != 0:
+            return None
+        count, i = _varint(index, 1)
+        blocks_size = 0
+        for _ in range(count):
+            unpadded, i = _varint(index, i)
+            size, i = _varint(index, i)
+            total += size
+            blocks_size += (unpadded + 3) & ~3
+        pos -= 12 + blocks_size + index_size + 12
+    return total if pos == 0 else None
+
+
+def _single_file_size(archive_path):
+    """单文件压缩包解压后的字节数，只读取文件末尾的元数据，无法得知时返回 None
+
+    .gz 取末尾 ISIZE 字段（原始大小对 2^32 取模，多成员 gzip 只有最后一个成员的大小），
+    .xz 累加索引中记录的各块大小，.bz2 不记录原始大小。
+    """
+    lower = archive_path.lower()
+    try:
+        with open(archive_path, 'rb') as f:
+            if lower.endswith('.gz'):
+                if f.seek(0, os.SEEK_END) < 18:
+                    return None
+                f.seek(-4, os.SEEK_END)
+                return int.from_bytes(f.read(4), 'little')
+            if lower.endswith('.xz'):
+                return _xz_size(f)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def search_archive(archive_path, keywords, exclude_keywords=None, max_errors=0, plan=None):
+    """在压缩包的每个成员中搜索（在工作进程中运行），返回 [(显示路径, 大小KB), ...]
+
+    plan 为查询计划（QueryPlan），路径条件按成员的显示路径求值，
+    size: 按成员解压后的大小、mtime: 按压缩包的修改时间求值。
+    报告的大小为解压后的大小，取自压缩包的元数据，不为此多解压；.bz2 无法得知大小，
+    报告为 None，size: 条件对它不成立。命中后立即停止读取该成员。
+    """
+    if plan is None:
+        plan = keyword_plan(tuple(keywords), tuple(exclude_keywords or ()), max_errors)
+
+    results = []
+    try:
+        archive_mtime = os.path.getmtime(archive_path)
+        for inner_path, size, stream in _iter_members(archive_path):
+            display_path = f"{archive_path}{ARCHIVE_SEPARATOR}{inner_path.lstrip('/')}"
+            evaluation = plan.evaluate(display_path, (size, archive_mtime))
+            state = evaluation.state()
+            if state is False:
+                continue
+            try:
+                matched = (state is True and not plan.excludes) or _match_stream(stream, evaluation)
+            except (OSError, EOFError, RuntimeError, zipfile.BadZipFile, lzma.LZMAError):
+                continue
+            if matched:
+                results.append((display_path, size / 1024 if size is not None else None))
+    except Exception:
+        pass
+    return results
@@ -2,6 +2,10 @@
 import os
 import pickle
 import hashlib
+import threading
+
+from document_text import DocumentTextCache
+from ignore_rules import walk
 
 
 class CacheManager:
@@ -9,16 +13,28 @@ class CacheManager:
     
     def __init__(self, cache_dir):
         self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
+        # 内存中的文件列表缓存：(folder_path, 规则标识) -> (folder_hash, files)
+        self._memory_cache = {}
+        self._lock = threading.Lock()
+        self._document_text_cache = None
+    
+    @property
+    def document_text_cache(self):
+        """文档提取文本的缓存（DocumentTextCache，按需创建）"""
+        if self._document_text_cache is None:
+            with self._lock:
+                if self._document_text_cache is None:
+                    self._document_text_cache = DocumentTextCache(self.cache_dir)
+        return self._document_text_cache
     
-    def get_folder_hash(self, folder_path):
-        """生成文件夹的哈希值用于识别文件夹内容是否改变"""
+    def get_folder_hash(self, folder_path, rules=None):
+        """生成文件夹的哈希值用于识别文件夹内容是否改变（被忽略规则剪掉的子树不参与）"""
         try:
             # 统计文件夹的文件数量和最后修改时间
             file_count = 0
             max_mtime = 0
             
-            for root, dirs, files in os.walk(folder_path):
+            for root, dirs, files in walk(folder_path, rules):
                 file_count += len(files)
                 for file in files:
                     filepath = os.path.join(root, file)
@@ -30,37 +46,156 @@ class CacheManager:
             
             # 使用文件数量和最后修改时间生成哈希
             hash_str = f"{folder_path}_{file_count}_{max_mtime}"
+            if rules is not None:
+                hash_str += f"_{rules.key()}"
             return hashlib.md5(hash_str.encode()).hexdigest()
         except Exception:
             return None
     
-    def get_cache_path(self, folder_path):
+    def get_cache_path(self, folder_path, rules=None):
         """获取缓存文件路径"""
-        folder_hash = self.get_folder_hash(folder_path)
+        folder_hash = self.get_folder_hash(folder_path, rules)
         if not folder_hash:
             return None
         return os.path.join(self.cache_dir, f"files_{folder_hash}.cache")
     
-    def load_file_cache(self, folder_path):
-        """从缓存加载文件列表"""
-        cache_path = self.get_cache_path(folder_path)
-        if not cache_path or not os.path.exists(cache_path):
+    def load_file_cache(self, folder_path, rules=None):
+        """从缓存加载文件列表（优先使用内存缓存）"""
+        folder_hash = self.get_folder_hash(folder_path, rules)
+        if not folder_hash:
+            return None
+        
+        memory_key = (folder_path, rules.key() if rules is not None else None)
+        with self._lock:
+            cached = self._memory_cache.get(memory_key)
+        if cached and cached[0] == folder_hash:
+            return cached[1]
+        
+        cache_path = os.path.join(self.cache_dir, f"files_{folder_hash}.cache")
+        if not os.path.exists(cache_path):
             return None
         
         try:
             with open(cache_path, 'rb') as f:
-                return pickle.load(f)
+                files = pickle.load(f)
         except Exception:
             return None
+        
+        with self._lock:
+            self._memory_cache[memory_key] = (folder_hash, files)
+        return files
     
-    def save_file_cache(self, folder_path, files):
+    def save_file_cache(self, folder_path, files, rules=None):
         """保存文件列表到缓存"""
-        cache_path = self.get_cache_path(folder_path)
-        if not cache_path:
+        folder_hash = self.get_folder_hash(folder_path, rules)
+        if not folder_hash:
             return
         
+        with self._lock:
+            self._memory_cache[(folder_path, rules.key() if rules is not None else None)] = (folder_hash, files)
+        
+        cache_path = os.path.join(self.cache_dir, f"files_{folder_hash}.cache")
         try:
+            os.makedirs(self.cache_dir, exist_ok=True)
             with open(cache_path, 'wb') as f:
                 pickle.dump(files, f)
         except Exception:
             pass
+    
+    def prefetch_file_cache(self, folder_path, scan_func, rules=None):
+        """预热文件夹的文件列表缓存：校验已有缓存，失效时用 scan_func 重新扫描"""
+        if not folder_path or not os.path.isdir(folder_path):
+            return None
+        
+        files = self.load_file_cache(folder_path, rules)
+        if files is None:
+            files = scan_func(folder_path)
+            self.save_file_cache(folder_path, files, rules)
+        return files
+    
+    def load_hash_cache(self):
+        """加载内容哈希缓存：(st_dev, st_ino, size, mtime) -> hash"""
+        cache_path = os.path.join(self.cache_dir, "content_hashes.cache")
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return {}
+    
+    def save_hash_cache(self, hash_cache):
+        """保存内容哈希缓存"""
+        cache_path = os.path.join(self.cache_dir, "content_hashes.cache")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump(hash_cache, f)
+        except Exception:
+            pass
+    
+    def load_term_stats(self):
+        """加载关键字选择度统计：关键字 -> [命中文件数, 已确定的文件数]"""
+        cache_path = os.path.join(self.cache_dir, "term_stats.cache")
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return {}
+    
+    def save_term_stats(self, term_stats):
+        """保存关键字选择度统计（先写临时文件再替换）"""
+        self._dump_replace("term_stats.cache", term_stats)
+    
+    def load_match_history(self):
+        """加载搜索命中历史（供优先级调度使用）：{"ext": {...}, "hits": [...]}"""
+        cache_path = os.path.join(self.cache_dir, "match_history.cache")
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return {}
+    
+    def save_match_history(self, match_history):
+        """保存搜索命中历史（先写临时文件再替换，并发的会话或崩溃不会留下损坏的文件）"""
+        self._dump_replace("match_history.cache", match_history)
+    
+    def _dump_replace(self, name, obj):
+        """把 obj 序列化写入缓存目录下的 name：先写本线程的临时文件，再原子替换"""
+        cache_path = os.path.join(self.cache_dir, name)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def load_search_checkpoint(self):
+        """加载最近一次未完成搜索的检查点（SearchCheckpoint.to_dict 的结果），没有返回 None"""
+        cache_path = os.path.join(self.cache_dir, "search_checkpoint.cache")
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+    
+    def save_search_checkpoint(self, checkpoint):
+        """保存搜索检查点（先写临时文件再替换，崩溃时不会留下损坏的检查点）"""
+        cache_path = os.path.join(self.cache_dir, "search_checkpoint.cache")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path + '.tmp', 'wb') as f:
+                pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_path + '.tmp', cache_path)
+        except Exception:
+            pass
+    
+    def clear_search_checkpoint(self):
+        """搜索正常完成后删除检查点"""
+        try:
+            os.remove(os.path.join(self.cache_dir, "search_checkpoint.cache"))
+        except OSError:
+            pass
@@ -1,59 +1,159 @@
 """配置管理模块"""
 import os
 import json
+import stat
 import logging
+import tempfile
+import threading
 from datetime import datetime
 
+from ignore_rules import DEFAULT_DIR_BLACKLIST
+
+# 实时搜索两次检查之间的默认间隔和最小间隔（秒）
+LIVE_INTERVAL = 30.0
+MIN_LIVE_INTERVAL = 5.0
+
 
 # 配置日志
+class _LazyFileHandler(logging.FileHandler):
+    """首次写日志时才创建日志目录和文件的处理器"""
+    
+    def _open(self):
+        log_dir = os.path.dirname(self.baseFilename)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir, exist_ok=True)
+        return super()._open()
+
+
 def setup_logging():
-    """设置日志系统"""
-    log_dir = os.path.join(os.path.expanduser("~"), ".file_finder_logs")
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir, exist_ok=True)
+    """设置日志系统（可重复调用，只在第一次生效）"""
+    root_logger = logging.getLogger()
+    if any(isinstance(h, _LazyFileHandler) for h in root_logger.handlers):
+        return logging.getLogger(__name__)
     
+    log_dir = os.path.join(os.path.expanduser("~"), ".file_finder_logs")
     log_file = os.path.join(log_dir, f"app_{datetime.now().strftime('%Y%m%d')}.log")
     
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s [%(levelname)s] %(message)s',
         handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
+            _LazyFileHandler(log_file, encoding='utf-8', delay=True),  # 延迟到第一条日志时才打开文件
             logging.StreamHandler()  # 同时输出到控制台
         ]
     )
     return logging.getLogger(__name__)
 
-logger = setup_logging()
+# 导入时不再初始化日志系统，由程序入口调用 setup_logging()
+logger = logging.getLogger(__name__)
+
+# 当前进程的 umask（只能通过设置来读取，在导入时读取一次）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 
 class ConfigManager:
-    """配置文件管理器"""
+    """配置文件管理器（内存为准，后台延迟落盘）"""
+    
+    # 修改后延迟多久写盘（秒），连续修改会合并为一次写入
+    FLUSH_DELAY = 1.0
     
-    def __init__(self, config_file):
+    def __init__(self, config_file, flush_delay=None):
         self.config_file = config_file
-        self.config = self.load_config()  # 在初始化时加载配置
+        self.flush_delay = self.FLUSH_DELAY if flush_delay is None else flush_delay
+        self._lock = threading.RLock()
+        # 写盘互斥：定时器线程正在写入时 close() 等它写完，两次写入也不会以旧快照覆盖新快照
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer = None
+        self.config = self._read_config_file()  # 在初始化时加载配置，之后只使用内存中的配置
     
     def save_config(self, folder_path, keywords, extensions, search_history=None):
-        """保存配置到文件"""
-        try:
-            # 加载现有配置以保留搜索历史
-            config = self.load_config()
-            
-            config["folder_path"] = folder_path
-            config["keywords"] = keywords
-            config["extensions"] = extensions
+        """保存配置（更新内存并延迟写盘）"""
+        with self._lock:
+            self.config["folder_path"] = folder_path
+            self.config["keywords"] = keywords
+            self.config["extensions"] = extensions
             
             # 更新搜索历史（如果提供）
             if search_history is not None:
-                config["search_history"] = search_history
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+                self.config["search_history"] = search_history
+        self._schedule_flush()
+    
+    def _write_atomic(self, config):
+        """原子写入配置：先写临时文件再重命名，避免写一半导致配置损坏
+
+        mkstemp 创建的临时文件权限为 0600，重命名前改为原配置文件的权限
+        （配置文件不存在时为按 umask 新建文件的默认权限）。
+        """
+        config_dir = os.path.dirname(self.config_file)
+        if config_dir and not os.path.exists(config_dir):
+            os.makedirs(config_dir, exist_ok=True)
+        
+        try:
+            mode = stat.S_IMODE(os.stat(self.config_file).st_mode)
+        except OSError:
+            mode = 0o666 & ~_UMASK
+        
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=config_dir or None)
+        try:
+            os.chmod(tmp_path, mode)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
         except Exception:
-            pass
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
+    def _schedule_flush(self):
+        """标记配置已修改，并在后台定时器中合并写盘"""
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer is not None:
+                return
+            timer = threading.Timer(self.flush_delay, self.flush)
+            timer.daemon = True
+            self._flush_timer = timer
+        timer.start()
+    
+    def flush(self):
+        """把内存中的配置写入文件（仅在有修改时）"""
+        with self._write_lock:
+            with self._lock:
+                self._flush_timer = None
+                if not self._dirty:
+                    return True
+                self.config["version"] = 2  # 确保版本号
+                snapshot = json.loads(json.dumps(self.config))
+                self._dirty = False
+            try:
+                self._write_atomic(snapshot)
+                return True
+            except Exception as e:
+                logger.error(f"保存配置失败: {e}")
+                with self._lock:
+                    self._dirty = True
+                return False
+    
+    def close(self):
+        """取消待执行的定时器并立即写盘（程序退出时调用）"""
+        with self._lock:
+            timer = self._flush_timer
+            self._flush_timer = None
+        if timer is not None:
+            timer.cancel()
+        return self.flush()
     
     def load_config(self):
+        """返回内存中的配置（不再读取文件）"""
+        return self.config
+    
+    def _read_config_file(self):
         """从文件加载配置（带版本迁移）"""
         default_config = {
             "version": 2,  # 配置文件版本号
@@ -62,6 +162,11 @@ class ConfigManager:
             "extension_history": [],
             "exclude_history": [],
             "exclude_keywords": "",
+            "dir_blacklist": list(DEFAULT_DIR_BLACKLIST),  # 遍历时跳过的目录名
+            "path_excludes": "",  # 用户排除模式（gitignore 语法，空格分隔）
+            "use_ignore_files": True,  # 是否遵守 .gitignore/.ignore
+            "saved_searches": [],  # 实时搜索（保存的搜索条件和上次评估时间）
+            "live_interval": LIVE_INTERVAL,  # 实时搜索两次检查之间的间隔（秒）
             "last_search_state": {
                 "folder_path": "",
                 "keywords": "",
@@ -117,172 +222,151 @@ class ConfigManager:
             
             # 保存迁移后的配置
             try:
-                with open(self.config_file, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, ensure_ascii=False, indent=2)
+                self._write_atomic(config)
                 logger.info("配置迁移成功！")
             except Exception as e:
                 logger.error(f"保存迁移后的配置失败: {e}")
         
         return config
     
+    def _add_history(self, key, value):
+        """把值插入到指定历史列表最前面（去重，只保留最近10条）"""
+        with self._lock:
+            history = list(self.config.get(key, []))
+            
+            # 如果已存在，先移除
+            if value in history:
+                history.remove(value)
+            
+            # 添加到最前面，只保留最近10条
+            history.insert(0, value)
+            self.config[key] = history[:10]
+        self._schedule_flush()
+    
     def add_search_history(self, keywords):
         """添加搜索历史"""
         if not keywords.strip():
             return
-        
-        config = self.load_config()
-        history = config.get("search_history", [])
-        
-        # 如果已存在，先移除
-        if keywords in history:
-            history.remove(keywords)
-        
-        # 添加到最前面
-        history.insert(0, keywords)
-        
-        # 只保留最近10条
-        history = history[:10]
-        
-        config["search_history"] = history
-        
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        self._add_history("search_history", keywords)
 
     def add_folder_history(self, folder_path):
         """添加文件夹路径历史"""
         if not folder_path.strip():
             return
-
-        config = self.load_config()
-        history = config.get("folder_history", [])
-
-        if folder_path in history:
-            history.remove(folder_path)
-
-        history.insert(0, folder_path)
-        history = history[:10]
-
-        config["folder_history"] = history
-
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        self._add_history("folder_history", folder_path)
 
     def add_extension_history(self, extensions_text):
         """添加后缀名历史（原样保存输入）"""
         text = (extensions_text or "").strip()
         if not text:
             return
-
-        config = self.load_config()
-        history = config.get("extension_history", [])
-
-        if text in history:
-            history.remove(text)
-
-        history.insert(0, text)
-        history = history[:10]
-
-        config["extension_history"] = history
-
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        self._add_history("extension_history", text)
     
     def add_exclude_history(self, exclude_text):
         """添加排除关键字历史"""
         text = (exclude_text or "").strip()
         if not text:
             return
-
-        config = self.load_config()
-        history = config.get("exclude_history", [])
-
-        if text in history:
-            history.remove(text)
-
-        history.insert(0, text)
-        history = history[:10]
-
-        config["exclude_history"] = history
-        self.config["exclude_history"] = history  # 更新内存中的配置
-
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            logger.info(f"已保存排除关键字历史: {text}")
-        except Exception as e:
-            logger.error(f"保存排除关键字历史失败: {e}")
+        self._add_history("exclude_history", text)
     
     def save_config_to_file(self):
-        """直接将当前配置保存到文件（带重试和备份）"""
-        try:
-            # 确保目录存在
-            config_dir = os.path.dirname(self.config_file)
-            if config_dir and not os.path.exists(config_dir):
-                os.makedirs(config_dir, exist_ok=True)
-            
-            # 备份现有配置（如果存在）
-            if os.path.exists(self.config_file):
-                backup_file = self.config_file + '.backup'
-                try:
-                    import shutil
-                    shutil.copy2(self.config_file, backup_file)
-                except:
-                    pass
-            
-            # 保存配置
-            self.config["version"] = 2  # 确保版本号
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-            
-            # 验证保存是否成功
-            if os.path.exists(self.config_file):
-                return True
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
-            # 尝试恢复备份
+        """立即将当前配置保存到文件（带备份）"""
+        # 备份现有配置（如果存在）
+        if os.path.exists(self.config_file):
             backup_file = self.config_file + '.backup'
-            if os.path.exists(backup_file):
-                try:
-                    import shutil
-                    shutil.copy2(backup_file, self.config_file)
-                    logger.info("已从备份恢复配置")
-                except:
-                    pass
-        return False
+            try:
+                import shutil
+                shutil.copy2(self.config_file, backup_file)
+            except:
+                pass
+        
+        with self._lock:
+            self._dirty = True
+        # 原子写入失败时原文件保持不变，无需从备份恢复
+        return self.close()
     
     def save_last_search_state(self, folder_path, keywords, extensions, exclude_keywords):
         """保存最后一次搜索的状态（用于窗口关闭时）"""
-        # 使用内存中的config，避免重复加载
-        self.config["last_search_state"] = {
-            "folder_path": folder_path,
-            "keywords": keywords,
-            "extensions": extensions,
-            "exclude_keywords": exclude_keywords
-        }
-        self.config["version"] = 2  # 确保版本号正确
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-            logger.info(f"已保存搜索状态: keywords={keywords}")
-        except Exception as e:
-            logger.error(f"保存配置失败: {e}")
-            pass
+        with self._lock:
+            self.config["last_search_state"] = {
+                "folder_path": folder_path,
+                "keywords": keywords,
+                "extensions": extensions,
+                "exclude_keywords": exclude_keywords
+            }
+        self._schedule_flush()
     
     def get_last_search_state(self):
         """获取最后一次搜索的状态"""
-        config = self.load_config()
-        return config.get("last_search_state", {
+        return self.config.get("last_search_state", {
             "folder_path": "",
             "keywords": "",
             "extensions": "",
             "exclude_keywords": ""
         })
+    
+    def get_ignore_settings(self):
+        """获取遍历剪枝设置：(目录黑名单, 排除模式文本, 是否遵守忽略文件)"""
+        return (
+            list(self.config.get("dir_blacklist", DEFAULT_DIR_BLACKLIST)),
+            self.config.get("path_excludes", ""),
+            self.config.get("use_ignore_files", True),
+        )
+    
+    def save_ignore_settings(self, dir_blacklist, path_excludes, use_ignore_files):
+        """保存遍历剪枝设置"""
+        with self._lock:
+            self.config["dir_blacklist"] = list(dir_blacklist)
+            self.config["path_excludes"] = path_excludes
+            self.config["use_ignore_files"] = bool(use_ignore_files)
+        self._schedule_flush()
+    
+    def get_live_interval(self):
+        """实时搜索的检查间隔（秒）"""
+        try:
+            return max(MIN_LIVE_INTERVAL, float(self.config.get("live_interval", LIVE_INTERVAL)))
+        except (TypeError, ValueError):
+            return LIVE_INTERVAL
+    
+    def set_live_interval(self, seconds):
+        """保存实时搜索的检查间隔（秒，不小于 MIN_LIVE_INTERVAL）"""
+        with self._lock:
+            self.config["live_interval"] = max(MIN_LIVE_INTERVAL, float(seconds))
+        self._schedule_flush()
+    
+    def get_saved_searches(self):
+        """获取所有保存的实时搜索（副本）"""
+        with self._lock:
+            return [dict(saved) for saved in self.config.get("saved_searches", [])]
+    
+    def save_saved_search(self, name, folder_path, keywords, extensions, exclude_keywords, max_errors=0):
+        """保存（或覆盖同名的）实时搜索；覆盖后从头评估"""
+        saved = {
+            "name": name,
+            "folder_path": folder_path,
+            "keywords": keywords,
+            "extensions": extensions,
+            "exclude_keywords": exclude_keywords,
+            "max_errors": max_errors,
+            "enabled": True,
+            "last_evaluated": None,
+        }
+        with self._lock:
+            searches = [s for s in self.config.get("saved_searches", []) if s.get("name") != name]
+            searches.append(saved)
+            self.config["saved_searches"] = searches
+        self._schedule_flush()
+    
+    def delete_saved_search(self, name):
+        """删除实时搜索"""
+        with self._lock:
+            self.config["saved_searches"] = [s for s in self.config.get("saved_searches", []) if s.get("name") != name]
+        self._schedule_flush()
+    
+    def update_saved_search(self, name, **fields):
+        """更新实时搜索的字段（如 enabled、last_evaluated）"""
+        with self._lock:
+            for saved in self.config.get("saved_searches", []):
+                if saved.get("name") == name:
+                    saved.update(fields)
+        self._schedule_flush()
@@ -0,0 +1,132 @@
+"""内容去重模块：相同内容的文件只搜索一次，结果分发给所有副本"""
+import os
+import hashlib
+
+
+# 部分哈希读取文件开头和结尾各多少字节
+PARTIAL_HASH_SIZE = 4096
+# 内容哈希缓存的最大条目数，超出时丢弃最早的条目
+MAX_HASH_CACHE_ENTRIES = 500000
+
+
+def _partial_hash(filepath, size):
+    """读取文件首尾各 4KB 计算的廉价哈希（不超过 8KB 的文件读取全部内容，哈希即完整哈希）"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        if size <= PARTIAL_HASH_SIZE * 2:
+            h.update(f.read())
+        else:
+            h.update(f.read(PARTIAL_HASH_SIZE))
+            f.seek(size - PARTIAL_HASH_SIZE)
+            h.update(f.read(PARTIAL_HASH_SIZE))
+    return h.digest()
+
+
+def _full_hash(filepath):
+    """完整内容哈希"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        while True:
+            data = f.read(1024 * 1024)
+            if not data:
+                break
+            h.update(data)
+    return h.digest()
+
+
+class DuplicateFinder:
+    """按 大小 → 部分哈希 → 完整哈希 三级分组找出内容相同的文件
+
+    完整哈希按 (st_dev, st_ino, 大小, mtime) 缓存，文件未修改时后续搜索无需再次读取，
+    也不需要读取首尾计算部分哈希。
+    """
+
+    def __init__(self, hash_cache=None, executor=None):
+        self.hash_cache = hash_cache if hash_cache is not None else {}
+        self.executor = executor
+
+    def _map(self, func, items):
+        if self.executor is None:
+            return list(map(func, items))
+        return list(self.executor.map(func, items))
+
+    def _regroup(self, groups, key_func):
+        """对每组内的文件按新键再分组，只保留仍有多个文件的组"""
+        members = [(index, item) for index, group in enumerate(groups) for item in group]
+        keys = self._map(key_func, [item for _, item in members])
+        regrouped = {}
+        for (index, item), key in zip(members, keys):
+            if key is not None:
+                regrouped.setdefault((index, key), []).append(item)
+        return [group for group in regrouped.values() if len(group) > 1]
+
+    def find_groups(self, file_ids, path_of, meta_of=None):
+        """返回 {代表 file_id: [副本 file_id, ...]}
+
+        meta_of(file_id) 返回文件列表中记录的 (st_dev, st_ino, 大小, mtime)，未记录时返回 None，
+        这些文件（及未给出 meta_of 时的所有文件）在线程池中 stat。
+        """
+        # 第一级：按 (大小, 后缀) 分组（后缀不同时 search_file 的处理方式可能不同）
+        by_size = {}
+
+        def add(file_id, meta):
+            if meta is None or meta[2] <= 0:
+                return
+            filepath = path_of(file_id)
+            size_key = (meta[2], os.path.splitext(filepath)[1].lower())
+            by_size.setdefault(size_key, []).append((file_id, size_key, filepath, meta))
+
+        def stat_meta(file_id):
+            try:
+                st = os.stat(path_of(file_id))
+            except OSError:
+                return None
+            return (st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+
+        unknown = []
+        for file_id in file_ids:
+            meta = meta_of(file_id) if meta_of is not None else None
+            if meta is None:
+                unknown.append(file_id)
+            else:
+                add(file_id, meta)
+        for file_id, meta in zip(unknown, self._map(stat_meta, unknown)):
+            add(file_id, meta)
+        groups = [group for group in by_size.values() if len(group) > 1]
+        if not groups:
+            return {}
+
+        # 第二级：首尾部分哈希。组内有文件的完整哈希已缓存时跳过这一级，
+        # 直接比较完整哈希（缓存的文件无需读取，其余文件无论如何都要算完整哈希才能与它比较）
+        def partial_key(item):
+            try:
+                return _partial_hash(item[2], item[1][0])
+            except OSError:
+                return None
+        cached_groups = [group for group in groups if any(item[3] in self.hash_cache for item in group)]
+        groups = cached_groups + self._regroup(
+            [group for group in groups if not any(item[3] in self.hash_cache for item in group)], partial_key)
+
+        # 第三级：完整内容哈希（小文件的部分哈希已覆盖全部内容；小文件不缓存，不会跳过第二级）
+        def full_key(item):
+            if item[1][0] <= PARTIAL_HASH_SIZE * 2:
+                return b'small'
+            cached = self.hash_cache.get(item[3])
+            if cached is not None:
+                return cached
+            try:
+                digest = _full_hash(item[2])
+            except OSError:
+                return None
+            self.hash_cache[item[3]] = digest
+            return digest
+        groups = self._regroup(groups, full_key)
+
+        self._trim_cache()
+        return {group[0][0]: [item[0] for item in group[1:]] for group in groups}
+
+    def _trim_cache(self):
+        overflow = len(self.hash_cache) - MAX_HASH_CACHE_ENTRIES
+        if overflow > 0:
+            for key in list(self.hash_cache)[:overflow]:
+                del self.hash_cache[key]
@@ -0,0 +1,339 @@
+"""按设备划分的工作线程池：每个设备（st_dev）一个独立的线程池和延迟统计
+
+搜索同时覆盖本地磁盘和网络共享/U 盘时，慢设备上的读取只占用它自己的线程，
+快设备上的文件仍以全速搜索。线程数按设备类型确定：固态硬盘和内存文件系统使用全部线程，
+机械硬盘和网络文件系统限制为 SLOW_DEVICE_WORKERS（并发过多时机械硬盘来回寻道，网络盘排队）。
+
+看门狗线程定期检查正在执行的任务：超过 STALL_TIMEOUT 秒没有进展（任务通过 current_task().beat()
+报告每次读取）的任务视为卡住（如挂起的 NFS 读取），其 Future 以 TimeoutError 结束，
+并立即补充一个线程顶替它的名额；卡住的线程返回后自行退出。
+一直有进展但极慢的读取（每隔几秒只返回几个字节）不会触发无进展超时，
+总耗时超过 TASK_DEADLINE 秒的任务同样按卡住处理。
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, InvalidStateError
+
+from io_scheduler import DEFAULT_READS_PER_DEVICE
+
+logger = logging.getLogger(__name__)
+
+# 设备号未知（文件列表中没有记录）时使用的键
+UNKNOWN_DEVICE = -1
+# 任务超过该时间（秒）没有进展视为卡住
+STALL_TIMEOUT = 15.0
+# 单个任务的总耗时上限（秒），不论是否有进展
+TASK_DEADLINE = 600.0
+# 看门狗的检查间隔（秒）
+WATCHDOG_INTERVAL = 1.0
+# 机械硬盘和网络文件系统上的线程数上限（与按磁盘位置排序时每个设备的在途读取数相同）
+SLOW_DEVICE_WORKERS = DEFAULT_READS_PER_DEVICE
+
+# 设备类型
+DEVICE_SSD = 'ssd'
+DEVICE_ROTATIONAL = 'rotational'
+DEVICE_NETWORK = 'network'
+DEVICE_UNKNOWN = 'unknown'
+
+# 按网络文件系统处理的文件系统类型（/proc/self/mountinfo 中的名称）
+NETWORK_FILESYSTEMS = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', '9p', 'ceph', 'glusterfs',
+    'fuse.sshfs', 'fuse.rclone', 'fuse.glusterfs', 'fuse.s3fs', 'davfs', 'fuse.davfs2',
+}
+
+_current = threading.local()
+
+
+def current_task():
+    """当前线程正在执行的任务（不在 DevicePool 线程中时返回 None）"""
+    return getattr(_current, 'task', None)
+
+
+def _settle(future, result=None, exception=None):
+    """设置任务结果；已被看门狗判定超时的 Future 忽略迟到的结果"""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _mount_fs_types():
+    """{"主设备号:次设备号": 文件系统类型}，读取 /proc/self/mountinfo（非 Linux 返回空字典）"""
+    fs_types = {}
+    try:
+        with open('/proc/self/mountinfo', 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                fields = line.split()
+                if '-' not in fields:
+                    continue
+                separator = fields.index('-')
+                if len(fields) > separator + 1:
+                    fs_types.setdefault(fields[2], fields[separator + 1])
+    except OSError:
+        pass
+    return fs_types
+
+
+def device_kind(dev, fs_types=None):
+    """设备类型：块设备按 /sys 中的 queue/rotational 区分机械硬盘和固态硬盘，
+    没有块设备的（主设备号为 0）按挂载的文件系统类型识别网络文件系统；无法判断时为 DEVICE_UNKNOWN"""
+    if dev == UNKNOWN_DEVICE or not hasattr(os, 'major'):
+        return DEVICE_UNKNOWN
+    major, minor = os.major(dev), os.minor(dev)
+    if major == 0:
+        if fs_types is None:
+            fs_types = _mount_fs_types()
+        fs_type = fs_types.get(f"{major}:{minor}")
+        return DEVICE_NETWORK if fs_type in NETWORK_FILESYSTEMS else DEVICE_UNKNOWN
+    block_dir = f"/sys/dev/block/{major}:{minor}"
+    # 分区没有自己的 queue 目录，使用所在磁盘的
+    for queue_dir in (os.path.join(block_dir, 'queue'), os.path.join(block_dir, '..', 'queue')):
+        try:
+            with open(os.path.join(queue_dir, 'rotational'), 'r') as f:
+                return DEVICE_ROTATIONAL if f.read().strip() == '1' else DEVICE_SSD
+        except OSError:
+            continue
+    return DEVICE_UNKNOWN
+
+
+class _Task:
+    """正在执行的任务：执行线程、开始时间和最近一次进展的时间"""
+
+    __slots__ = ('future', 'stats', 'thread', 'started', 'last_progress', 'stalled')
+
+    def __init__(self, future, stats=None):
+        self.future = future
+        self.stats = stats  # 提交该任务的搜索的统计（SearchStats 中该设备的一项）
+        self.thread = threading.current_thread()
+        self.started = self.last_progress = time.monotonic()
+        self.stalled = False
+
+    def beat(self):
+        """报告一次进展（如读完一块），可在其他线程中代为调用"""
+        self.last_progress = time.monotonic()
+
+
+class LatencyStats:
+    """单个设备的任务耗时统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stalled = 0  # 被看门狗判定卡住的任务数
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def record_stall(self):
+        with self._lock:
+            self.stalled += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        text = f"{self.count} 个文件，平均 {self.mean * 1000:.1f}ms，最慢 {self.max * 1000:.0f}ms"
+        if self.stalled:
+            text += f"，{self.stalled} 个卡住"
+        return text
+
+
+class SearchStats:
+    """一次搜索在各设备上的耗时统计
+
+    DevicePools 由同一进程中的所有搜索（如搜索服务的各个会话）共用，
+    每次搜索用自己的 SearchStats 提交任务，并发的搜索不会清零或混入彼此的统计。
+    """
+
+    def __init__(self):
+        self._by_device = {}
+        self._lock = threading.Lock()
+
+    def device(self, dev):
+        """设备 dev 的统计（首次使用时创建）"""
+        with self._lock:
+            stats = self._by_device.get(dev)
+            if stats is None:
+                stats = self._by_device[dev] = LatencyStats()
+            return stats
+
+    def stalled_count(self):
+        """本次搜索中被判定卡住的任务数"""
+        with self._lock:
+            return sum(stats.stalled for stats in self._by_device.values())
+
+    def log(self, device_pools):
+        with self._lock:
+            items = list(self._by_device.items())
+        for dev, stats in items:
+            if stats.count or stats.stalled:
+                logger.info(f"设备 {dev}（{device_pools.kind_of(dev)}，{device_pools.pool(dev).max_workers} 线程）: "
+                            f"{stats.summary()}")
+
+
+class DevicePool:
+    """单个设备的线程池：线程按需创建，直到 max_workers 个"""
+
+    def __init__(self, dev, max_workers):
+        self.dev = dev
+        self.max_workers = max(1, max_workers)
+        self.stats = LatencyStats()  # 线程池创建以来的累计统计
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        self._active = set()  # 正在执行的 _Task
+        self._idle = threading.Semaphore(0)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """提交任务，返回 concurrent.futures.Future"""
+        return self.submit_tracked(None, fn, *args, **kwargs)
+
+    def submit_tracked(self, stats, fn, *args, **kwargs):
+        """提交任务，耗时和卡住次数同时计入 stats（LatencyStats，可为 None）"""
+        future = Future()
+        self._queue.put((future, stats, fn, args, kwargs))
+        self._adjust_thread_count()
+        return future
+
+    def _adjust_thread_count(self):
+        # 有空闲线程时由它接手，否则在上限内新建线程
+        if self._idle.acquire(blocking=False):
+            return
+        with self._lock:
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, name=f"device-{self.dev}-{len(self._threads)}")
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, stats, fn, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                task = _Task(future, stats)
+                with self._lock:
+                    self._active.add(task)
+                _current.task = task
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    _settle(future, exception=e)
+                else:
+                    _settle(future, result)
+                finally:
+                    _current.task = None
+                    with self._lock:
+                        self._active.discard(task)
+                elapsed = time.monotonic() - task.started
+                self.stats.record(elapsed)
+                if stats is not None:
+                    stats.record(elapsed)
+                if task.stalled:
+                    # 名额已由替补线程接替，本线程退出
+                    return
+            self._idle.release()
+
+    def check_stalls(self, now, timeout, deadline=None):
+        """把超过 timeout 秒没有进展或总耗时超过 deadline 秒的任务判定为卡住，结束其 Future 并补充线程"""
+        with self._lock:
+            stalled = []
+            for task in self._active:
+                if task.stalled:
+                    continue
+                if now - task.last_progress > timeout:
+                    stalled.append((task, f"{timeout:.0f} 秒没有进展"))
+                elif deadline is not None and now - task.started > deadline:
+                    stalled.append((task, f"超过 {deadline:.0f} 秒仍未完成"))
+            for task, reason in stalled:
+                task.stalled = True
+                # 卡住的线程不再计入线程数，下面补充的线程顶替它
+                self._threads = [t for t in self._threads if t is not task.thread]
+        for task, reason in stalled:
+            self.stats.record_stall()
+            if task.stats is not None:
+                task.stats.record_stall()
+            _settle(task.future, exception=TimeoutError(reason))
+            logger.warning(f"设备 {self.dev} 上的任务{reason}，已跳过并补充线程")
+            self._adjust_thread_count()
+
+    def shutdown(self):
+        """通知所有线程在完成手头任务后退出（不等待）"""
+        with self._lock:
+            for _ in self._threads:
+                self._queue.put(None)
+            self._threads = []
+
+
+class DevicePools:
+    """设备号 -> DevicePool；文件的设备号取自文件列表（遍历时记录），分配任务时不 stat
+
+    每个设备的线程数为 workers_per_device，机械硬盘和网络文件系统不超过 SLOW_DEVICE_WORKERS。
+    """
+
+    def __init__(self, workers_per_device, stall_timeout=STALL_TIMEOUT, task_deadline=TASK_DEADLINE):
+        self.workers_per_device = workers_per_device
+        self.stall_timeout = stall_timeout
+        self.task_deadline = task_deadline
+        self._pools = {}
+        self._kinds = {}    # st_dev -> 设备类型
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog = None
+
+    def kind_of(self, dev):
+        """设备类型（每个设备只判断一次）"""
+        kind = self._kinds.get(dev)
+        if kind is None:
+            kind = self._kinds[dev] = device_kind(dev)
+        return kind
+
+    def workers_for(self, dev):
+        """设备线程池的线程数"""
+        if self.kind_of(dev) in (DEVICE_ROTATIONAL, DEVICE_NETWORK):
+            return min(self.workers_per_device, SLOW_DEVICE_WORKERS)
+        return self.workers_per_device
+
+    def pool(self, dev):
+        """设备的线程池（首次使用时创建）"""
+        pool = self._pools.get(dev)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(dev)
+                if pool is None:
+                    pool = DevicePool(dev, self.workers_for(dev))
+                    self._pools[dev] = pool
+                    if self._watchdog is None:
+                        self._watchdog = threading.Thread(target=self._watch, name="device-watchdog")
+                        self._watchdog.daemon = True
+                        self._watchdog.start()
+        return pool
+
+    def _watch(self):
+        """看门狗：定期检查各设备上卡住的任务"""
+        while not self._stopped.wait(WATCHDOG_INTERVAL):
+            now = time.monotonic()
+            for pool in list(self._pools.values()):
+                pool.check_stalls(now, self.stall_timeout, self.task_deadline)
+
+    def shutdown(self):
+        self._stopped.set()
+        with self._lock:
+            for pool in self._pools.values():
+                pool.shutdown()
+            self._pools = {}
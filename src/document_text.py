@@ -0,0 +1,421 @@
+"""文档文本提取：让 .docx/.xlsx/.pptx/.pdf 的内容可以搜索
+
+只使用标准库：OOXML（docx/xlsx/pptx）是 zip 包，按部件流式解析 XML 取出文字；
+PDF 用一个最小的解码器，解压 FlateDecode 内容流，取出 Tj/TJ/'/" 显示的字符串
+（有 ToUnicode CMap 时按它映射，扫描件和加密 PDF 取不到文字）。
+
+提取在进程池中进行（解压和解析是 CPU 密集型），提取出的文本以 UTF-8 保存在按
+(路径, 大小, 修改时间) 命名的缓存文件中，总大小超出上限时删除最久未使用的。
+之后的搜索直接在缓存文本上匹配，只有第一次搜索（或文档修改后）需要提取。
+"""
+import os
+import re
+import mmap
+import zlib
+import hashlib
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+
+# 支持提取文本的文档类型
+DOCUMENT_EXTENSIONS = ('.docx', '.xlsx', '.pptx', '.pdf')
+# 提取文本缓存的总大小上限（字节）
+DOCUMENT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# 超过该大小的 PDF 不提取
+MAX_PDF_SIZE = 256 * 1024 * 1024
+# 每个 PDF 流解压后最多保留的字节数（超出部分丢弃，防止压缩炸弹）
+MAX_PDF_STREAM_SIZE = 32 * 1024 * 1024
+# 单个文档提取的时限（秒），超时的文档记为无文字
+EXTRACT_TIMEOUT = 120
+
+# 文字内容所在的元素（XML 局部名）和表示换行的元素
+_TEXT_TAGS = {'t'}
+_BREAK_TAGS = {'p', 'br', 'tab', 'cr'}
+
+
+def is_document(filepath):
+    """是否为支持提取文本的文档"""
+    return filepath.lower().endswith(DOCUMENT_EXTENSIONS)
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _part_order(name):
+    """slide2.xml 排在 slide10.xml 之前"""
+    number = re.search(r'(\d+)\.xml$', name)
+    return (int(number.group(1)) if number else 0, name)
+
+
+def _xml_text(stream, out):
+    """流式解析一个 XML 部件，把 <t> 中的文字追加到 out，段落和换行处换行"""
+    for event, elem in ET.iterparse(stream, events=('end',)):
+        tag = _local_name(elem.tag)
+        if tag in _TEXT_TAGS:
+            if elem.text:
+                out.append(elem.text)
+        elif tag in _BREAK_TAGS:
+            out.append('\t' if tag == 'tab' else '\n')
+        elem.clear()
+
+
+def _ooxml_text(filepath, prefixes):
+    """docx/pptx：按顺序提取 prefixes 下各 XML 部件的文字"""
+    out = []
+    with zipfile.ZipFile(filepath) as archive:
+        names = [name for name in archive.namelist()
+                 if name.endswith('.xml') and name.startswith(prefixes)]
+        for name in sorted(names, key=_part_order):
+            with archive.open(name) as stream:
+                _xml_text(stream, out)
+            out.append('\n')
+    return ''.join(out)
+
+
+def _xlsx_text(filepath):
+    """xlsx：共享字符串按单元格引用还原，每行一行，单元格之间用制表符分隔"""
+    out = []
+    with zipfile.ZipFile(filepath) as archive:
+        names = set(archive.namelist())
+        shared = []
+        if 'xl/sharedStrings.xml' in names:
+            with archive.open('xl/sharedStrings.xml') as stream:
+                parts = []
+                for event, elem in ET.iterparse(stream, events=('end',)):
+                    tag = _local_name(elem.tag)
+                    if tag == 't' and elem.text:
+                        parts.append(elem.text)
+                    elif tag == 'si':
+                        shared.append(''.join(parts))
+                        parts = []
+                        elem.clear()
+        sheets = [name for name in names if name.startswith('xl/worksheets/') and name.endswith('.xml')]
+        for name in sorted(sheets, key=_part_order):
+            with archive.open(name) as stream:
+                cell_type, value, row = None, None, []
+                for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                    tag = _local_name(elem.tag)
+                    if event == 'start':
+                        if tag == 'c':
+                            cell_type, value = elem.get('t'), None
+                        continue
+                    if tag in ('v', 't') and elem.text is not None:
+                        value = elem.text if value is None else value + elem.text
+                    elif tag == 'c':
+                        if value is not None:
+                            if cell_type == 's':
+                                try:
+                                    value = shared[int(value)]
+                                except (ValueError, IndexError):
+                                    pass
+                            row.append(value)
+                        elem.clear()
+                    elif tag == 'row':
+                        if row:
+                            out.append('\t'.join(row))
+                            out.append('\n')
+                        row = []
+                        elem.clear()
+            out.append('\n')
+    return ''.join(out)
+
+
+# ---- PDF ----
+
+_STREAM_RE = re.compile(rb'stream\r?\n')
+_ENDSTREAM = b'endstream'
+_TEXT_TOKEN_RE = re.compile(
+    rb'\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)'  # 字面字符串（允许一层未转义的括号）
+    rb'|<[0-9A-Fa-f\s]*>'                           # 十六进制字符串
+    rb'|\[|\]'
+    rb'|-?\d*\.?\d+'
+    rb'|[A-Za-z\'"*]+',
+    re.S)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+            b'(': b'(', b')': b')', b'\\': b'\\'}
+_ESCAPE_RE = re.compile(rb'\\([0-7]{1,3}|\r\n|[\s\S])')
+_BFCHAR_RE = re.compile(rb'beginbfchar(.*?)endbfchar', re.S)
+_BFRANGE_RE = re.compile(rb'beginbfrange(.*?)endbfrange', re.S)
+_HEX_RE = re.compile(rb'<([0-9A-Fa-f\s]*)>')
+# TJ 数组中小于该值的字距调整视为单词间空格
+_TJ_SPACE = -200
+
+
+def _pdf_streams(data):
+    """依次返回可解码的流的 (字典, 内容起点, 内容终点)：无过滤器或只有 FlateDecode 的流"""
+    for match in _STREAM_RE.finditer(data):
+        start = match.end()
+        end = data.find(_ENDSTREAM, start)
+        if end == -1:
+            return
+        dict_start = data.rfind(b'obj', max(0, match.start() - 2048), match.start())
+        header = data[dict_start if dict_start != -1 else max(0, match.start() - 512):match.start()]
+        if b'/Image' in header or b'/FontFile' in header or b'/Length1' in header:
+            continue
+        if b'/Filter' in header and (
+                b'/FlateDecode' not in header
+                or re.search(rb'/(DCT|JPX|JBIG2|CCITTFax|LZW|ASCII85)', header)):
+            continue
+        yield header, start, end
+
+
+def _stream_content(data, header, start, end):
+    """解码一个流的内容（最多 MAX_PDF_STREAM_SIZE 字节），无法解压时返回 None"""
+    raw = data[start:end]
+    if b'/Filter' not in header:
+        return raw[:MAX_PDF_STREAM_SIZE]
+    try:
+        # 长度可能多出行尾，用 decompressobj 忽略压缩流之后的字节
+        return zlib.decompressobj().decompress(raw, MAX_PDF_STREAM_SIZE)
+    except zlib.error:
+        return None
+
+
+def _unescape(literal):
+    def replace(match):
+        escape = match.group(1)
+        if escape[:1].isdigit():
+            return bytes([int(escape, 8) & 0xFF])
+        if escape in (b'\n', b'\r', b'\r\n'):
+            return b''  # 续行
+        return _ESCAPES.get(escape, escape)
+    return _ESCAPE_RE.sub(replace, literal)
+
+
+def _hex_bytes(text):
+    digits = re.sub(rb'\s', b'', text)
+    if len(digits) % 2:
+        digits += b'0'
+    return bytes.fromhex(digits.decode('ascii'))
+
+
+def _parse_cmap(content, cmap):
+    """把 ToUnicode CMap 的 bfchar/bfrange 映射加入 cmap（字符编码字节 -> 文字）"""
+    def unicode_of(hex_text):
+        try:
+            return _hex_bytes(hex_text).decode('utf-16-be', errors='ignore')
+        except ValueError:
+            return ''
+
+    for block in _BFCHAR_RE.findall(content):
+        values = _HEX_RE.findall(block)
+        for src, dst in zip(values[0::2], values[1::2]):
+            try:
+                cmap[_hex_bytes(src)] = unicode_of(dst)
+            except ValueError:
+                continue
+    for block in _BFRANGE_RE.findall(content):
+        for line in block.splitlines():
+            values = _HEX_RE.findall(line)
+            if len(values) < 3:
+                continue
+            try:
+                low, high = _hex_bytes(values[0]), _hex_bytes(values[1])
+                first = unicode_of(values[2])
+            except ValueError:
+                continue
+            if not first or len(low) != len(high):
+                continue
+            low_int, high_int = int.from_bytes(low, 'big'), int.from_bytes(high, 'big')
+            # 数组形式的目标（[<...> <...>]）用逐个给出的值
+            array_values = values[2:] if b'[' in line else None
+            for offset in range(min(high_int - low_int, 0xFFFF) + 1):
+                code = (low_int + offset).to_bytes(len(low), 'big')
+                if array_values is not None:
+                    if offset >= len(array_values):
+                        break
+                    cmap[code] = unicode_of(array_values[offset])
+                else:
+                    code_point = ord(first[-1]) + offset
+                    if code_point > 0x10FFFF:
+                        break
+                    cmap[code] = first[:-1] + chr(code_point)
+
+
+def _decode_pdf_string(data, cmap, code_width):
+    if data.startswith(b'\xfe\xff'):
+        return data[2:].decode('utf-16-be', errors='ignore')
+    if cmap:
+        width = code_width if len(data) % code_width == 0 else 1
+        chars = [cmap.get(data[i:i + width]) for i in range(0, len(data), width)]
+        if any(char is not None for char in chars):
+            return ''.join(char or '' for char in chars)
+    return data.decode('latin-1')
+
+
+def _content_text(content, cmap, code_width, out):
+    """从页面内容流中取出文字显示运算符的字符串"""
+    pending = []       # 运算符之前的操作数
+    in_array = False
+    array_parts = []
+    for token in _TEXT_TOKEN_RE.findall(content):
+        first = token[:1]
+        if first == b'(':
+            string = _decode_pdf_string(_unescape(token[1:-1]), cmap, code_width)
+            (array_parts if in_array else pending).append(string)
+        elif first == b'<':
+            try:
+                string = _decode_pdf_string(_hex_bytes(token[1:-1]), cmap, code_width)
+            except ValueError:
+                continue
+            (array_parts if in_array else pending).append(string)
+        elif token == b'[':
+            in_array, array_parts = True, []
+        elif token == b']':
+            in_array = False
+            pending.append(array_parts)
+        elif first.isdigit() or first in (b'-', b'.'):
+            if in_array:
+                try:
+                    if float(token) < _TJ_SPACE:
+                        array_parts.append(' ')
+                except ValueError:
+                    pass
+        else:
+            if token in (b'Tj', b'TJ', b"'", b'"'):
+                if token in (b"'", b'"'):
+                    out.append('\n')
+                for operand in pending:
+                    out.append(''.join(operand) if isinstance(operand, list) else operand)
+            elif token in (b'Td', b'TD', b'T*', b'ET', b'Tm'):
+                if out and out[-1] != '\n':
+                    out.append('\n')
+            pending = []
+
+
+def _pdf_text(filepath):
+    """PDF 按内存映射读取，流逐个解压，同一时间只保留一个流的内容
+
+    第一遍收集所有 ToUnicode CMap（不区分字体，足以还原常见的子集字体中文）并记下含文字的流，
+    第二遍只重新解压这些流取出文字。
+    """
+    if os.path.getsize(filepath) > MAX_PDF_SIZE:
+        return ''
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        cmap = {}
+        text_streams = []
+        for header, start, end in _pdf_streams(data):
+            content = _stream_content(data, header, start, end)
+            if content is None:
+                continue
+            if b'begincmap' in content:
+                _parse_cmap(content, cmap)
+            elif ((b'Tj' in content or b'TJ' in content)
+                  and not re.search(rb'/Type\s*/(XRef|ObjStm)', header)):
+                text_streams.append((header, start, end))
+        code_width = max((len(code) for code in cmap), default=1)
+        out = []
+        for header, start, end in text_streams:
+            _content_text(_stream_content(data, header, start, end), cmap, code_width, out)
+            out.append('\n')
+    return ''.join(out)
+
+
+_CONTROL_CHARS = dict.fromkeys(i for i in range(32) if chr(i) not in '\t\n\r')
+
+
+def extract_text(filepath):
+    """提取文档的文字，无法提取时返回空字符串"""
+    ext = os.path.splitext(filepath)[1].lower()
+    try:
+        if ext == '.docx':
+            text = _ooxml_text(filepath, ('word/document', 'word/header', 'word/footer',
+                                          'word/footnotes', 'word/endnotes'))
+        elif ext == '.pptx':
+            text = _ooxml_text(filepath, ('ppt/slides/slide', 'ppt/notesSlides/notesSlide'))
+        elif ext == '.xlsx':
+            text = _xlsx_text(filepath)
+        elif ext == '.pdf':
+            text = _pdf_text(filepath)
+        else:
+            return ''
+    except Exception:
+        return ''
+    # 去掉控制字符（空字节会让文本被当作二进制文件跳过）
+    return text.translate(_CONTROL_CHARS)
+
+
+def extract_to_file(filepath, text_path):
+    """在工作进程中提取文档文字并写入 text_path（UTF-8），返回写入的字节数
+
+    无法提取的文档也写入空文件，文档未修改前不再重复尝试。
+    """
+    data = extract_text(filepath).encode('utf-8', 'surrogatepass')
+    _write_text(text_path, data)
+    return len(data)
+
+
+def _write_text(text_path, data):
+    os.makedirs(os.path.dirname(text_path), exist_ok=True)
+    tmp_path = f"{text_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, text_path)
+
+
+class DocumentTextCache:
+    """提取文本的磁盘缓存（缓存目录下的 document_text/，每个文档版本一个文本文件）
+
+    文件名由 (路径, 大小, 修改时间) 计算，文档修改后自然对应新的文件，旧文件按最久未使用淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        self.text_dir = os.path.join(cache_dir, "document_text")
+        self.max_bytes = max_bytes
+        self._total = None  # 缓存文件总大小，第一次需要时统计
+        self._lock = threading.Lock()
+
+    def text_path(self, filepath, size, mtime):
+        key = f"{filepath}\0{size}\0{mtime}".encode('utf-8', 'surrogatepass')
+        return os.path.join(self.text_dir, hashlib.md5(key).hexdigest() + '.txt')
+
+    def store_empty(self, text_path):
+        """提取超时的文档写入空文本文件，文档未修改前不再重复尝试"""
+        try:
+            _write_text(text_path, b'')
+        except OSError:
+            pass
+
+    def lookup(self, filepath, size, mtime):
+        """已缓存时返回文本文件路径（并标记为最近使用），否则返回 None"""
+        text_path = self.text_path(filepath, size, mtime)
+        try:
+            os.utime(text_path)
+        except OSError:
+            return None
+        return text_path
+
+    def added(self, size):
+        """记录新写入的文本文件，超出上限时删除最久未使用的，直到降到上限的 80%"""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._entries())
+            else:
+                self._total += size
+            if self._total <= self.max_bytes:
+                return
+            for path, entry_size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+                if self._total <= self.max_bytes * 0.8:
+                    break
+                try:
+                    os.remove(path)
+                    self._total -= entry_size
+                except OSError:
+                    pass
+
+    def _entries(self):
+        """缓存中的 (路径, 大小, 最近使用时间)"""
+        result = []
+        try:
+            with os.scandir(self.text_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.txt'):
+                        try:
+                            st = entry.stat()
+                            result.append((entry.path, st.st_size, st.st_mtime))
+                        except OSError:
+                            pass
+        except OSError:
+            pass
+        return result
@@ -0,0 +1,217 @@
+"""编码检测与多编码字节模式匹配模块"""
+import codecs
+from functools import lru_cache
+
+from fuzzy_match import FuzzyPattern, effective_max_errors
+
+
+UTF8 = 'utf-8'
+GBK = 'gb18030'  # GB18030 兼容 GBK/GB2312，解码范围更大
+UTF16LE = 'utf-16-le'
+UTF16BE = 'utf-16-be'
+# 样本中只有 ASCII 字节时无法区分 UTF-8 和 GBK，两种编码都要匹配
+ASCII = 'ascii'
+
+UTF16_ENCODINGS = (UTF16LE, UTF16BE)
+PATTERN_ENCODINGS = (UTF8, GBK, UTF16LE, UTF16BE)
+
+
+def detect_encoding(sample):
+    """根据文件开头的字节样本检测编码"""
+    if not sample:
+        return ASCII
+
+    # BOM 优先
+    if sample.startswith(codecs.BOM_UTF8):
+        return UTF8
+    if sample.startswith(codecs.BOM_UTF16_LE):
+        return UTF16LE
+    if sample.startswith(codecs.BOM_UTF16_BE):
+        return UTF16BE
+
+    # 无 BOM 的 UTF-16：ASCII 字符的高位字节为 0，空字节集中在奇数或偶数位置
+    if b'\x00' in sample:
+        half = max(1, len(sample) // 2)
+        even_nulls = sample[0::2].count(0)
+        odd_nulls = sample[1::2].count(0)
+        if odd_nulls > half * 0.3 and even_nulls < half * 0.05:
+            return UTF16LE
+        if even_nulls > half * 0.3 and odd_nulls < half * 0.05:
+            return UTF16BE
+
+    if sample.isascii():
+        return ASCII
+
+    if _decodes_as(sample, UTF8):
+        return UTF8
+    if _decodes_as(sample, GBK):
+        return GBK
+    return UTF8
+
+
+def _decodes_as(sample, encoding):
+    """样本能否按指定编码严格解码（允许末尾被截断的多字节字符）"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def candidate_encodings(encoding):
+    """检测结果对应的需要匹配的编码列表"""
+    if encoding == ASCII:
+        return (UTF8, GBK)
+    return (encoding,)
+
+
+class _FallbackDecoder:
+    """先按 UTF-8 增量解码，遇到非法字节后切换为 GBK"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder(UTF8)()
+        self._fallback = False
+
+    def decode(self, data):
+        if not self._fallback:
+            try:
+                return self._decoder.decode(data)
+            except UnicodeDecodeError:
+                self._fallback = True
+                self._decoder = codecs.getincrementaldecoder(GBK)(errors='ignore')
+        return self._decoder.decode(data)
+
+
+def make_decoder(encoding):
+    """创建跨块安全的增量解码器"""
+    if encoding == ASCII:
+        return _FallbackDecoder()
+    return codecs.getincrementaldecoder(encoding)(errors='ignore')
+
+
+class KeywordPattern:
+    """单个关键字在各编码下的字节模式（预先计算，直接在原始字节上匹配）"""
+
+    __slots__ = ('text', 'needs_decode', 'patterns', 'max_errors', '_fuzzy')
+
+    def __init__(self, keyword, max_errors=0):
+        self.text = keyword.lower()
+        # 容错字符数（0 为精确匹配），短关键字会自动降低
+        self.max_errors = effective_max_errors(len(self.text), max_errors)
+        self._fuzzy = {}
+        # bytes.lower() 只转换 ASCII 字母；含非 ASCII 大小写字母时需解码后比较
+        self.needs_decode = any(ord(c) > 127 and c.lower() != c.upper() for c in keyword)
+        self.patterns = {}
+        for encoding in PATTERN_ENCODINGS:
+            try:
+                # 与待搜索字节做同样的 ASCII 小写处理，保持两边一致
+                self.patterns[encoding] = self.text.encode(encoding).lower()
+            except UnicodeEncodeError:
+                self.patterns[encoding] = None
+
+    def fuzzy(self, pattern):
+        """pattern（字节模式或小写文本）对应的近似匹配器，按需创建并缓存"""
+        matcher = self._fuzzy.get(pattern)
+        if matcher is None:
+            matcher = self._fuzzy[pattern] = FuzzyPattern(pattern, self.max_errors)
+        return matcher
+
+    def matches_text(self, text):
+        """在已解码并转为小写的文本中匹配"""
+        if not self.max_errors:
+            return self.text in text
+        return self.fuzzy(self.text).contains(text)
+
+
+@lru_cache(maxsize=64)
+def compile_keywords(keywords, max_errors=0):
+    """把关键字元组编译为字节模式（按搜索缓存，避免每个文件重复编码；忽略大小写去重）
+
+    max_errors > 0 时关键字按编辑距离不超过 max_errors 近似匹配。
+    """
+    unique = dict.fromkeys(kw.lower() for kw in keywords)
+    return tuple(KeywordPattern(kw, max_errors) for kw in unique)
+
+
+def _find_aligned(haystack, pattern):
+    """UTF-16 只接受偶数偏移处的匹配，避免跨码元的误匹配；返回偏移，未找到返回 -1"""
+    start = haystack.find(pattern)
+    while start != -1:
+        if start % 2 == 0:
+            return start
+        start = haystack.find(pattern, start + 1)
+    return -1
+
+
+class ChunkMatcher:
+    """对一块原始字节做多编码关键字匹配（块起始偏移需为偶数）"""
+
+    __slots__ = ('chunk', 'raw', 'encodings', '_decoded')
+
+    def __init__(self, chunk, encodings):
+        self.chunk = chunk
+        self.raw = chunk.lower()
+        self.encodings = encodings
+        self._decoded = None
+
+    def _decoded_texts(self):
+        if self._decoded is None:
+            self._decoded = [self.chunk.decode(enc, errors='ignore').lower() for enc in self.encodings]
+        return self._decoded
+
+    def _fuzzy_on_raw(self, keyword_pattern):
+        """ASCII 关键字在 UTF-8/GBK 中与原始字节一一对应，可直接在字节上近似匹配"""
+        return (not keyword_pattern.needs_decode and keyword_pattern.text.isascii()
+                and not any(encoding in UTF16_ENCODINGS for encoding in self.encodings))
+
+    def contains(self, keyword_pattern):
+        """关键字是否出现在本块中"""
+        if keyword_pattern.max_errors:
+            if self._fuzzy_on_raw(keyword_pattern):
+                return keyword_pattern.fuzzy(keyword_pattern.patterns[UTF8]).contains(self.raw)
+            return any(keyword_pattern.matches_text(text) for text in self._decoded_texts())
+
+        if keyword_pattern.needs_decode:
+            return any(keyword_pattern.text in text for text in self._decoded_texts())
+
+        for encoding in self.encodings:
+            pattern = keyword_pattern.patterns.get(encoding)
+            if pattern is None:
+                continue
+            if encoding in UTF16_ENCODINGS:
+                if _find_aligned(self.raw, pattern) != -1:
+                    return True
+            elif pattern in self.raw:
+                return True
+        return False
+
+    def find(self, keyword_pattern):
+        """关键字在本块中第一次出现的字节偏移，未找到（或需解码匹配）返回 -1"""
+        if keyword_pattern.max_errors:
+            if self._fuzzy_on_raw(keyword_pattern):
+                return keyword_pattern.fuzzy(keyword_pattern.patterns[UTF8]).find(self.raw)
+            return -1
+        best = -1
+        for encoding in self.encodings:
+            pattern = keyword_pattern.patterns.get(encoding)
+            if pattern is None or keyword_pattern.needs_decode:
+                continue
+            if encoding in UTF16_ENCODINGS:
+                index = _find_aligned(self.raw, pattern)
+            else:
+                index = self.raw.find(pattern)
+            if index != -1 and (best == -1 or index < best):
+                best = index
+        return best
+
+
+class TextMatcher:
+    """对已解码并转为小写的文本做关键字匹配（忽略注释模式），接口与 ChunkMatcher 相同"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def contains(self, keyword_pattern):
+        return keyword_pattern.matches_text(self.text)
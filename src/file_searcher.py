@@ -1,6 +1,37 @@
 """文件搜索核心模块"""
 import os
-from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import stat
+import time
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from archive_searcher import is_archive, search_archive
+from dedup import DuplicateFinder
+from document_text import EXTRACT_TIMEOUT, extract_to_file, is_document
+from device_pools import UNKNOWN_DEVICE, DevicePools, SearchStats, current_task
+from index_builder import ShardedIndexBuilder
+from io_scheduler import FirstResultScorer, LocalityScheduler, MatchHistory, PriorityScheduler
+from path_store import PathStore, SearchResult
+from query import TermStats, build_plan, keyword_plan
+from read_backends import get_backend
+from search_checkpoint import CHECKPOINT_INTERVAL, SearchCheckpoint, search_request
+from encoding_utils import (
+    UTF16_ENCODINGS, ChunkMatcher, TextMatcher, candidate_encodings, detect_encoding, make_decoder,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# 超过该大小的文件按字节区间切分后并行搜索
+LARGE_FILE_THRESHOLD = 32 * 1024 * 1024
+# 大文件模式下每个区间的大小
+LARGE_FILE_RANGE_SIZE = 16 * 1024 * 1024
+# 编码缓存最多记录的文件数（超过时淘汰最久未用的）
+ENCODING_CACHE_SIZE = 50000
 
 
 class FileSearcher:
@@ -9,15 +40,101 @@ class FileSearcher:
     def __init__(self, max_workers=None):
         # 大幅增加线程数以提高并行度（I/O密集型任务，CPU核心数的8-12倍）
         default_workers = (os.cpu_count() or 4) * 12
-        self.executor = ThreadPoolExecutor(max_workers=max_workers or default_workers)
+        self.max_workers = max_workers or default_workers
+        self._executor = None  # 线程池延迟到第一次搜索时创建，加快启动
+        self._range_executor = None  # 大文件区间搜索专用线程池，避免与文件级任务互相等待
+        self._archive_executor = None  # 压缩包解压搜索进程池（解压是CPU密集型）
+        self._document_executor = None  # 文档文本提取进程池（解析是CPU密集型）
+        self.document_cache = None  # 文档提取文本的缓存（DocumentTextCache），为 None 时不搜索文档
+        self._device_pools = None  # 文件搜索任务按设备（st_dev）划分的线程池
+        self._executor_lock = threading.Lock()
+        self._owner = None  # session() 创建的搜索器使用所有者的线程池和进程池
+        self._encoding_cache = OrderedDict()  # filepath -> ((size, mtime), encoding)，按最近使用排序
+        self._encoding_lock = threading.Lock()
+        self.read_backend = get_backend()  # 底层读取后端，可按搜索切换
+        self.path_store = None  # 当前搜索的文件路径存储，结果按 file_id 引用
+        self.term_stats = None  # 关键字选择度统计（TermStats），用于查询计划排序
+        self.first_result_time = None  # 最近一次搜索出现第一个结果的用时（秒），未找到为 None
+        self.last_generation = None  # 最近一次搜索的 (folder_path, 文件列表指纹)
+        self._seen_inodes = None  # 多根目录搜索时已搜索的 (st_dev, st_ino)，用于去重
+        self._seen_lock = threading.Lock()
         self.is_searching = False
     
+    @property
+    def executor(self):
+        """按需创建线程池"""
+        if self._owner is not None:
+            return self._owner.executor
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    @property
+    def device_pools(self):
+        """按需创建按设备划分的线程池（每个设备 max_workers 个线程，互不占用）"""
+        if self._owner is not None:
+            return self._owner.device_pools
+        if self._device_pools is None:
+            with self._executor_lock:
+                if self._device_pools is None:
+                    self._device_pools = DevicePools(self.max_workers)
+        return self._device_pools
+    
+    @property
+    def range_executor(self):
+        """按需创建大文件区间搜索线程池"""
+        if self._owner is not None:
+            return self._owner.range_executor
+        if self._range_executor is None:
+            with self._executor_lock:
+                if self._range_executor is None:
+                    self._range_executor = ThreadPoolExecutor(max_workers=(os.cpu_count() or 4) * 2)
+        return self._range_executor
+    
+    @property
+    def archive_executor(self):
+        """按需创建压缩包搜索进程池"""
+        if self._owner is not None:
+            return self._owner.archive_executor
+        if self._archive_executor is None:
+            with self._executor_lock:
+                if self._archive_executor is None:
+                    self._archive_executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 4)
+        return self._archive_executor
+    
+    @property
+    def document_executor(self):
+        """按需创建文档文本提取进程池"""
+        if self._owner is not None:
+            return self._owner.document_executor
+        if self._document_executor is None:
+            with self._executor_lock:
+                if self._document_executor is None:
+                    self._document_executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 4)
+        return self._document_executor
+    
+    def session(self):
+        """创建共享本搜索器线程池、进程池和编码缓存的搜索器
+
+        每个会话有自己的停止标志和搜索状态，可与其他会话并发搜索、单独停止（如搜索服务的每个连接）。
+        """
+        session = FileSearcher(self.max_workers)
+        session._owner = self
+        session._encoding_cache = self._encoding_cache
+        session._encoding_lock = self._encoding_lock
+        return session
+    
     def is_ascii_file(self, filepath):
-        """检测文件是否为 ASCII 文本文件"""
+        """检测文件是否为 ASCII 文本文件（docx/xlsx/pptx/pdf 按提取出的文本搜索，视为文本）"""
         try:
+            if is_document(filepath):
+                return True
+            
             # 检查文件扩展名，排除常见的二进制文件
             binary_extensions = {
-                '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+                '.doc', '.xls', '.ppt',
                 '.zip', '.rar', '.7z', '.tar', '.gz', '.bz2',
                 '.exe', '.dll', '.so', '.dylib',
                 '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.ico', '.svg',
@@ -113,200 +230,564 @@ class FileSearcher:
 
         return "".join(out), in_comment
 
-    def search_file(self, filepath, keywords, exclude_keywords=None, ignore_comments=False):
-        """在单个文件中搜索所有关键字，并排除包含排除关键字的文件（高性能版）"""
+    def _get_encoding(self, filepath, stat_result, sample):
+        """检测文件编码（按路径缓存，大小和修改时间不变时直接复用；最多缓存 ENCODING_CACHE_SIZE 个文件）"""
+        key = (stat_result.st_size, stat_result.st_mtime)
+        cache = self._encoding_cache
+        with self._encoding_lock:
+            cached = cache.get(filepath)
+            if cached and cached[0] == key:
+                cache.move_to_end(filepath)
+                return cached[1]
+        encoding = detect_encoding(sample)
+        with self._encoding_lock:
+            cache[filepath] = (key, encoding)
+            cache.move_to_end(filepath)
+            if len(cache) > ENCODING_CACHE_SIZE:
+                cache.popitem(last=False)
+        return encoding
+    
+    def _document_text(self, filepath, stat_result):
+        """文档提取文本的缓存文件路径；未缓存时在进程池中提取，未配置缓存或提取失败返回 None
+
+        提取超过 EXTRACT_TIMEOUT 秒时放弃等待（不再向看门狗报告进展），并写入空文本，之后的搜索直接跳过。
+        """
+        cache = self.document_cache
+        if cache is None:
+            return None
+        text_path = cache.lookup(filepath, stat_result.st_size, stat_result.st_mtime)
+        if text_path is not None:
+            return text_path
+        text_path = cache.text_path(filepath, stat_result.st_size, stat_result.st_mtime)
+        future = self.document_executor.submit(extract_to_file, filepath, text_path)
+        task = current_task()
+        deadline = time.monotonic() + EXTRACT_TIMEOUT
+        while True:
+            if not self.is_searching or (task is not None and task.stalled):
+                future.cancel()
+                return None
+            try:
+                size = future.result(timeout=1.0)
+                break
+            except FutureTimeoutError:
+                if time.monotonic() >= deadline:
+                    future.cancel()
+                    cache.store_empty(text_path)
+                    return None
+                # 提取在工作进程中进行，进程仍在运行时向看门狗报告进展
+                if task is not None:
+                    task.beat()
+            except Exception:
+                return None
+        cache.added(size)
+        return text_path
+    
+    def search_file(self, filepath, keywords, exclude_keywords=None, ignore_comments=False, max_errors=0,
+                    plan=None):
+        """在单个文件中搜索所有关键字，并排除包含排除关键字的文件（高性能版）
+        
+        max_errors > 0 时关键字按编辑距离近似匹配（排除关键字始终精确匹配）。
+        plan 为 search_files_parallel 编译好的查询计划（QueryPlan），为 None 时由关键字列表生成。
+        """
         try:
             if not self.is_searching:
                 return None
             # 快速检查文件扩展名，跳过明显的二进制文件
             ext = os.path.splitext(filepath)[1].lower()
-            if ext in {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.zip', '.rar', 
+            if ext in {'.doc', '.xls', '.zip', '.rar',
                       '.exe', '.dll', '.jpg', '.png', '.gif', '.mp4', '.mp3', '.avi',
                       '.bin', '.iso', '.dmg', '.tar', '.gz', '.7z', '.pyc', '.class'}:
                 return None
             
-            # 获取文件大小，跳过过大的文件（超过50MB）和空文件
+            # 获取文件大小，跳过空文件；FIFO、socket、设备文件打开或读取可能永久阻塞，一律跳过
             try:
-                file_size = os.path.getsize(filepath)
-                if file_size > 50 * 1024 * 1024 or file_size == 0:
+                stat_result = os.stat(filepath)
+                file_size = stat_result.st_size
+                if file_size == 0 or not stat.S_ISREG(stat_result.st_mode):
                     return None
             except:
                 return None
             
-            # 预先转换关键字为小写（避免重复转换）
-            keywords_lower = [kw.lower() for kw in keywords]
-            exclude_keywords_lower = [kw.lower() for kw in exclude_keywords] if exclude_keywords else []
+            # 多根目录搜索：硬链接或重叠路径指向同一文件时只搜索一次
+            if self._seen_inodes is not None and stat_result.st_ino:
+                file_id = (stat_result.st_dev, stat_result.st_ino)
+                with self._seen_lock:
+                    if file_id in self._seen_inodes:
+                        return None
+                    self._seen_inodes.add(file_id)
+            
+            # 查询计划（关键字已预编译为各编码的字节模式）
+            if plan is None:
+                plan = keyword_plan(tuple(keywords), tuple(exclude_keywords or ()), max_errors)
+            evaluation = plan.evaluate(filepath, (file_size, stat_result.st_mtime))
+            
+            # 只靠路径和元数据条件即可确定结果时不读取内容
+            state = evaluation.state()
+            if state is False:
+                return None
+            if state is True and not plan.excludes:
+                return (filepath, file_size / 1024, None)
+            
+            # 文档：在提取出的文本（缓存的 UTF-8 文件）上匹配，结果仍报告文档本身
+            read_path, read_stat = filepath, stat_result
+            if is_document(filepath):
+                read_path = self._document_text(filepath, stat_result)
+                if read_path is None:
+                    return None
+                read_stat = os.stat(read_path)
+                ext = '.txt'
             
             # 使用流式读取和快速搜索算法
             chunk_size = 131072  # 128KB块，提高I/O效率
-            overlap_size = 1024  # 1KB重叠区防止跨块匹配
+            overlap_size = 1024  # 1KB重叠区防止跨块匹配（偶数，保持UTF-16对齐）
             
-            found_keywords = set()
-            previous_chunk = b''
-            in_comment = False
-            tail_text = ""
+            # 大文件：切分为重叠的字节区间并行搜索（忽略注释模式依赖跨块的行状态，仍顺序读取）
+            if read_stat.st_size > LARGE_FILE_THRESHOLD and not ignore_comments:
+                matched = self._search_large_file(read_path, read_stat, ext, evaluation, chunk_size, overlap_size)
+            else:
+                matched = self._scan_file(read_path, read_stat, ext, evaluation, ignore_comments,
+                                          chunk_size, overlap_size)
+            if matched:
+                # 文档的命中偏移在提取出的文本中，对文档本身没有意义
+                return (filepath, file_size / 1024, evaluation.hit_offset if read_path == filepath else None)
+            return None
             
-            try:
-                with open(filepath, 'rb') as f:
-                    while True:
-                        if not self.is_searching:
+        except Exception:
+            return None
+    
+    def _scan_file(self, filepath, stat_result, ext, evaluation, ignore_comments, chunk_size, overlap_size):
+        """顺序读取文件并推进查询求值，返回是否命中（被停止或无法读取时返回 None）
+
+        第一处命中的字节偏移记录在 evaluation.hit_offset（忽略注释模式在解码后的文本上匹配，不记录）。
+        """
+        previous_chunk = b''
+        position = 0  # 已读取的字节数
+        in_comment = False
+        tail_text = ""
+        encodings = None
+        decoder = None
+        complete = False
+        task = current_task()  # 每读完一块向看门狗报告进展
+        
+        try:
+            with self.read_backend.open(filepath) as f:
+                while True:
+                    if not self.is_searching:
+                        return None
+                    if task is not None:
+                        if task.stalled:
                             return None
-                        chunk = f.read(chunk_size)
-                        if not chunk:
+                        task.beat()
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        complete = True
+                        break
+                    base = position - len(previous_chunk)
+                    position += len(chunk)
+                    if encodings is None or ignore_comments:
+                        # 读取后端可能返回复用缓冲区的视图，需要检测或解码的数据先复制成 bytes
+                        chunk = bytes(chunk)
+                    
+                    if encodings is None:
+                        # 第一块：检测编码（UTF-16 含大量空字节，不做二进制判断）
+                        encoding = self._get_encoding(filepath, stat_result, chunk)
+                        encodings = candidate_encodings(encoding)
+                        if encoding not in UTF16_ENCODINGS and ext != '.dat':
+                            # 只检查开头几KB，减少检测开销
+                            sample_size, null_limit = (8192, 100) if ignore_comments else (4096, 50)
+                            if chunk[:sample_size].count(b'\x00') > null_limit:
+                                return None
+                        decoder = make_decoder(encoding)
+                    
+                    if not ignore_comments:
+                        # 与上一块的尾部合并，避免跨块匹配丢失；直接在原始字节上匹配
+                        state = evaluation.scan(ChunkMatcher(previous_chunk + chunk, encodings), base)
+                        
+                        # 排除关键字出现或查询已确定（如所有关键字都找到了），提前返回
+                        if state is not None:
+                            return state
+                        
+                        # 保存块尾部用于下次合并
+                        if len(chunk) == chunk_size:  # 不是最后一块
+                            previous_chunk = bytes(chunk[-overlap_size:])
+                        else:
+                            complete = True
                             break
+                    else:
+                        # 忽略注释模式：按检测到的编码增量解码，再按行移除$后的内容
+                        text = decoder.decode(chunk)
+                        
+                        text, in_comment = self._strip_comments_stream(text, in_comment)
+                        if not text and not in_comment:
+                            continue
+                        
+                        searchable = (tail_text + text).lower()
                         
-                        if not ignore_comments:
-                            # 与上一块的尾部合并，避免跨块匹配丢失
-                            search_chunk = previous_chunk + chunk
-                            
-                            # 快速二进制文件检测（只检查第一块）
-                            if not previous_chunk and ext != '.dat':
-                                # 只检查前4KB，减少检测开销
-                                sample = search_chunk[:4096]
-                                null_count = sample.count(b'\x00')
-                                if null_count > 50:
-                                    return None
-                            
-                            # 尝试解码（UTF-8优先，简化错误处理）
-                            try:
-                                text = search_chunk.decode('utf-8', errors='ignore').lower()
-                            except:
-                                text = search_chunk.decode('latin-1', errors='ignore').lower()
-                            
-                            # 先检查排除关键字（如果有）- 一旦找到立即返回
-                            if exclude_keywords_lower:
-                                for exclude_kw in exclude_keywords_lower:
-                                    if exclude_kw in text:
-                                        return None
-                            
-                            # 检查所有待查找的关键字
-                            for kw in keywords_lower:
-                                if kw not in found_keywords and kw in text:
-                                    found_keywords.add(kw)
-                            
-                            # 所有关键字都找到了，提前返回
-                            if len(found_keywords) == len(keywords_lower):
-                                size_kb = file_size / 1024
-                                return (filepath, size_kb)
-                            
-                            # 保存块尾部用于下次合并
-                            if len(chunk) == chunk_size:  # 不是最后一块
-                                previous_chunk = search_chunk[-overlap_size:]
-                            else:
-                                break
+                        state = evaluation.scan(TextMatcher(searchable))
+                        if state is not None:
+                            return state
+                        
+                        if len(searchable) > overlap_size:
+                            tail_text = searchable[-overlap_size:]
                         else:
-                            # 忽略注释模式：按行移除$后的内容
-                            if ext != '.dat' and not previous_chunk:
-                                null_count = chunk[:8192].count(b'\x00')
-                                if null_count > 100:
-                                    return None
-                            
-                            try:
-                                text = chunk.decode('utf-8', errors='ignore')
-                            except:
-                                try:
-                                    text = chunk.decode('gbk', errors='ignore')
-                                except:
-                                    text = chunk.decode('latin-1')
-                            
-                            text, in_comment = self._strip_comments_stream(text, in_comment)
-                            if not text and not in_comment:
-                                continue
-                            
-                            searchable = (tail_text + text).lower()
-                            
-                            if exclude_keywords_lower:
-                                for exclude_kw in exclude_keywords_lower:
-                                    if exclude_kw in searchable:
-                                        return None
-                            
-                            for kw in keywords_lower:
-                                if kw not in found_keywords and kw in searchable:
-                                    found_keywords.add(kw)
-                            
-                            if len(found_keywords) == len(keywords_lower):
-                                size_kb = file_size / 1024
-                                return (filepath, size_kb)
-                            
-                            if len(searchable) > overlap_size:
-                                tail_text = searchable[-overlap_size:]
-                            else:
-                                tail_text = searchable
-            except:
-                return None
-            
-            # 文件读完了，检查是否所有关键字都找到
-            if len(found_keywords) == len(keywords_lower):
-                size_kb = file_size / 1024
-                return (filepath, size_kb)
-            
-            return None
-            
-        except Exception:
+                            tail_text = searchable
+        except:
             return None
+        finally:
+            evaluation.record(self.term_stats, complete)
+        
+        # 文件读完了，未找到的关键字视为不存在
+        return evaluation.finish()
     
-    def get_all_files(self, folder_path):
-        """递归获取文件夹下的所有文件"""
-        all_files = []
+    def _search_large_file(self, filepath, stat_result, ext, evaluation, chunk_size, overlap_size):
+        """大文件模式：按重叠字节区间并行搜索，各区间共同推进同一个查询求值
+
+        各区间同时读取，evaluation.hit_offset 记录的是最先被找到的命中，不一定是文件中的第一处。
+        """
+        file_size = stat_result.st_size
         try:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    all_files.append(os.path.join(root, file))
+            with self.read_backend.open(filepath) as f:
+                sample = bytes(f.read(65536))
+        except OSError:
+            return False
+        
+        encoding = self._get_encoding(filepath, stat_result, sample)
+        encodings = candidate_encodings(encoding)
+        # 快速二进制文件检测（只检查文件开头）
+        if encoding not in UTF16_ENCODINGS and ext != '.dat':
+            if sample[:4096].count(b'\x00') > 50:
+                return False
+        
+        stop_event = threading.Event()
+        # 区间在其他线程中读取，由它们代为向看门狗报告本文件任务的进展
+        task = current_task()
+        
+        def scan_range(start, end):
+            """搜索 [start, end) 区间，end 之后额外多读 overlap_size 字节处理跨区间匹配"""
+            read_end = min(file_size, end + overlap_size)
+            previous_chunk = b''
+            with self.read_backend.open(filepath) as f:
+                pos = start
+                while pos < read_end:
+                    if stop_event.is_set() or not self.is_searching or (task is not None and task.stalled):
+                        return
+                    # 按位置读取，不依赖共享的文件指针
+                    chunk = f.pread(pos, min(chunk_size, read_end - pos))
+                    if task is not None:
+                        task.beat()
+                    if not chunk:
+                        break
+                    base = pos - len(previous_chunk)
+                    pos += len(chunk)
+                    
+                    # 已找到的关键字集合在各区间之间共享：排除关键字出现或查询已确定时停止其他区间
+                    if evaluation.scan(ChunkMatcher(previous_chunk + chunk, encodings), base) is not None:
+                        stop_event.set()
+                        return
+                    
+                    previous_chunk = bytes(chunk[-overlap_size:])
+        
+        futures = [self.range_executor.submit(scan_range, start, min(start + LARGE_FILE_RANGE_SIZE, file_size))
+                   for start in range(0, file_size, LARGE_FILE_RANGE_SIZE)]
+        try:
+            for future in futures:
+                future.result()
         except Exception:
-            pass
+            stop_event.set()
+            return False
+        
+        if not self.is_searching:
+            return False
+        complete = not stop_event.is_set()
+        evaluation.record(self.term_stats, complete)
+        state = evaluation.state()
+        if state is not None:
+            return state
+        return evaluation.finish()
+    
+    def get_all_files(self, folder_path, rules=None, checkpoint_dir=None, progress_callback=None,
+                      should_stop=None):
+        """递归获取文件夹下的所有文件（返回紧凑的 PathStore），rules 为遍历时的忽略规则
+        
+        子目录较多时按子树分片在多个进程中并行遍历；指定 checkpoint_dir 时每个完成的分片
+        写入检查点，被 should_stop 中断时返回 None，下次从检查点继续。
+        """
+        try:
+            return ShardedIndexBuilder(checkpoint_dir).build(folder_path, rules, progress_callback, should_stop)
+        except Exception as e:
+            logger.error(f"扫描文件夹失败: {folder_path}: {e}")
+            return PathStore()
+    
+    def _normalize_roots(self, roots):
+        """去掉重复的根目录以及被其他根目录包含的子目录"""
+        normalized = []
+        for root in roots:
+            real = os.path.normcase(os.path.realpath(root))
+            normalized.append((real, root))
+        # 按路径长度排序，保证父目录先于子目录被处理
+        normalized.sort(key=lambda item: len(item[0]))
+        
+        kept = []
+        for real, root in normalized:
+            if any(real == parent or real.startswith(parent.rstrip(os.sep) + os.sep) for parent, _ in kept):
+                continue
+            kept.append((real, root))
+        
+        kept_roots = {root for _, root in kept}
+        return [root for root in roots if root in kept_roots]
+    
+    def _load_file_list(self, folder_path, cache_manager, progress_callback, rules=None):
+        """加载单个根目录的文件列表（优先使用缓存）"""
+        all_files = cache_manager.load_file_cache(folder_path, rules)
+        
+        if all_files is None:
+            # 扫描文件夹
+            progress_callback(f"正在扫描文件夹: {folder_path}", 0, 0)
+            all_files = self.get_all_files(folder_path, rules, os.path.join(cache_manager.cache_dir, "index_build"),
+                                           progress_callback, lambda: not self.is_searching)
+            if all_files is None:
+                # 扫描被停止，已完成的分片保留在检查点中，不写入缓存
+                return PathStore()
+            # 保存到缓存
+            cache_manager.save_file_cache(folder_path, all_files, rules)
+        else:
+            if isinstance(all_files, list):
+                # 旧版缓存保存的是路径列表
+                all_files = PathStore.from_paths(all_files)
+            progress_callback(f"使用缓存文件列表，共 {len(all_files)} 个文件", 0, 0)
         return all_files
     
     def search_files_parallel(self, folder_path, keywords, extensions, exclude_keywords,
                             ignore_comments,
                             cache_manager,
-                            progress_callback, result_callback, stats_callback):
-        """并行搜索文件（每次都重新搜索内容，仅缓存文件列表）"""
+                            progress_callback, result_callback, stats_callback,
+                            search_archives=False, locality_order=False, read_backend=None,
+                            dedupe=False, ignore_rules=None, exporter=None, export_only=False,
+                            max_errors=0, query=None, priority_score=None, resume=False,
+                            resumable=True):
+        """并行搜索文件（每次都重新搜索内容，仅缓存文件列表）
+        
+        文件以 PathStore 中的 file_id 在调度器和任务之间传递，结果为 SearchResult 记录，
+        result_callback 收到的也是 SearchResult，路径按需解析。
+        
+        folder_path 可以是单个路径，也可以是多个根目录的列表：多个根目录在同一线程池中
+        并发扫描和搜索，共用同一个停止标志，重叠路径和硬链接只搜索一次。
+        
+        search_archives 为 True 时，压缩包交给进程池流式解压搜索，
+        命中的成员以 archive.zip!/inner/path 的形式返回。
+        
+        locality_order 为 True 时按 (设备, 目录, inode) 顺序提交读取，并限制每个设备的
+        在途读取数，减少机械硬盘和冷缓存网络盘上的随机寻道。
+        
+        文件搜索任务按所在设备（st_dev）提交到各自独立的线程池（device_pools），每个设备分别限制
+        在途任务数并统计耗时，慢设备不会拖慢其他设备；各设备的耗时统计在搜索结束时输出到日志。
+        
+        read_backend 选择底层读取方式（buffered/pooled/fadvise），搜索结束时输出读取统计。
+        
+        dedupe 为 True 时先找出内容相同的文件，每组只搜索一个代表，结果分发给所有副本
+        （压缩包副本得到相同的成员命中；查询含路径或元数据条件时副本结果可能不同，不去重）。
+        
+        ignore_rules（IgnoreRules）在遍历时剪掉被忽略的目录和文件，它们不会被列出、stat 或缓存。
+        
+        exporter（ResultExporter）在结果产生时立即写入文件；export_only 为 True 时结果只写入
+        导出文件，不回调 result_callback 也不保留在返回列表中，内存占用不随结果数增长。
+        
+        max_errors > 0 时关键字允许最多 max_errors 个字符的编辑错误（模糊匹配）。
+        
+        query 为布尔查询文本（AND/OR/NOT/括号/路径条件，见 query 模块），给出时代替 keywords；
+        查询计划按以往搜索统计的关键字选择度排序检查顺序，路径条件在读取内容之前过滤文件。
+        
+        未按磁盘位置排序时，文件按 priority_score(path, stat) 从小到大提交（stat 为文件列表中记录的
+        (大小, 修改时间) 或 None），默认为 FirstResultScorer：小文件、最近修改的文件、以往命中过的
+        文件和命中率高的后缀名优先，让第一个结果尽早出现。出现第一个结果的用时记录在
+        first_result_time 中并输出到日志。
+        
+        搜索过程中定期把进度写入检查点（条件、文件列表指纹、已完成文件的位图和已找到的结果），
+        搜索被停止时也会保存，正常完成后删除。resume 为 True 时若检查点的条件和文件列表都未变化，
+        先报告检查点中的结果，再只搜索剩余的文件；检查点中记录了导出文件的写入位置，导出文件从该位置
+        接续写入（export_only 时结果只在导出文件中，导出文件无法接续时重新开始搜索）。
+        resumable 为 False 的后台搜索（如实时搜索）不读写检查点。
+        """
+        started = time.perf_counter()
+        self.first_result_time = None
         self.is_searching = True
         found_count = 0
+        self.read_backend = get_backend(read_backend)
+        self.document_cache = cache_manager.document_text_cache
+        self.term_stats = TermStats(cache_manager.load_term_stats())
+        plan = build_plan(keywords, exclude_keywords, max_errors, query, self.term_stats)
         
-        # 尝试从缓存加载文件列表
-        all_files = cache_manager.load_file_cache(folder_path)
+        roots = [folder_path] if isinstance(folder_path, str) else self._normalize_roots(list(folder_path))
         
-        if all_files is None:
-            # 扫描文件夹
-            progress_callback("正在扫描文件夹...", 0, 0)
-            all_files = self.get_all_files(folder_path)
-            # 保存到缓存
-            cache_manager.save_file_cache(folder_path, all_files)
+        if len(roots) == 1:
+            self._seen_inodes = None
+            store = self._load_file_list(roots[0], cache_manager, progress_callback, ignore_rules)
         else:
-            progress_callback(f"使用缓存文件列表，共 {len(all_files)} 个文件", 0, 0)
+            self._seen_inodes = set()
+            # 多个根目录并发加载文件列表（根目录已去重，不会有重复路径）
+            list_futures = [self.executor.submit(self._load_file_list, root, cache_manager, progress_callback,
+                                                 ignore_rules)
+                            for root in roots]
+            store = PathStore()
+            for future in list_futures:
+                store.extend(future.result())
+            progress_callback(f"{len(roots)} 个根目录共 {len(store)} 个文件", 0, 0)
+        self.path_store = store
         
-        # 根据后缀名过滤文件（优化：提前转换扩展名集合）
+        # 根据后缀名过滤文件（优化：提前转换扩展名集合，只看文件名不拼接完整路径）
+        file_ids = store.ids()
         if extensions:
             ext_set = set(ext.lower() for ext in extensions)
-            filtered_files = [f for f in all_files if os.path.splitext(f)[1].lower() in ext_set]
-            progress_callback(f"后缀名过滤：{len(all_files)} → {len(filtered_files)} 个文件", 0, 0)
-            all_files = filtered_files
+            filtered_ids = array('I', (file_id for file_id in file_ids
+                                       if os.path.splitext(store.name(file_id))[1].lower() in ext_set))
+            progress_callback(f"后缀名过滤：{len(file_ids)} → {len(filtered_ids)} 个文件", 0, 0)
+            file_ids = filtered_ids
         
-        total_files = len(all_files)
+        # 文件列表中记录的大小为 0 的文件无需提交搜索（列表随目录修改时间失效，不会过时）
+        filtered_ids = array('I', (file_id for file_id in file_ids
+                                   if (store.stat(file_id) or (1,))[0] != 0))
+        if len(filtered_ids) != len(file_ids):
+            progress_callback(f"跳过空文件：{len(file_ids)} → {len(filtered_ids)} 个文件", 0, 0)
+            file_ids = filtered_ids
         
-        if total_files == 0:
-            progress_callback("文件夹中没有文件", 0, 0)
+        # 查询中的路径和元数据条件：用文件列表中记录的大小和修改时间求值，
+        # 不读取内容、也不逐个 stat 即可排除的文件直接去掉（压缩包按内部路径判断，保留）
+        if plan.path_predicates:
+            filtered_ids = array('I', (file_id for file_id in file_ids
+                                       if (search_archives and is_archive(store.name(file_id)))
+                                       or plan.path_state(store.path(file_id), store.stat(file_id)) is not False))
+            progress_callback(f"路径条件过滤：{len(file_ids)} → {len(filtered_ids)} 个文件", 0, 0)
+            file_ids = filtered_ids
+        
+        # 内容去重：副本不参与搜索，代表命中时一起报告。
+        # 查询含路径或元数据条件时副本的结果可能与代表不同（如 name:x OR 关键字），不去重
+        duplicates = {}
+        if dedupe and plan.path_predicates:
+            progress_callback("查询含路径或元数据条件，不进行内容去重", 0, 0)
+        elif dedupe and len(file_ids) > 1:
+            progress_callback("正在查找内容相同的文件...", 0, 0)
+            hash_cache = cache_manager.load_hash_cache()
+            
+            def meta_of(file_id):
+                # 遍历时记录的元数据；没有 inode（旧版缓存、Windows）时由 find_groups 自行 stat
+                stat, inode = store.stat(file_id), store.inode(file_id)
+                if stat is None or not inode:
+                    return None
+                return (store.device(file_id), inode, stat[0], stat[1])
+            
+            duplicates = DuplicateFinder(hash_cache, self.executor).find_groups(file_ids, store.path, meta_of)
+            cache_manager.save_hash_cache(hash_cache)
+            if duplicates:
+                skipped = {dup for dups in duplicates.values() for dup in dups}
+                file_ids = array('I', (file_id for file_id in file_ids if file_id not in skipped))
+                progress_callback(f"内容去重：跳过 {len(skipped)} 个重复文件", 0, 0)
+        
+        if not self.is_searching:
+            # 加载文件列表时已停止，保留原有的检查点
             self.is_searching = False
             return []
         
-        progress_callback(f"准备搜索 {total_files} 个文件...", 0, total_files)
+        # 可续搜的检查点：file_id 只在文件列表不变时有效，用指纹校验
+        request = search_request(folder_path, keywords, extensions, exclude_keywords, ignore_comments,
+                                 search_archives, dedupe, max_errors, query, ignore_rules)
+        generation = store.fingerprint() if resumable else None
+        self.last_generation = (folder_path, generation)
+        checkpoint = None
+        if resume and resumable:
+            checkpoint = SearchCheckpoint.from_dict(cache_manager.load_search_checkpoint())
+            if checkpoint is None or not checkpoint.matches(request, generation):
+                progress_callback("没有可继续的搜索（条件或文件列表已变化），重新开始搜索", 0, 0)
+                checkpoint = None
+        
+        # 继续搜索时导出文件从检查点记录的位置接着写；仅导出的结果不在检查点中，
+        # 导出文件无法接续（如已被删除或改为其他文件）时只能重新开始
+        export_resumed = False
+        if checkpoint is not None and exporter is not None:
+            export_resumed = exporter.resume(checkpoint.export)
+            if not export_resumed and export_only:
+                progress_callback("导出文件与上次搜索不一致，无法接续导出，重新开始搜索", 0, 0)
+                checkpoint = None
+        if exporter is not None:
+            exporter.begin()
         
-        # 并行处理文件（批量提交任务）
-        processed = 0
         search_results = []
+        if checkpoint is not None:
+            # 先报告上次已找到的结果，再只搜索剩余的文件
+            resumed_store = PathStore()
+            for path, size_kb, hit_offset in checkpoint.results:
+                record = SearchResult(resumed_store, resumed_store.add(path), size_kb, hit_offset)
+                found_count += 1
+                if exporter is not None and not export_resumed:
+                    exporter.write(record)
+                if not export_only:
+                    search_results.append(record)
+                    result_callback(record)
+            if export_resumed and export_only:
+                found_count = exporter.count
+            if found_count:
+                stats_callback(found_count)
+            remaining_ids = array('I', (file_id for file_id in file_ids if not checkpoint.is_done(file_id)))
+            progress_callback(f"继续上次搜索：已完成 {len(file_ids) - len(remaining_ids)} 个文件，"
+                              f"找到 {found_count} 个，剩余 {len(remaining_ids)} 个", 0, 0)
+            file_ids = remaining_ids
+        else:
+            checkpoint = SearchCheckpoint(request, len(store), generation)
         
-        # 批量提交所有任务，减少提交开销
-        if not self.is_searching:
+        total_files = len(file_ids)
+        
+        if total_files == 0:
+            progress_callback("文件夹中没有文件" if not found_count else
+                              f"搜索完成！共找到 {found_count} 个匹配文件", 0, 0)
+            if resumable:
+                cache_manager.clear_search_checkpoint()
             self.is_searching = False
-            return []
+            return search_results
+        
+        progress_callback(f"准备搜索 {total_files} 个文件...", 0, total_files)
         
-        futures = [self.executor.submit(self.search_file, filepath, keywords, exclude_keywords, ignore_comments) 
-                   for filepath in all_files]
+        processed = 0
+        checkpoint_saved = time.monotonic()
+        
+        archive_futures = set()
+        # 压缩包成员路径单独存放，不能混入可能被缓存复用的文件列表
+        archive_store = PathStore()
+        future_ids = {}
+        # 文件搜索按所在设备分配到各自的线程池，网络盘/U 盘上的慢读取不会占满本地磁盘的线程
+        # 设备号取自文件列表，分配和排序时不 stat（挂起的网络盘不会卡住这里）；
+        # 线程池由所有会话共用，耗时统计按本次搜索单独记录
+        device_pools = self.device_pools
+        search_stats = SearchStats()
+        
+        def device_of(file_id):
+            return store.device(file_id) or UNKNOWN_DEVICE
+        
+        def submit(file_id):
+            filepath = store.path(file_id)
+            if search_archives and is_archive(filepath):
+                future = self.archive_executor.submit(search_archive, filepath, keywords, exclude_keywords,
+                                                     max_errors, plan)
+                archive_futures.add(future)
+            else:
+                dev = device_of(file_id)
+                future = device_pools.pool(dev).submit_tracked(
+                    search_stats.device(dev), self.search_file, filepath, keywords, exclude_keywords,
+                    ignore_comments, max_errors, plan)
+            future_ids[future] = file_id
+            return future
+        
+        history = MatchHistory(cache_manager.load_match_history())
+        if locality_order:
+            progress_callback(f"正在按磁盘位置排序 {total_files} 个文件...", 0, total_files)
+            scheduler = LocalityScheduler(file_ids, store.dir_path, device_of, store.inode)
+        else:
+            # 按评分排序；每个设备只保持有限的在途任务，不为所有文件一次性创建 Future
+            scheduler = PriorityScheduler(file_ids, store.path, store.stat,
+                                          priority_score or FirstResultScorer(history), self.max_workers * 4,
+                                          device_of, lambda dev: device_pools.pool(dev).max_workers * 4)
+        pending = {submit(file_id) for file_id in scheduler.next_batch()}
         
         # 收集结果（优化进度更新频率）
         update_interval = max(1, total_files // 100)  # 最多更新100次
-        pending = set(futures)
         while pending:
             if not self.is_searching:
                 for future in pending:
@@ -315,29 +796,93 @@ class FileSearcher:
 
             done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
             for future in done:
+                file_id = future_ids.pop(future)
+                scheduler.task_done(file_id)
                 if not self.is_searching:
                     continue
 
                 processed += 1
-                result = future.result()
+                try:
+                    result = future.result()
+                    checkpoint.mark_done(file_id)
+                except TimeoutError:
+                    # 读取卡住被看门狗跳过，不记为已完成，继续搜索时重试
+                    result = None
+                except Exception:
+                    result = None
+                    checkpoint.mark_done(file_id)
 
-                if result:
-                    filepath, size_kb = result
+                if future in archive_futures:
+                    # 压缩包任务返回命中成员列表；相同内容的压缩包副本有相同的成员命中
+                    members = result or []
+                    hits = [SearchResult(archive_store, archive_store.add(path), size_kb)
+                            for path, size_kb in members]
+                    if members and file_id in duplicates:
+                        archive_path = store.path(file_id)
+                        for dup_id in duplicates[file_id]:
+                            dup_path = store.path(dup_id)
+                            hits.extend(SearchResult(archive_store,
+                                                     archive_store.add(dup_path + path[len(archive_path):]), size_kb)
+                                        for path, size_kb in members)
+                else:
+                    hits = [SearchResult(store, file_id, result[1], result[2])] if result else []
+                    history.record(store.name(file_id), result[0] if result else None)
+                    if hits and file_id in duplicates:
+                        hits.extend(SearchResult(store, dup_id, result[1], result[2])
+                                    for dup_id in duplicates[file_id])
+                if hits and self.first_result_time is None:
+                    self.first_result_time = time.perf_counter() - started
+                for record in hits:
                     found_count += 1
-                    search_results.append((filepath, size_kb))
-                    result_callback(filepath, size_kb)
+                    if exporter is not None:
+                        exporter.write(record)
+                    if not export_only:
+                        search_results.append(record)
+                        result_callback(record)
+                        checkpoint.add_result(record.path, record.size_kb, record.hit_offset)
                     stats_callback(found_count)
 
                 # 减少进度更新频率（每处理多个文件更新一次，或找到结果时立即更新）
-                if processed % update_interval == 0 or result or processed == total_files:
+                if processed % update_interval == 0 or hits or processed == total_files:
                     progress_callback(f"已搜索 {processed}/{total_files} 个文件，找到 {found_count} 个", processed, total_files)
+            
+            # 补充新的读取任务
+            if self.is_searching:
+                pending |= {submit(file_id) for file_id in scheduler.next_batch()}
+            
+            # 定期保存检查点，崩溃或关闭程序后也能继续
+            if resumable and time.monotonic() - checkpoint_saved >= CHECKPOINT_INTERVAL:
+                if exporter is not None:
+                    checkpoint.export = exporter.state()
+                cache_manager.save_search_checkpoint(checkpoint.to_dict())
+                checkpoint_saved = time.monotonic()
 
+        logger.info(f"读取后端 {self.read_backend.name}: {self.read_backend.stats.summary()}")
+        search_stats.log(device_pools)
+        stalled = search_stats.stalled_count()
+        cache_manager.save_term_stats(self.term_stats.to_dict())
+        cache_manager.save_match_history(history.to_dict())
+        if resumable:
+            if self.is_searching:
+                cache_manager.clear_search_checkpoint()
+            else:
+                if exporter is not None:
+                    checkpoint.export = exporter.state()
+                cache_manager.save_search_checkpoint(checkpoint.to_dict())
+        summary = f"，{stalled} 个文件读取卡住已跳过" if stalled else ""
+        if self.first_result_time is not None:
+            summary += f"，首个结果用时 {self.first_result_time * 1000:.0f}ms"
+            logger.info(f"首个结果用时 {self.first_result_time * 1000:.0f}ms，"
+                        f"总用时 {(time.perf_counter() - started) * 1000:.0f}ms")
         if self.is_searching:
-            progress_callback(f"搜索完成！共处理 {processed} 个文件，找到 {found_count} 个匹配文件", processed, total_files)
+            progress_callback(f"搜索完成！共处理 {processed} 个文件，找到 {found_count} 个匹配文件{summary}",
+                              processed, total_files)
         else:
-            progress_callback(f"搜索已停止，共处理 {processed} 个文件，找到 {found_count} 个匹配文件", processed, total_files)
+            progress_callback(f"搜索已停止，共处理 {processed} 个文件，找到 {found_count} 个匹配文件{summary}",
+                              processed, total_files)
 
         self.is_searching = False
+        self._seen_inodes = None
 
         return search_results
     
@@ -346,5 +891,16 @@ class FileSearcher:
         self.is_searching = False
     
     def shutdown(self):
-        """关闭线程池"""
-        self.executor.shutdown(wait=False)
+        """关闭线程池和进程池（会话的池属于所有者，不关闭）"""
+        if self._owner is not None:
+            return
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._device_pools is not None:
+            self._device_pools.shutdown()
+        if self._range_executor is not None:
+            self._range_executor.shutdown(wait=False)
+        if self._archive_executor is not None:
+            self._archive_executor.shutdown(wait=False, cancel_futures=True)
+        if self._document_executor is not None:
+            self._document_executor.shutdown(wait=False, cancel_futures=True)
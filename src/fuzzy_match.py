@@ -0,0 +1,112 @@
+"""近似（容错）匹配模块：在文本中查找编辑距离不超过 k 的关键字
+
+采用"分段过滤 + 位并行验证"：
+1. 关键字切成 k+1 段，任何编辑距离 <= k 的匹配至少包含其中一段的精确出现（抽屉原理），
+   用 bytes/str 的 find 快速定位候选位置；
+2. 候选位置附近的窗口用 Myers 位并行算法验证，每个字符只需常数次整数位运算。
+
+pattern 和 text 可以是 bytes 或 str（两者类型一致），调用方负责统一大小写。
+"""
+
+
+def effective_max_errors(pattern_length, max_errors):
+    """短关键字自动降低容错数：每段至少 2 个字符，否则过滤失效且误匹配过多"""
+    return max(0, min(max_errors, pattern_length // 2 - 1))
+
+
+def _split_pieces(pattern, pieces):
+    """把模式切成 pieces 段，返回 [(段在模式中的偏移, 段), ...]"""
+    length = len(pattern)
+    bounds = [length * i // pieces for i in range(pieces + 1)]
+    return [(bounds[i], pattern[bounds[i]:bounds[i + 1]]) for i in range(pieces)]
+
+
+def _peq_table(pattern):
+    """每个字符在模式中出现位置的位掩码"""
+    peq = {}
+    for i, symbol in enumerate(pattern):
+        peq[symbol] = peq.get(symbol, 0) | (1 << i)
+    return peq
+
+
+def myers_search(pattern, text, max_errors, start=0, end=None, peq=None):
+    """Myers 位并行近似匹配：返回 text[start:end] 中第一个编辑距离 <= max_errors 的匹配的结束位置（不含），
+    未找到返回 -1"""
+    m = len(pattern)
+    if end is None:
+        end = len(text)
+    if m == 0:
+        return start
+    if peq is None:
+        peq = _peq_table(pattern)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for j in range(start, end):
+        eq = peq.get(text[j], 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # 查找模式：文本中任意位置都可以作为匹配起点，第 0 行的水平差值为 0，移位时不补 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        if score <= max_errors:
+            return j + 1
+    return -1
+
+
+class FuzzyPattern:
+    """预处理后的近似匹配模式（分段和位掩码表只计算一次）"""
+
+    __slots__ = ('pattern', 'max_errors', 'pieces', 'peq')
+
+    def __init__(self, pattern, max_errors):
+        self.pattern = pattern
+        self.max_errors = effective_max_errors(len(pattern), max_errors)
+        self.pieces = _split_pieces(pattern, self.max_errors + 1)
+        self.peq = _peq_table(pattern)
+
+    def _windows(self, text):
+        """候选窗口（按起点排序并合并重叠部分）"""
+        m, k, n = len(self.pattern), self.max_errors, len(text)
+        windows = []
+        for offset, piece in self.pieces:
+            pos = text.find(piece)
+            while pos != -1:
+                windows.append((max(0, pos - offset - k), min(n, pos - offset + m + k)))
+                pos = text.find(piece, pos + 1)
+        if not windows:
+            return []
+        windows.sort()
+        merged = [list(windows[0])]
+        for start, end in windows[1:]:
+            if start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def find(self, text):
+        """第一个近似匹配的大致起始位置（结束位置减模式长度），未找到返回 -1"""
+        exact = text.find(self.pattern)
+        if exact != -1 or self.max_errors == 0:
+            return exact
+        for start, end in self._windows(text):
+            match_end = myers_search(self.pattern, text, self.max_errors, start, end, self.peq)
+            if match_end != -1:
+                return max(start, match_end - len(self.pattern))
+        return -1
+
+    def contains(self, text):
+        """文本中是否存在编辑距离不超过 max_errors 的匹配"""
+        return self.find(text) != -1
@@ -0,0 +1,230 @@
+"""忽略规则模块：在遍历目录时按 .gitignore/.ignore、用户排除模式和目录黑名单剪枝"""
+import os
+import re
+
+
+IGNORE_FILE_NAMES = ('.gitignore', '.ignore')
+
+# 默认目录黑名单（可在配置中修改）
+DEFAULT_DIR_BLACKLIST = [
+    '.git', '.svn', '.hg', 'node_modules', '__pycache__',
+    '.venv', 'venv', '.tox', '.mypy_cache', '.pytest_cache',
+]
+
+
+def _translate(pattern):
+    """把 gitignore 风格的通配模式转换为匹配相对路径（/ 分隔）的正则"""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                res.append('(?:.*/)?')  # 零个或多个目录
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                res.append('.*')
+                i += 2
+                continue
+            res.append('[^/]*')
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = pattern.find(']', i + 1)
+            if j == -1:
+                res.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                res.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return ''.join(res)
+
+
+class _Rule:
+    """一条忽略规则"""
+
+    __slots__ = ('regex', 'negate', 'dir_only', 'anchored')
+
+    def __init__(self, regex, negate, dir_only, anchored):
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+        self.anchored = anchored
+
+    @classmethod
+    def parse(cls, line):
+        """解析一行规则，空行和注释返回 None"""
+        line = line.rstrip('\r\n')
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            return None
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            return None
+
+        # 模式中间含有 / 时相对于规则所在目录匹配，否则匹配任意层级的名称
+        anchored = '/' in line
+        line = line.lstrip('/')
+        return cls(re.compile(_translate(line) + r'\Z'), negate, dir_only, anchored)
+
+    def matches(self, rel_path, name, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(rel_path if self.anchored else name) is not None
+
+
+def _parse_lines(lines):
+    return [rule for rule in (_Rule.parse(line) for line in lines) if rule is not None]
+
+
+def _load_ignore_file(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return _parse_lines(f)
+    except OSError:
+        return []
+
+
+class IgnoreRules:
+    """遍历时的剪枝规则：目录黑名单 + 用户排除模式 + 目录中的 .gitignore/.ignore"""
+
+    def __init__(self, exclude_patterns=None, dir_blacklist=None, use_ignore_files=True):
+        self.exclude_patterns = list(exclude_patterns or [])
+        self.dir_blacklist = set(dir_blacklist if dir_blacklist is not None else DEFAULT_DIR_BLACKLIST)
+        self.use_ignore_files = use_ignore_files
+        self._user_rules = _parse_lines(self.exclude_patterns)
+
+    def key(self):
+        """规则的唯一标识（用于区分不同规则下的文件列表缓存）"""
+        return repr((sorted(self.dir_blacklist), self.exclude_patterns, self.use_ignore_files))
+
+    def _is_ignored(self, path, name, is_dir, rulesets):
+        """按从外到内的顺序检查所有规则，最后一条匹配的规则生效（! 表示重新包含）"""
+        ignored = False
+        for base, rules in rulesets:
+            rel_path = os.path.relpath(path, base).replace(os.sep, '/')
+            for rule in rules:
+                if rule.matches(rel_path, name, is_dir):
+                    ignored = not rule.negate
+        return ignored
+
+    def _base_rulesets(self, top, base):
+        """从规则根目录 base 到 top 的父目录之间生效的规则（top 自己的忽略文件在遍历时加载）"""
+        rulesets = [(base, self._user_rules)] if self._user_rules else []
+        if self.use_ignore_files and top != base:
+            rel_parent = os.path.relpath(os.path.dirname(top), base)
+            ancestors = [base]
+            if rel_parent != os.curdir:
+                for part in rel_parent.split(os.sep):
+                    ancestors.append(os.path.join(ancestors[-1], part))
+            for ancestor in ancestors:
+                own_rules = []
+                for ignore_name in IGNORE_FILE_NAMES:
+                    own_rules.extend(_load_ignore_file(os.path.join(ancestor, ignore_name)))
+                if own_rules:
+                    rulesets.append((ancestor, own_rules))
+        return rulesets
+
+    def walk(self, top, base=None):
+        """与 os.walk 相同的遍历，但被忽略的目录不会被进入，被忽略的文件不会返回
+
+        base 为规则的根目录（默认为 top）；只遍历其中一个子树时传入原始根目录，
+        排除模式仍相对于 base 匹配，上层目录的 .gitignore 也会生效。
+        """
+        for root, dirs, entries in self.walk_entries(top, base):
+            yield root, dirs, [entry.name for entry in entries]
+
+    def walk_entries(self, top, base=None):
+        """与 walk 相同，但文件以 os.DirEntry 返回"""
+        base_rulesets = self._base_rulesets(top, base or top)
+        inherited = {}
+
+        for root, dirs, files in scandir_walk(top):
+            rulesets = inherited.pop(root, base_rulesets)
+            if self.use_ignore_files:
+                own_rules = []
+                names = {entry.name for entry in files}
+                for ignore_name in IGNORE_FILE_NAMES:
+                    if ignore_name in names:
+                        own_rules.extend(_load_ignore_file(os.path.join(root, ignore_name)))
+                if own_rules:
+                    rulesets = rulesets + [(root, own_rules)]
+
+            kept_dirs = []
+            for d in dirs:
+                if d in self.dir_blacklist:
+                    continue
+                dir_path = os.path.join(root, d)
+                if rulesets and self._is_ignored(dir_path, d, True, rulesets):
+                    continue
+                kept_dirs.append(d)
+                inherited[dir_path] = rulesets
+            dirs[:] = kept_dirs
+
+            if rulesets:
+                files = [f for f in files if not self._is_ignored(f.path, f.name, False, rulesets)]
+            yield root, dirs, files
+
+
+def scandir_walk(top):
+    """与 os.walk(top) 相同的自顶向下遍历，但文件以 os.DirEntry 返回
+
+    目录项自带类型（d_type），Windows 上还自带大小和修改时间，
+    调用方取文件类型和 stat 时不需要再次列目录。dirs 仍为名称列表，可原地修改来剪枝；
+    与 os.walk 一样不进入符号链接目录，无法列出的目录跳过。
+    """
+    stack = [top]
+    while stack:
+        root = stack.pop()
+        dirs, files = [], []
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirs.append(entry.name)
+                    else:
+                        files.append(entry)
+        except OSError:
+            continue
+        yield root, dirs, files
+        # 逆序入栈，按 dirs 的顺序依次遍历
+        for d in reversed(dirs):
+            dir_path = os.path.join(root, d)
+            if not os.path.islink(dir_path):
+                stack.append(dir_path)
+
+
+def walk(top, rules=None, base=None):
+    """按规则遍历目录，rules 为 None 时等同于 os.walk"""
+    if rules is None:
+        return os.walk(top)
+    return rules.walk(top, base)
+
+
+def walk_entries(top, rules=None, base=None):
+    """与 walk 相同，但文件以 os.DirEntry 返回（见 scandir_walk）"""
+    if rules is None:
+        return scandir_walk(top)
+    return rules.walk_entries(top, base)
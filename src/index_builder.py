@@ -0,0 +1,232 @@
+"""分片并行建立文件列表：按目录子树切分，在多个进程中遍历，合并为一个 PathStore
+
+每个分片完成后写入检查点文件，建立过程被中断时下次只需补建未完成的分片。
+分片按规划顺序合并，同一目录树每次得到的 file_id 顺序相同（检查点按 PathStore 指纹校验）。
+"""
+import os
+import time
+import pickle
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ignore_rules import walk_entries
+from path_store import PathStore
+
+
+# 分片数达到该值才使用进程池，否则在当前进程中遍历（小目录不值得启动进程）
+MIN_PARALLEL_SHARDS = 8
+# 规划分片时最多向下展开的目录层数
+MAX_PLAN_DEPTH = 2
+# 检查点的有效期（秒），超过后视为过期重新建立
+CHECKPOINT_MAX_AGE = 24 * 3600
+
+
+def _add_files(store, root, entries):
+    """把一个目录下的普通文件加入 store，并记录大小和修改时间
+
+    entries 为遍历时取得的目录项（os.DirEntry），不需要再次列目录。
+    按目录项类型（d_type）只保留普通文件（含指向普通文件的符号链接），
+    FIFO、socket、设备文件不会进入文件列表，打开它们可能永久阻塞。
+    stat 也来自目录项（Windows 上目录项自带这些信息，无需逐个文件调用 stat），
+    供查询中的 size:/mtime: 条件在读取之前过滤；inode 供按磁盘位置排序时使用，设备号供按设备分配线程池，
+    搜索时不需要再 stat（Windows 上两者均为 0）。
+    """
+    dir_id = store.add_dir(root)
+    for entry in entries:
+        try:
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+            size, mtime, inode, dev = st.st_size, st.st_mtime, st.st_ino, st.st_dev
+        except OSError:
+            size, mtime, inode, dev = -1, -1.0, 0, 0
+        store.add_name(dir_id, entry.name, size, mtime, inode, dev)
+
+
+def _walk_into(store, top, rules, base):
+    """遍历 top 子树，把文件加入 store，返回 {目录: 修改时间（纳秒）}"""
+    dir_mtimes = {}
+    for root, dirs, entries in walk_entries(top, rules, base):
+        try:
+            dir_mtimes[root] = os.stat(root).st_mtime_ns
+        except OSError:
+            pass
+        if entries:
+            _add_files(store, root, entries)
+    return dir_mtimes
+
+
+def _scan_shard(top, rules, base):
+    """遍历一个分片，返回 (PathStore, {目录: 修改时间})"""
+    store = PathStore()
+    dir_mtimes = {}
+    try:
+        dir_mtimes = _walk_into(store, top, rules, base)
+    except Exception:
+        pass
+    return store, dir_mtimes
+
+
+def _build_shard(top, rules, base, shard_path):
+    """在工作进程中遍历一个分片；结果连同各目录的修改时间写入检查点文件，只返回文件数，主进程逐个加载合并"""
+    shard = _scan_shard(top, rules, base)
+    tmp_path = f"{shard_path}.{os.getpid()}.tmp"  # 停止后未结束的旧任务可能与重新开始的建立同时写入
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(shard, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, shard_path)
+    return len(shard[0])
+
+
+class ShardedIndexBuilder:
+    """分片并行建立文件列表
+
+    规划阶段在当前进程中遍历顶部几层目录：这几层的文件直接收集，
+    更深的每个子目录作为一个分片交给进程池遍历。
+    """
+
+    def __init__(self, checkpoint_dir=None, max_workers=None):
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers or os.cpu_count() or 4
+
+    def plan(self, folder_path, rules=None):
+        """返回 (顶部文件 PathStore, 分片目录列表)"""
+        head = PathStore()
+        levels = [[] for _ in range(MAX_PLAN_DEPTH + 1)]  # 深度 -> [(root, files, 子目录)]
+        base_depth = folder_path.rstrip(os.sep).count(os.sep)
+        for root, dirs, entries in walk_entries(folder_path, rules):
+            depth = root.rstrip(os.sep).count(os.sep) - base_depth
+            # 符号链接目录遍历时不会进入，分片中也不能进入
+            subdirs = [os.path.join(root, d) for d in dirs if not os.path.islink(os.path.join(root, d))]
+            levels[depth].append((root, entries, subdirs))
+            if depth >= MAX_PLAN_DEPTH - 1:
+                dirs[:] = []
+
+        # 选择分片所在的深度：分片数足够多或已达最大深度
+        shard_depth = 1
+        while shard_depth < MAX_PLAN_DEPTH and \
+                sum(len(subdirs) for _, _, subdirs in levels[shard_depth - 1]) < self.max_workers:
+            shard_depth += 1
+
+        shards = []
+        for depth in range(shard_depth):
+            for root, entries, subdirs in levels[depth]:
+                if entries:
+                    _add_files(head, root, entries)
+                if depth == shard_depth - 1:
+                    shards.extend(subdirs)
+        return head, shards
+
+    def _checkpoint_dir_for(self, folder_path, rules):
+        if self.checkpoint_dir is None:
+            return None
+        key = f"{folder_path}_{rules.key() if rules is not None else ''}"
+        return os.path.join(self.checkpoint_dir, f"build_{hashlib.md5(key.encode()).hexdigest()}")
+
+    def _shard_path(self, build_dir, shard):
+        if build_dir is None:
+            return None
+        return os.path.join(build_dir, hashlib.md5(shard.encode('utf-8', 'surrogatepass')).hexdigest() + '.shard')
+
+    def _load_shard(self, shard_path):
+        """加载有效的已完成分片，不存在、已过期或目录树已改变返回 None
+
+        检查点记录了分片内每个目录的修改时间，任一目录新增、删除或重命名过文件
+        （修改时间不同或目录已不存在）都说明文件列表已过时，需要重新遍历该分片。
+        """
+        try:
+            if time.time() - os.path.getmtime(shard_path) > CHECKPOINT_MAX_AGE:
+                return None
+            with open(shard_path, 'rb') as f:
+                shard_store, dir_mtimes = pickle.load(f)
+            for dir_path, mtime in dir_mtimes.items():
+                if os.stat(dir_path).st_mtime_ns != mtime:
+                    return None
+            return shard_store
+        except Exception:
+            return None
+
+    def build(self, folder_path, rules=None, progress_callback=None, should_stop=None):
+        """建立 folder_path 的文件列表；被 should_stop 中断时返回 None（已完成的分片保留在检查点中）
+
+        分片完成的先后不固定，合并按规划顺序进行：完成的分片先暂存，前面的分片都已合并时才合并它。
+        """
+        head, shards = self.plan(folder_path, rules)
+        store = head
+
+        if len(shards) < MIN_PARALLEL_SHARDS:
+            for shard in shards:
+                if should_stop is not None and should_stop():
+                    return None
+                store.extend(_scan_shard(shard, rules, folder_path)[0])
+            return store
+
+        build_dir = self._checkpoint_dir_for(folder_path, rules)
+        if build_dir is not None:
+            try:
+                os.makedirs(build_dir, exist_ok=True)
+            except OSError:
+                build_dir = None
+
+        ready = {}        # 已完成但尚未合并的分片 -> PathStore
+        merged = [0]      # 已按顺序合并的分片数
+
+        def merge_ready():
+            while merged[0] < len(shards) and shards[merged[0]] in ready:
+                store.extend(ready.pop(shards[merged[0]]))
+                merged[0] += 1
+
+        # 先取出上次中断前已完成且仍然有效的分片
+        pending = []
+        for shard in shards:
+            shard_path = self._shard_path(build_dir, shard)
+            shard_store = self._load_shard(shard_path) if shard_path else None
+            if shard_store is not None:
+                ready[shard] = shard_store
+            else:
+                pending.append(shard)
+        merge_ready()
+        done_count = len(shards) - len(pending)
+        file_count = len(store) + sum(len(shard_store) for shard_store in ready.values())
+        if progress_callback and done_count:
+            progress_callback(f"从检查点恢复 {done_count}/{len(shards)} 个分片", done_count, len(shards))
+
+        if pending:
+            executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending)))
+            stopped = False
+            try:
+                futures = {executor.submit(_scan_shard, shard, rules, folder_path) if build_dir is None
+                           else executor.submit(_build_shard, shard, rules, folder_path,
+                                                self._shard_path(build_dir, shard)): shard
+                           for shard in pending}
+                not_done = set(futures)
+                while not_done:
+                    if should_stop is not None and should_stop():
+                        stopped = True
+                        return None
+                    finished, not_done = wait(not_done, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        shard = futures[future]
+                        result = future.result()
+                        if build_dir is None:
+                            shard_store = result[0]
+                        else:
+                            shard_store = self._load_shard(self._shard_path(build_dir, shard))
+                            if shard_store is None:
+                                # 检查点读不回来，或遍历期间目录又有变化：在当前进程中重新遍历
+                                shard_store = _scan_shard(shard, rules, folder_path)[0]
+                        ready[shard] = shard_store
+                        file_count += len(shard_store)
+                        merge_ready()
+                        done_count += 1
+                        if progress_callback:
+                            progress_callback(f"正在扫描文件夹: {folder_path}（分片 {done_count}/{len(shards)}，"
+                                              f"{file_count} 个文件）", done_count, len(shards))
+            finally:
+                # 停止时不等待正在遍历的分片（慢速网络盘上可能很久），它们在后台结束后写入检查点
+                executor.shutdown(wait=not stopped, cancel_futures=True)
+
+        # 全部完成后删除检查点，文件列表由 CacheManager 缓存
+        if build_dir is not None:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return store
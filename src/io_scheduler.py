@@ -0,0 +1,158 @@
+"""I/O 调度模块：控制文件读取任务的提交顺序和在途数量"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+
+
+# 每个设备同时进行的读取数上限：机械硬盘上并发过多会导致磁头来回寻道
+DEFAULT_READS_PER_DEVICE = 4
+# 记住的历史命中文件数上限
+MAX_HIT_PATHS = 20000
+# 读取代价的单位（字节）：小于该大小的文件代价都约为一次读取
+COST_UNIT_BYTES = 64 * 1024
+# 没有记录大小时假定的读取代价
+DEFAULT_READ_COST = 4.0
+
+
+class _DeviceQueueScheduler:
+    """每个设备一个待提交队列，分别限制在途任务数，慢设备的在途任务不会占用其他设备的名额
+
+    每个设备的在途任务上限默认为 window，子类可按设备覆盖 _limit。
+    """
+
+    def __init__(self, window):
+        self.window = max(1, window)
+        self._queues = {}       # st_dev -> deque[file_id]
+        self._outstanding = {}  # st_dev -> 在途读取数
+        self._device_of = {}    # file_id -> st_dev（仅在途文件）
+
+    def _enqueue(self, dev, file_id):
+        self._queues.setdefault(dev, deque()).append(file_id)
+        self._outstanding.setdefault(dev, 0)
+
+    def _limit(self, dev):
+        """设备的在途任务上限"""
+        return self.window
+
+    def has_pending(self):
+        """是否还有未提交的文件"""
+        return any(self._queues.values())
+
+    def next_batch(self):
+        """取出当前可以提交的文件 id（各设备补足到在途上限）"""
+        batch = []
+        for dev, queue in self._queues.items():
+            limit = self._limit(dev)
+            while queue and self._outstanding[dev] < limit:
+                file_id = queue.popleft()
+                self._outstanding[dev] += 1
+                self._device_of[file_id] = dev
+                batch.append(file_id)
+        return batch
+
+    def task_done(self, file_id):
+        """文件读取完成，释放所在设备的一个在途名额"""
+        if file_id in self._device_of:
+            self._outstanding[self._device_of.pop(file_id)] -= 1
+
+
+class LocalityScheduler(_DeviceQueueScheduler):
+    """按 (st_dev, 目录, st_ino) 排序文件，并限制每个设备的在途读取数
+
+    适用于机械硬盘和冷缓存的网络共享。设备、目录和 inode 分别由 device_of、dir_of、inode_of
+    给出（来自遍历时记录的文件列表），排序时不 stat。
+    """
+
+    def __init__(self, file_ids, dir_of, device_of, inode_of, reads_per_device=DEFAULT_READS_PER_DEVICE):
+        super().__init__(reads_per_device)
+        self.reads_per_device = self.window
+
+        # 同一目录的文件放在一起，目录内按 inode 顺序（接近磁盘上的分配顺序）
+        keyed = sorted((device_of(file_id), dir_of(file_id), inode_of(file_id), file_id) for file_id in file_ids)
+
+        for dev, _, _, file_id in keyed:
+            self._enqueue(dev, file_id)
+
+
+class MatchHistory:
+    """以往搜索的命中记录：各后缀名的命中比例和最近命中过的文件路径"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self._ext = dict(data.get("ext", {}))  # 后缀名 -> [命中文件数, 搜索文件数]
+        self._hits = OrderedDict.fromkeys(data.get("hits", ()))  # 最近命中的路径（按时间先后）
+        self._lock = threading.Lock()
+
+    def ext_rate(self, ext):
+        """该后缀名的文件命中的估计概率（没有记录时为 0.1）"""
+        hits, searched = self._ext.get(ext, (0, 0))
+        return (hits + 0.1) / (searched + 1)
+
+    def was_hit(self, path):
+        return path in self._hits
+
+    def record(self, name, hit_path=None):
+        """记录一个已搜索的文件；命中时 hit_path 为其完整路径"""
+        ext = os.path.splitext(name)[1].lower()
+        with self._lock:
+            entry = self._ext.setdefault(ext, [0, 0])
+            entry[1] += 1
+            if hit_path is not None:
+                entry[0] += 1
+                self._hits[hit_path] = None
+                self._hits.move_to_end(hit_path)
+                if len(self._hits) > MAX_HIT_PATHS:
+                    self._hits.popitem(last=False)
+
+    def to_dict(self):
+        with self._lock:
+            return {"ext": {ext: list(entry) for ext, entry in self._ext.items()}, "hits": list(self._hits)}
+
+
+class FirstResultScorer:
+    """默认的优先级评分：估计的读取代价 / 命中概率，越小越先搜索
+
+    小文件代价低；后缀名按以往的命中比例估计概率，以往命中过的文件和最近修改过的文件概率更高。
+    评分只使用文件列表中记录的大小和修改时间，不额外 stat。
+    """
+
+    def __init__(self, history, now=None):
+        self.history = history
+        self.now = now if now is not None else time.time()
+
+    def __call__(self, path, stat):
+        probability = self.history.ext_rate(os.path.splitext(path)[1].lower())
+        if self.history.was_hit(path):
+            probability = probability * 4 + 0.3
+        if stat is None:
+            cost = DEFAULT_READ_COST
+        else:
+            size, mtime = stat
+            cost = 1.0 + size / COST_UNIT_BYTES
+            age = self.now - mtime
+            if age < 86400:
+                probability *= 2
+            elif age < 7 * 86400:
+                probability *= 1.5
+        return cost / min(1.0, probability)
+
+
+class PriorityScheduler(_DeviceQueueScheduler):
+    """按评分从小到大提交（评分函数可替换），缩短出现第一个结果的时间
+
+    score(path, stat) 中 stat 为 (大小, 修改时间) 或 None；总耗时不变，但可能命中的便宜文件先被搜索。
+    device_of 给出时按设备分别排队，每个设备的在途任务数上限为 window_of(dev)（默认 window）。
+    """
+
+    def __init__(self, file_ids, path_of, stat_of, score, window, device_of=None, window_of=None):
+        super().__init__(window)
+        self._window_of = window_of
+        ordered = sorted(file_ids, key=lambda file_id: score(path_of(file_id), stat_of(file_id)))
+        for file_id in ordered:
+            self._enqueue(device_of(file_id) if device_of is not None else None, file_id)
+
+    def _limit(self, dev):
+        if self._window_of is not None:
+            return max(1, self._window_of(dev))
+        return super()._limit(dev)
@@ -0,0 +1,264 @@
+"""实时搜索模块：保存的搜索定期只对新建或修改过的文件重新搜索，新命中逐条推送
+
+第一次评估做一次完整搜索作为基线（不推送），之后每次只按修改时间找出上次评估后变化的
+文件并搜索它们，读取量与文件变化量成正比，与目录大小无关。
+
+找出变化的文件时使用目录树快照：修改时间未变的目录（没有新建、删除或重命名文件）沿用上次的
+文件列表，不重新列目录、不重新匹配忽略规则；目录内的文件仍逐个 stat 以发现原地修改，
+但长时间未修改的"冷"文件只每 COLD_CHECK_ROUNDS 次检查一次。
+"""
+import os
+import stat
+import time
+import logging
+import threading
+
+from file_searcher import FileSearcher
+from ignore_rules import IgnoreRules, walk_entries
+from path_store import PathStore, SearchResult
+from query import build_plan, is_boolean_query, parse_query, positive_terms
+from utils import parse_extensions, parse_folders, parse_keywords
+
+logger = logging.getLogger(__name__)
+
+# 实时搜索使用的线程数（后台任务，不与交互搜索争抢）
+LIVE_WORKERS = 8
+# 修改时间早于该时长（秒）的文件视为冷文件
+COLD_AGE = 24 * 3600
+# 冷文件每隔多少次检查才 stat 一次（间隔 30 秒时约 5 分钟）
+COLD_CHECK_ROUNDS = 10
+
+
+def _parse_saved_search(saved):
+    """把保存的搜索条件解析为 (keywords, extensions, exclude_keywords, query)"""
+    keywords_text = saved.get("keywords", "")
+    if is_boolean_query(keywords_text):
+        query = keywords_text
+        keywords = positive_terms(parse_query(keywords_text))
+    else:
+        query = None
+        keywords = parse_keywords(keywords_text)
+    extensions = parse_extensions(saved.get("extensions", ""))
+    exclude_text = saved.get("exclude_keywords", "")
+    exclude_keywords = parse_keywords(exclude_text) if exclude_text else []
+    return keywords, extensions, exclude_keywords, query
+
+
+class _TreeSnapshot:
+    """一个根目录（在给定忽略规则和后缀名下）的目录树快照
+
+    目录 -> (目录修改时间, 子目录名列表, {文件名: 上次看到的修改时间，未知为 None})
+    """
+
+    def __init__(self, folder, rules, ext_set):
+        self.folder = folder
+        self.rules = rules
+        self.ext_set = ext_set
+        self._dirs = None
+        self._rounds = 0
+
+    def _wanted(self, name):
+        return self.ext_set is None or os.path.splitext(name)[1].lower() in self.ext_set
+
+    def _listing(self, root, dirs, entries):
+        # 与遍历一致，不进入符号链接目录
+        subdirs = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+        return subdirs, [entry.name for entry in entries if self._wanted(entry.name)]
+
+    def _list_dir(self, root):
+        """按忽略规则列出一个目录，返回 (子目录名列表, 文件名列表)，无法列出返回 None"""
+        for _, dirs, entries in walk_entries(root, self.rules, self.folder):
+            return self._listing(root, dirs, entries)
+        return None
+
+    def _full_walk(self):
+        """没有快照时完整遍历一次"""
+        return {root: self._listing(root, dirs, entries)
+                for root, dirs, entries in walk_entries(self.folder, self.rules)}
+
+    def changed_files(self, since):
+        """变化的普通文件 [(路径, stat)]，并更新快照
+
+        新出现的文件按修改时间或状态变更时间不早于 since 判断；快照中已有的文件只要修改时间
+        与上次看到的不同就算变化（冷文件隔几次才检查，发现时修改时间可能已早于 since）。
+        """
+        self._rounds += 1
+        check_cold = self._rounds % COLD_CHECK_ROUNDS == 0
+        cold_before = time.time() - COLD_AGE
+        listings = self._full_walk() if self._dirs is None else {}
+        previous = self._dirs or {}
+        snapshot = {}
+        changed = []
+        stack = [self.folder]
+        while stack:
+            root = stack.pop()
+            try:
+                dir_mtime = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            cached = previous.get(root)
+            if root in listings:
+                subdirs, names = listings[root]
+                files = dict.fromkeys(names)
+            elif cached is not None and cached[0] == dir_mtime:
+                subdirs, files = cached[1], cached[2]
+            else:
+                # 目录有新建、删除或重命名：重新列出，其中的文件都重新 stat（同名文件可能已被替换）
+                listing = self._list_dir(root)
+                if listing is None:
+                    continue
+                subdirs, names = listing
+                files = dict.fromkeys(names)
+            seen = {}
+            for name, known_mtime in files.items():
+                if known_mtime is not None and known_mtime < cold_before and not check_cold:
+                    seen[name] = known_mtime
+                    continue
+                filepath = os.path.join(root, name)
+                try:
+                    st = os.stat(filepath)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                seen[name] = st.st_mtime
+                if max(st.st_mtime, st.st_ctime) >= since or \
+                        (known_mtime is not None and st.st_mtime != known_mtime):
+                    changed.append((filepath, st))
+            snapshot[root] = (dir_mtime, subdirs, seen)
+            stack.extend(os.path.join(root, d) for d in reversed(subdirs))
+        self._dirs = snapshot
+        return changed
+
+
+class LiveSearchMonitor:
+    """在后台线程中定期评估所有启用的实时搜索
+
+    result_callback(name, [SearchResult, ...]) 在有新命中时调用，
+    progress_callback(message) 报告每次评估的概况（都在后台线程中调用）。
+    interval 为两次评估之间的间隔（秒），为 None 时每次从配置读取（修改后 run_soon() 即生效）。
+    """
+
+    def __init__(self, config_manager, cache_manager, result_callback, progress_callback=None,
+                 interval=None):
+        self.config_manager = config_manager
+        self.cache_manager = cache_manager
+        self.result_callback = result_callback
+        self.progress_callback = progress_callback or (lambda message: None)
+        self.interval = interval
+        # 独立的搜索器：停止标志和线程池与交互搜索互不影响
+        self.searcher = FileSearcher(max_workers=LIVE_WORKERS)
+        self.searcher.document_cache = cache_manager.document_text_cache
+        self._reported = {}  # name -> 已报告的命中路径
+        self._snapshots = {}  # (实时搜索名称, 根目录, 忽略规则, 后缀名) -> _TreeSnapshot
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台评估线程（重复调用无效）"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="live-search")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def run_soon(self):
+        """立即进行一次评估（如刚保存了新的实时搜索）"""
+        self._wakeup.set()
+
+    def stop(self):
+        """停止后台评估并关闭线程池"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.searcher.stop_search()
+        self.searcher.shutdown()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.run_once()
+            self._wakeup.wait(self.interval or self.config_manager.get_live_interval())
+            self._wakeup.clear()
+
+    def run_once(self):
+        """评估所有启用的实时搜索"""
+        for saved in self.config_manager.get_saved_searches():
+            if self._stopped.is_set():
+                return
+            if not saved.get("enabled", True):
+                continue
+            try:
+                self.evaluate(saved)
+            except Exception as e:
+                logger.error(f"实时搜索「{saved.get('name')}」评估失败: {e}")
+
+    def _ignore_rules(self):
+        dir_blacklist, path_excludes, use_ignore_files = self.config_manager.get_ignore_settings()
+        return IgnoreRules(path_excludes.split(), dir_blacklist, use_ignore_files)
+
+    def _changed_files(self, name, folders, since, extensions, plan, rules):
+        """上次评估后新建或修改的文件（见 _TreeSnapshot.changed_files；快照按实时搜索分别保存）"""
+        ext_set = frozenset(extensions) if extensions else None
+        changed = []
+        for folder in folders:
+            key = (name, folder, rules.key(), ext_set)
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                snapshot = self._snapshots[key] = _TreeSnapshot(folder, rules, ext_set)
+            for filepath, st in snapshot.changed_files(since):
+                if plan.path_predicates and plan.path_state(filepath, (st.st_size, st.st_mtime)) is False:
+                    continue
+                changed.append(filepath)
+        return changed
+
+    def evaluate(self, saved):
+        """评估一个实时搜索，返回新命中数"""
+        name = saved["name"]
+        started = time.time()
+        since = saved.get("last_evaluated")
+        folders = [f for f in parse_folders(saved.get("folder_path", "")) if os.path.isdir(f)]
+        if not folders:
+            return 0
+        keywords, extensions, exclude_keywords, query = _parse_saved_search(saved)
+        max_errors = saved.get("max_errors", 0)
+        rules = self._ignore_rules()
+        reported = self._reported.setdefault(name, set())
+
+        if since is None:
+            # 第一次评估：完整搜索作为基线，只记录不推送
+            results = self.searcher.search_files_parallel(
+                folders if len(folders) > 1 else folders[0], keywords, extensions, exclude_keywords, False,
+                self.cache_manager, lambda message, current=0, total=0: None, lambda result: None,
+                lambda count: None, ignore_rules=rules, max_errors=max_errors, query=query, resumable=False)
+            if self._stopped.is_set():
+                return 0
+            reported.update(result.path for result in results)
+            self.config_manager.update_saved_search(name, last_evaluated=started)
+            self.progress_callback(f"实时搜索「{name}」已建立基线：{len(results)} 个匹配")
+            return 0
+
+        plan = build_plan(keywords, exclude_keywords, max_errors, query)
+        changed = self._changed_files(name, folders, since, extensions, plan, rules)
+        new_results = []
+        if changed:
+            store = PathStore()
+            self.searcher.is_searching = True
+            try:
+                hits = self.searcher.executor.map(
+                    lambda path: self.searcher.search_file(path, keywords, exclude_keywords, False,
+                                                           max_errors, plan), changed)
+                for path, hit in zip(changed, hits):
+                    if hit and path not in reported:
+                        reported.add(path)
+                        new_results.append(SearchResult(store, store.add(path), hit[1], hit[2]))
+            finally:
+                self.searcher.is_searching = False
+        if self._stopped.is_set():
+            return 0
+
+        self.config_manager.update_saved_search(name, last_evaluated=started)
+        if new_results:
+            self.result_callback(name, new_results)
+        logger.info(f"实时搜索「{name}」：{len(changed)} 个文件有变化，新增 {len(new_results)} 个匹配，"
+                    f"耗时 {(time.time() - started) * 1000:.0f}ms")
+        return len(new_results)
@@ -0,0 +1,148 @@
+"""紧凑的路径存储模块：目录表驻留 + 文件名字节池，按 id 引用文件"""
+import os
+import hashlib
+from array import array
+
+
+class PathStore:
+    """按 id 存储大量文件路径
+
+    目录路径只保存一份（目录表），文件名以 UTF-8 连续存放在一个 bytearray 中，
+    每个文件只占用数组中的一个目录 id 和一个偏移量，百万级文件也不会产生百万个 str 对象。
+    遍历时取得的大小、修改时间、inode 和设备号也按列存放（大小和修改时间未知为 -1，
+    inode 和设备号未知为 0），随文件列表一起缓存。
+    """
+
+    def __init__(self):
+        self._dirs = []                  # dir_id -> 目录路径
+        self._dir_ids = {}               # 目录路径 -> dir_id
+        self._file_dirs = array('I')     # file_id -> dir_id
+        self._name_offsets = array('Q', [0])  # file_id -> 文件名在字节池中的起始偏移（多一个结尾偏移）
+        self._names = bytearray()
+        self._sizes = array('q')         # file_id -> 字节大小
+        self._mtimes = array('d')        # file_id -> 修改时间
+        self._inodes = array('Q')        # file_id -> inode
+        self._devs = array('Q')          # file_id -> st_dev
+
+    @classmethod
+    def from_paths(cls, paths):
+        """从路径列表构建（兼容旧版缓存中的路径列表）"""
+        store = cls()
+        for path in paths:
+            store.add(path)
+        return store
+
+    def __len__(self):
+        return len(self._file_dirs)
+
+    def __iter__(self):
+        """依次产出所有文件路径"""
+        for file_id in range(len(self)):
+            yield self.path(file_id)
+
+    def add_dir(self, dir_path):
+        """登记目录，返回 dir_id"""
+        dir_id = self._dir_ids.get(dir_path)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(dir_path)
+            self._dir_ids[dir_path] = dir_id
+        return dir_id
+
+    def __setstate__(self, state):
+        """兼容没有大小/修改时间列、inode 列或设备号列的旧版缓存"""
+        self.__dict__.update(state)
+        count = len(self._file_dirs)
+        if '_sizes' not in state:
+            self._sizes = array('q', [-1]) * count
+            self._mtimes = array('d', [-1.0]) * count
+        if '_inodes' not in state:
+            self._inodes = array('Q', [0]) * count
+        if '_devs' not in state:
+            self._devs = array('Q', [0]) * count
+
+    def add_name(self, dir_id, name, size=-1, mtime=-1.0, inode=0, dev=0):
+        """在已登记的目录下添加文件名，返回 file_id"""
+        self._names += name.encode('utf-8', 'surrogatepass')
+        self._name_offsets.append(len(self._names))
+        self._file_dirs.append(dir_id)
+        self._sizes.append(size)
+        self._mtimes.append(mtime)
+        self._inodes.append(inode)
+        self._devs.append(dev)
+        return len(self._file_dirs) - 1
+
+    def add(self, path, size=-1, mtime=-1.0, inode=0, dev=0):
+        """添加完整路径，返回 file_id"""
+        dir_path, name = os.path.split(path)
+        return self.add_name(self.add_dir(dir_path), name, size, mtime, inode, dev)
+
+    def name(self, file_id):
+        """文件名"""
+        start = self._name_offsets[file_id]
+        end = self._name_offsets[file_id + 1]
+        return self._names[start:end].decode('utf-8', 'surrogatepass')
+
+    def dir_path(self, file_id):
+        """文件所在目录"""
+        return self._dirs[self._file_dirs[file_id]]
+
+    def path(self, file_id):
+        """完整路径"""
+        return os.path.join(self.dir_path(file_id), self.name(file_id))
+
+    def stat(self, file_id):
+        """遍历时记录的 (大小, 修改时间)，未记录返回 None"""
+        size = self._sizes[file_id]
+        if size < 0:
+            return None
+        return size, self._mtimes[file_id]
+
+    def inode(self, file_id):
+        """遍历时记录的 inode，未记录（旧版缓存、Windows）为 0"""
+        return self._inodes[file_id]
+
+    def device(self, file_id):
+        """遍历时记录的设备号（st_dev），未记录（旧版缓存、Windows）为 0"""
+        return self._devs[file_id]
+
+    def fingerprint(self):
+        """文件列表的指纹：内容和顺序都相同时 file_id 才对应同一文件"""
+        digest = hashlib.md5()
+        digest.update('\0'.join(self._dirs).encode('utf-8', 'surrogatepass'))
+        digest.update(self._file_dirs.tobytes())
+        digest.update(self._name_offsets.tobytes())
+        digest.update(self._names)
+        return digest.hexdigest()
+
+    def ids(self):
+        """所有 file_id（紧凑数组）"""
+        return array('I', range(len(self)))
+
+    def extend(self, other):
+        """合并另一个存储中的所有文件（用于多根目录和分片合并），整块拷贝字节池不逐个解码"""
+        dir_map = [self.add_dir(dir_path) for dir_path in other._dirs]
+        base = len(self._names)
+        self._names += other._names
+        self._name_offsets.extend(offset + base for offset in other._name_offsets[1:])
+        self._file_dirs.extend(dir_map[dir_id] for dir_id in other._file_dirs)
+        self._sizes.extend(other._sizes)
+        self._mtimes.extend(other._mtimes)
+        self._inodes.extend(other._inodes)
+        self._devs.extend(other._devs)
+
+
+class SearchResult:
+    """搜索结果记录：只保存所属存储、file_id、大小和第一处命中的字节偏移（未知为 None），路径按需解析"""
+
+    __slots__ = ('store', 'file_id', 'size_kb', 'hit_offset')
+
+    def __init__(self, store, file_id, size_kb, hit_offset=None):
+        self.store = store
+        self.file_id = file_id
+        self.size_kb = size_kb
+        self.hit_offset = hit_offset
+
+    @property
+    def path(self):
+        return self.store.path(self.file_id)
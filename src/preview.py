@@ -0,0 +1,171 @@
+"""大文件预览：只读取关键字命中位置附近的字节窗口
+
+每个窗口通过 seek + 限量读取得到，只解码这一段并高亮关键字；下一处命中和向下翻页都按需读取，
+预览几 GB 的日志也只产生几 KB 到几百 KB 的读取量，不需要打开外部编辑器。
+"""
+import os
+
+from encoding_utils import (ASCII, GBK, UTF8, UTF16_ENCODINGS, ChunkMatcher, candidate_encodings,
+                            compile_keywords, detect_encoding)
+
+# 命中位置前后各读取的字节数
+PREVIEW_CONTEXT = 2048
+# 向下翻页时每页读取的字节数
+PAGE_SIZE = 8192
+# 查找下一处命中时每次读取的字节数
+SEARCH_CHUNK_SIZE = 65536
+# 检测编码的样本大小
+SAMPLE_SIZE = 65536
+
+
+def first_hit_offset(filepath, keywords, chunk_size=131072, overlap_size=1024, max_errors=0, start=0,
+                     encoding=None):
+    """关键字在文件中 start 之后第一次出现的字节偏移（任一关键字），未找到返回 None
+
+    encoding 为已检测的文件编码，未给出时按文件开头检测。
+    """
+    keyword_patterns = compile_keywords(tuple(keywords), max_errors)
+    with open(filepath, 'rb') as f:
+        if encoding is None:
+            chunk = f.read(chunk_size)
+            encoding = detect_encoding(chunk)
+            if start:
+                f.seek(start)
+                chunk = f.read(chunk_size)
+        else:
+            f.seek(start)
+            chunk = f.read(chunk_size)
+        encodings = candidate_encodings(encoding)
+        previous_chunk = b''
+        base = start  # previous_chunk + chunk 在文件中的起始偏移
+        while chunk:
+            matcher = ChunkMatcher(previous_chunk + chunk, encodings)
+            offsets = [offset for offset in (matcher.find(kw) for kw in keyword_patterns) if offset != -1]
+            if offsets:
+                return base + min(offsets)
+            base += len(previous_chunk) + len(chunk) - min(overlap_size, len(chunk))
+            previous_chunk = chunk[-overlap_size:]
+            chunk = f.read(chunk_size)
+    return None
+
+
+class PreviewWindow:
+    """一段已解码的文件内容"""
+
+    __slots__ = ('start', 'end', 'text', 'hit_offset')
+
+    def __init__(self, start, end, text, hit_offset=None):
+        self.start = start            # 窗口在文件中的起始字节偏移
+        self.end = end                # 窗口结束偏移（不含）
+        self.text = text
+        self.hit_offset = hit_offset  # 命中的字节偏移（翻页得到的窗口为 None）
+
+
+class FilePreview:
+    """单个文件的按需预览
+
+    next_hit() 返回下一处命中附近的窗口，page_after(end) 返回紧接其后的一页；
+    bytes_read 为累计读取的字节数（含查找命中时扫描的部分）。
+    text_path 给出时读取它代替 filepath（如文档提取出的文本）。
+    """
+
+    def __init__(self, filepath, keywords, max_errors=0, text_path=None):
+        self.filepath = filepath
+        self.read_path = text_path or filepath
+        self.keywords = list(keywords)
+        self.max_errors = max_errors
+        self.file_size = os.path.getsize(self.read_path)
+        with open(self.read_path, 'rb') as f:
+            sample = f.read(SAMPLE_SIZE)
+        self.encoding = detect_encoding(sample)
+        self.bytes_read = len(sample)
+        self._next_search = 0  # 下一次查找命中的起始偏移
+
+    def _align(self, offset):
+        # UTF-16 的字符从偶数偏移开始
+        if self.encoding in UTF16_ENCODINGS:
+            return offset & ~1
+        return offset
+
+    def _decode(self, data):
+        if self.encoding == ASCII:
+            try:
+                return data.decode(UTF8)
+            except UnicodeDecodeError:
+                # 窗口两端可能截断多字节字符，先按 UTF-8 宽松解码，大量非法字节时改用 GBK
+                text = data.decode(UTF8, errors='replace')
+                if text.count('�') > 4:
+                    text = data.decode(GBK, errors='replace')
+                return text
+        return data.decode(self.encoding, errors='replace')
+
+    def _newline(self):
+        if self.encoding == UTF16_ENCODINGS[0]:
+            return b'\n\x00'
+        if self.encoding == UTF16_ENCODINGS[1]:
+            return b'\x00\n'
+        return b'\n'  # GBK 多字节字符的后续字节不会是 0x0A
+
+    def _find_newline(self, data, reverse=False):
+        """data 中第一个（reverse 时为最后一个）换行符的位置，UTF-16 只认偶数位置"""
+        newline = self._newline()
+        find = data.rfind if reverse else data.find
+        pos = find(newline)
+        while pos != -1 and len(newline) == 2 and pos % 2:
+            pos = data.rfind(newline, 0, pos) if reverse else data.find(newline, pos + 1)
+        return pos
+
+    def window(self, start, end, hit_offset=None, from_line_start=False):
+        """读取 [start, end) 并解码
+
+        窗口两端不完整的行去掉（整个窗口只有一行时保留；from_line_start 表示 start 已在行首），
+        返回的 start/end 为实际保留的范围，翻页时下一页紧接其后，不会丢失或重复内容。
+        """
+        start = self._align(max(0, start))
+        end = self.file_size if end >= self.file_size else self._align(end)
+        if end <= start:
+            return None
+        with open(self.read_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        self.bytes_read += len(data)
+        end = start + len(data)
+        head, tail = 0, len(data)
+        if start > 0 and not from_line_start:
+            pos = self._find_newline(data)
+            if pos != -1 and pos + len(self._newline()) < len(data):
+                head = pos + len(self._newline())
+        if end < self.file_size:
+            pos = self._find_newline(data, reverse=True)
+            if pos >= head:
+                tail = pos + len(self._newline())
+        if hit_offset is not None and not start + head <= hit_offset < start + tail:
+            # 命中所在的行比窗口还长，不裁剪
+            head, tail = 0, len(data)
+        return PreviewWindow(start + head, start + tail, self._decode(data[head:tail]), hit_offset)
+
+    def next_hit(self):
+        """下一处命中附近的窗口，没有更多命中返回 None"""
+        if not self.keywords or self._next_search >= self.file_size:
+            return None
+        search_start = self._align(self._next_search)
+        offset = first_hit_offset(self.read_path, self.keywords, SEARCH_CHUNK_SIZE, max_errors=self.max_errors,
+                                  start=search_start, encoding=self.encoding)
+        if offset is None:
+            # 查找扫描到了文件末尾
+            self.bytes_read += self.file_size - search_start
+            self._next_search = self.file_size
+            return None
+        self.bytes_read += offset - search_start
+        result = self.window(offset - PREVIEW_CONTEXT, offset + PREVIEW_CONTEXT, offset)
+        if result is None:
+            return None
+        # 同一窗口内的其他命中已经显示，从窗口之后继续查找
+        self._next_search = max(result.end, offset + 1)
+        return result
+
+    def page_after(self, end):
+        """紧接 end 之后的一页，已到文件末尾返回 None"""
+        if end >= self.file_size:
+            return None
+        return self.window(end, end + PAGE_SIZE, from_line_start=True)
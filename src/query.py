@@ -0,0 +1,571 @@
+"""布尔查询模块：解析 AND / OR / NOT、括号、引号短语和路径条件，编译为按代价排序的查询计划
+
+语法示例:
+    error AND (timeout OR "connection reset") NOT debug
+    ext:py name:test_* assert
+    path:*/src/* TODO OR FIXME
+    ext:log mtime:<7d size:<50mb timeout
+
+运算符必须大写（小写的 and/or/not 仍是普通关键字），相邻条件之间默认为 AND，
+优先级 NOT > AND > OR。路径条件（ext: name: path:）只看路径，元数据条件（size: mtime:）
+使用建立文件列表时记录的大小和修改时间，都在读取文件内容之前求值。
+
+计划对每个文件按块求值，结果为三值：True（已确定命中）、False（已确定不命中）、
+None（需要继续读取）。已确定的子树不再检查，整体确定后立即停止读取。
+"""
+import os
+import time
+import fnmatch
+import threading
+from functools import lru_cache
+
+from encoding_utils import KeywordPattern
+
+
+OPERATORS = ('AND', 'OR', 'NOT')
+FIELDS = ('ext', 'name', 'path', 'size', 'mtime')
+# 需要文件大小/修改时间的条件
+STAT_FIELDS = ('size', 'mtime')
+
+# size: 的单位（按 1024 进位），不写单位为字节
+SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+              'g': 1024 ** 3, 'gb': 1024 ** 3}
+# mtime: 的单位（距今的时间），不写单位为天
+AGE_UNITS = {'': 86400, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+QUOTE_PAIRS = {
+    '"': '"',
+    "'": "'",
+    '“': '”',
+    '‘': '’',
+}
+
+# 各类关键字检查的相对代价：原始字节查找 / 需解码后比较 / 模糊匹配
+COST_RAW = 1.0
+COST_DECODE = 3.0
+COST_FUZZY = 8.0
+# 路径条件不读文件，代价按 0 计
+COST_PATH = 0.0
+
+# 关键字统计的最大条目数
+MAX_TERM_STATS = 5000
+
+
+class QuerySyntaxError(ValueError):
+    """查询语法错误"""
+
+
+def tokenize(text):
+    """把查询文本切分为 [(类型, 值), ...]，类型为 lparen / rparen / op / term / field"""
+    tokens = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+            continue
+        if c == '(':
+            tokens.append(('lparen', c))
+            i += 1
+            continue
+        if c == ')':
+            tokens.append(('rparen', c))
+            i += 1
+            continue
+        if c in QUOTE_PAIRS:
+            end = text.find(QUOTE_PAIRS[c], i + 1)
+            if end == -1:
+                raise QuerySyntaxError(f"引号未闭合: {text[i:]}")
+            phrase = text[i + 1:end].strip()
+            if phrase:
+                tokens.append(('term', phrase))
+            i = end + 1
+            continue
+
+        start = i
+        while i < n and not text[i].isspace() and text[i] not in '()':
+            i += 1
+        word = text[start:i]
+        field, sep, value = word.partition(':')
+        if word in OPERATORS:
+            tokens.append(('op', word))
+        elif sep and field.lower() in FIELDS:
+            if value and value[0] in QUOTE_PAIRS:
+                # 带引号的路径条件: path:"My Documents/*"，值可以包含空格和括号
+                quote = start + len(field) + 1
+                end = text.find(QUOTE_PAIRS[value[0]], quote + 1)
+                if end == -1:
+                    raise QuerySyntaxError(f"引号未闭合: {text[quote:]}")
+                value = text[quote + 1:end]
+                i = end + 1
+            if not value:
+                raise QuerySyntaxError(f"条件缺少值: {word}")
+            tokens.append(('field', (field.lower(), value)))
+        else:
+            tokens.append(('term', word))
+    return tokens
+
+
+def is_boolean_query(text):
+    """文本是否使用了查询语法（运算符或路径条件）；否则按原来的空格分隔关键字处理"""
+    try:
+        return any(kind in ('op', 'field') for kind, _ in tokenize(text))
+    except QuerySyntaxError:
+        return False
+
+
+class Term:
+    """内容关键字"""
+
+    __slots__ = ('text', 'keyword', 'id')
+
+    def __init__(self, text):
+        self.text = text
+        self.keyword = None
+        self.id = None
+
+
+def _parse_amount(text, units, field):
+    """解析带单位的数值，如 1.5mb、7d"""
+    text = text.strip().lower()
+    number = text.rstrip('abcdefghijklmnopqrstuvwxyz')
+    unit = text[len(number):]
+    try:
+        return float(number) * units[unit]
+    except (ValueError, KeyError):
+        raise QuerySyntaxError(f"无法识别的 {field}: 取值: {text}")
+
+
+def _parse_range(field, spec):
+    """把 >1mb、<=7d、1k..5m 形式的条件解析为 (下限, 上限, 是否不含下限, 是否不含上限)，None 表示不限
+
+    > 和 < 不含边界，>=、<=、= 和范围写法含边界。
+    """
+    units = SIZE_UNITS if field == 'size' else AGE_UNITS
+    if '..' in spec:
+        low, _, high = spec.partition('..')
+        return (_parse_amount(low, units, field) if low else None,
+                _parse_amount(high, units, field) if high else None, False, False)
+    for op in ('>=', '<=', '>', '<', '='):
+        if spec.startswith(op):
+            value = _parse_amount(spec[len(op):], units, field)
+            break
+    else:
+        if field == 'size':
+            raise QuerySyntaxError("size: 需要 > < = 或范围，如 size:>1mb、size:1k..5m")
+        # mtime:7d 表示 7 天内修改过
+        op, value = '<=', _parse_amount(spec, units, field)
+    if op in ('>', '>='):
+        return value, None, op == '>', False
+    if op in ('<', '<='):
+        return None, value, False, op == '<'
+    return value, value, False, False
+
+
+class PathPredicate:
+    """不读内容的条件：ext（后缀名）、name（文件名通配）、path（完整路径通配，/ 分隔），
+    size（文件大小）、mtime（距上次修改的时间，mtime:<7d 即 7 天内修改过）"""
+
+    __slots__ = ('field', 'pattern', 'bounds', 'now', 'id')
+
+    def __init__(self, field, pattern):
+        self.field = field
+        pattern = pattern.lower()
+        if field == 'ext' and not pattern.startswith('.'):
+            pattern = '.' + pattern
+        self.pattern = pattern
+        self.bounds = _parse_range(field, pattern) if field in STAT_FIELDS else None
+        self.now = time.time()  # mtime 条件以建立计划的时刻为准，同一次搜索中结果一致
+        self.id = None
+
+    @property
+    def needs_stat(self):
+        return self.bounds is not None
+
+    def matches(self, path, stat=None):
+        """stat 为 (大小, 修改时间)；元数据条件在 stat 或对应的值未知时返回 None（需读取时再确定）"""
+        if self.bounds is not None:
+            if stat is None:
+                return None
+            if stat[0 if self.field == 'size' else 1] is None:
+                return None  # 大小未知（如 .bz2 压缩包成员）
+            value = stat[0] if self.field == 'size' else self.now - stat[1]
+            low, high, low_open, high_open = self.bounds
+            if low is not None and (value <= low if low_open else value < low):
+                return False
+            return high is None or (value < high if high_open else value <= high)
+        path = path.lower()
+        if self.field == 'ext':
+            return os.path.splitext(path)[1] == self.pattern
+        if self.field == 'name':
+            return fnmatch.fnmatchcase(os.path.basename(path), self.pattern)
+        return fnmatch.fnmatchcase(path.replace(os.sep, '/'), self.pattern)
+
+
+class And:
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+
+class Or:
+    __slots__ = ('children',)
+
+    def __init__(self, children):
+        self.children = children
+
+
+class Not:
+    __slots__ = ('child',)
+
+    def __init__(self, child):
+        self.child = child
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("查询为空")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise QuerySyntaxError(f"多余的内容: {self.peek()[1]}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ('op', 'OR'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_unary()]
+        while True:
+            kind, value = self.peek()
+            if kind == 'op' and value == 'AND':
+                self.take()
+            elif not (kind in ('term', 'field', 'lparen') or (kind == 'op' and value == 'NOT')):
+                break
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_unary(self):
+        if self.peek() == ('op', 'NOT'):
+            self.take()
+            return Not(self.parse_unary())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, value = self.take()
+        if kind == 'lparen':
+            node = self.parse_or()
+            if self.take()[0] != 'rparen':
+                raise QuerySyntaxError("缺少右括号")
+            return node
+        if kind == 'term':
+            return Term(value)
+        if kind == 'field':
+            return PathPredicate(*value)
+        if kind is None:
+            raise QuerySyntaxError("查询不完整")
+        raise QuerySyntaxError(f"意外的 {value}")
+
+
+def parse_query(text):
+    """解析查询文本为表达式树，语法错误抛出 QuerySyntaxError"""
+    return _Parser(tokenize(text)).parse()
+
+
+def positive_terms(node, negated=False):
+    """表达式中未被 NOT 否定的关键字（用于导出命中偏移等）"""
+    if isinstance(node, Term):
+        return [] if negated else [node.text]
+    if isinstance(node, Not):
+        return positive_terms(node.child, not negated)
+    if isinstance(node, (And, Or)):
+        return [text for child in node.children for text in positive_terms(child, negated)]
+    return []
+
+
+class TermStats:
+    """关键字统计：每个关键字在已搜索文件中出现的比例，用于估计选择度"""
+
+    def __init__(self, data=None):
+        self._data = dict(data or {})  # 关键字 -> [命中文件数, 已确定的文件数]
+        self._lock = threading.Lock()
+
+    def probability(self, text):
+        """文件包含该关键字的估计概率；没有统计时按长度估计（越长越少见）"""
+        prior = max(0.05, min(0.9, 2.0 / max(1, len(text))))
+        hits, checked = self._data.get(text, (0, 0))
+        return (hits + prior * 2) / (checked + 2)
+
+    def record(self, found, missed):
+        """记录一个文件的结果：found 为出现的关键字，missed 为确定未出现的关键字"""
+        with self._lock:
+            for text in found:
+                entry = self._data.setdefault(text, [0, 0])
+                entry[0] += 1
+                entry[1] += 1
+            for text in missed:
+                self._data.setdefault(text, [0, 0])[1] += 1
+
+    def to_dict(self):
+        with self._lock:
+            if len(self._data) > MAX_TERM_STATS:
+                # 只保留统计样本最多的关键字
+                kept = sorted(self._data.items(), key=lambda item: item[1][1], reverse=True)[:MAX_TERM_STATS]
+                self._data = dict(kept)
+            return {text: list(entry) for text, entry in self._data.items()}
+
+
+class QueryPlan:
+    """编译后的查询计划
+
+    root 为按代价排序后的表达式树；excludes 为"排除关键字"输入框中的关键字，
+    保持原有语义：每块先检查，出现即排除，关键字全部找到后即命中。
+    """
+
+    def __init__(self, root, excludes, terms, path_predicates, hit_terms=()):
+        self.root = root
+        self.excludes = excludes
+        self.terms = terms
+        self.path_predicates = path_predicates
+        self.hit_terms = list(hit_terms)  # 未被 NOT 否定的关键字（其出现位置即命中偏移）
+
+    def needs_content(self):
+        return bool(self.terms) or bool(self.excludes)
+
+    def path_state(self, path, stat=None):
+        """只根据路径和 stat（(大小, 修改时间)，可为 None）求值：False 表示无需读取即可排除"""
+        path_values = {p.id: p.matches(path, stat) for p in self.path_predicates}
+        return _evaluate(self.root, (), path_values, False)
+
+    def evaluate(self, path, stat=None):
+        """为一个文件创建求值状态"""
+        return QueryEvaluation(self, path, stat)
+
+
+class QueryEvaluation:
+    """单个文件的求值状态（已找到的关键字集合、路径条件的值和第一处命中的字节偏移）"""
+
+    __slots__ = ('plan', 'found', 'path_values', 'excluded', 'hit_offset', '_hit_located')
+
+    def __init__(self, plan, path, stat=None):
+        self.plan = plan
+        self.found = set()
+        self.path_values = {p.id: p.matches(path, stat) for p in plan.path_predicates}
+        self.excluded = False
+        self.hit_offset = None
+        self._hit_located = False
+
+    def state(self):
+        """当前是否已能确定结果"""
+        if self.excluded:
+            return False
+        return _evaluate(self.plan.root, self.found, self.path_values, False)
+
+    def scan(self, matcher, base=None):
+        """用一块内容推进求值，只检查尚未确定的子树中需要的关键字
+
+        base 为这块内容在文件中的字节偏移：给出时，在第一次找到（未被否定的）关键字的块中
+        定位所有关键字，最小的位置记为 hit_offset，导出时不需要重新读取文件。
+        """
+        if self.excluded:
+            return False
+        for exclude_kw in self.plan.excludes:
+            if matcher.contains(exclude_kw):
+                self.excluded = True
+                return False
+        state = _scan(self.plan.root, matcher, self.found, self.path_values)
+        if base is not None and not self._hit_located and \
+                any(term.id in self.found for term in self.plan.hit_terms):
+            self._hit_located = True
+            offsets = [offset for offset in (matcher.find(term.keyword) for term in self.plan.hit_terms)
+                       if offset != -1]
+            if offsets:
+                self.hit_offset = base + min(offsets)
+        return state
+
+    def finish(self):
+        """内容读完：未找到的关键字视为不存在"""
+        if self.excluded:
+            return False
+        return _evaluate(self.plan.root, self.found, self.path_values, True) is True
+
+    def record(self, term_stats, complete):
+        """把本文件的结果计入统计；未读完时未找到的关键字状态未知，不计入"""
+        if term_stats is None:
+            return
+        terms = self.plan.terms
+        found = [term.text for term in terms if term.id in self.found]
+        missed = [term.text for term in terms if term.id not in self.found] if complete else []
+        term_stats.record(found, missed)
+
+
+def _evaluate(node, found, path_values, final):
+    if isinstance(node, Term):
+        if node.id in found:
+            return True
+        return False if final else None
+    if isinstance(node, PathPredicate):
+        return path_values[node.id]
+    if isinstance(node, Not):
+        value = _evaluate(node.child, found, path_values, final)
+        return None if value is None else not value
+    if isinstance(node, And):
+        result = True
+        for child in node.children:
+            value = _evaluate(child, found, path_values, final)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+    result = False
+    for child in node.children:
+        value = _evaluate(child, found, path_values, final)
+        if value is True:
+            return True
+        if value is None:
+            result = None
+    return result
+
+
+def _scan(node, matcher, found, path_values):
+    if isinstance(node, Term):
+        if node.id in found:
+            return True
+        if matcher.contains(node.keyword):
+            found.add(node.id)
+            return True
+        return None
+    if isinstance(node, PathPredicate):
+        return path_values[node.id]
+    if isinstance(node, Not):
+        value = _scan(node.child, matcher, found, path_values)
+        return None if value is None else not value
+    if isinstance(node, And):
+        result = True
+        for child in node.children:
+            value = _scan(child, matcher, found, path_values)
+            if value is False:
+                return False  # 整个 AND 已确定，跳过其余子树
+            if value is None:
+                result = None
+        return result
+    result = False
+    for child in node.children:
+        value = _scan(child, matcher, found, path_values)
+        if value is True:
+            return True  # 整个 OR 已确定，跳过其余子树
+        if value is None:
+            result = None
+    return result
+
+
+class QueryPlanner:
+    """为表达式树中的关键字编译字节模式，并按估计的代价和选择度排序子节点
+
+    AND 的子节点按 代价 / P(为假) 升序，OR 的子节点按 代价 / P(为真) 升序：
+    最可能让整个节点提前确定、又最便宜的检查排在前面。路径条件代价为 0，总是最先求值。
+    """
+
+    def __init__(self, term_stats=None):
+        self.term_stats = term_stats
+
+    def plan(self, root, exclude_keywords=(), max_errors=0):
+        terms = {}
+        path_predicates = []
+        self._compile(root, terms, path_predicates, max_errors, False)
+        self._estimate(root)
+        excludes = tuple(KeywordPattern(kw) for kw in dict.fromkeys(kw.lower() for kw in exclude_keywords))
+        hit_terms = [term for (_, negated), term in terms.items() if not negated]
+        return QueryPlan(root, excludes, list(terms.values()), path_predicates, hit_terms)
+
+    def _compile(self, node, terms, path_predicates, max_errors, negated):
+        """给关键字分配 id 并编译（被 NOT 否定的关键字按精确匹配，与排除关键字一致）"""
+        if isinstance(node, Term):
+            node.text = node.text.lower()
+            key = (node.text, negated)
+            shared = terms.get(key)
+            if shared is None:
+                node.id = len(terms)
+                node.keyword = KeywordPattern(node.text, 0 if negated else max_errors)
+                terms[key] = node
+            else:
+                node.id = shared.id
+                node.keyword = shared.keyword
+        elif isinstance(node, PathPredicate):
+            node.id = len(path_predicates)
+            path_predicates.append(node)
+        elif isinstance(node, Not):
+            self._compile(node.child, terms, path_predicates, max_errors, not negated)
+        else:
+            for child in node.children:
+                self._compile(child, terms, path_predicates, max_errors, negated)
+
+    def _term_probability(self, text):
+        if self.term_stats is not None:
+            return self.term_stats.probability(text)
+        return TermStats().probability(text)
+
+    def _estimate(self, node):
+        """返回 (P(为真), 代价)，并就地排序子节点"""
+        if isinstance(node, Term):
+            keyword = node.keyword
+            if keyword.max_errors:
+                cost = COST_FUZZY
+            elif keyword.needs_decode:
+                cost = COST_DECODE
+            else:
+                cost = COST_RAW
+            return self._term_probability(node.text), cost
+        if isinstance(node, PathPredicate):
+            return 0.5, COST_PATH
+        if isinstance(node, Not):
+            probability, cost = self._estimate(node.child)
+            return 1.0 - probability, cost
+
+        estimates = [(self._estimate(child), child) for child in node.children]
+        if isinstance(node, And):
+            estimates.sort(key=lambda item: item[0][1] / max(1e-6, 1.0 - item[0][0]))
+            probability = 1.0
+            for (p, _), _ in estimates:
+                probability *= p
+        else:
+            estimates.sort(key=lambda item: item[0][1] / max(1e-6, item[0][0]))
+            miss = 1.0
+            for (p, _), _ in estimates:
+                miss *= 1.0 - p
+            probability = 1.0 - miss
+        node.children = [child for _, child in estimates]
+        return probability, sum(cost for (_, cost), _ in estimates)
+
+
+def build_plan(keywords, exclude_keywords=(), max_errors=0, query=None, term_stats=None):
+    """编译查询计划：query 为查询语法文本，否则 keywords 为需全部出现的关键字列表"""
+    if query:
+        root = parse_query(query)
+    else:
+        root = And([Term(kw) for kw in keywords])
+    return QueryPlanner(term_stats).plan(root, exclude_keywords or (), max_errors)
+
+
+@lru_cache(maxsize=64)
+def keyword_plan(keywords, exclude_keywords=(), max_errors=0):
+    """关键字列表的计划（按参数缓存，供单独调用 search_file 时使用）"""
+    return build_plan(keywords, exclude_keywords, max_errors)
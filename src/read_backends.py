@@ -0,0 +1,203 @@
+"""底层文件读取后端模块（可按搜索选择，并可做读取性能对比）"""
+import os
+import threading
+import time
+
+
+# 每个线程复用的读取缓冲区大小（与 search_file 的块大小一致）
+POOL_BUFFER_SIZE = 131072
+
+
+class _BufferedHandle:
+    """普通 Python 缓冲文件对象（原有读取方式）"""
+
+    def __init__(self, filepath, stats):
+        self._file = open(filepath, 'rb')
+        self._stats = stats
+
+    def read(self, size):
+        data = self._file.read(size)
+        self._stats.add(len(data))
+        return data
+
+    def pread(self, offset, size):
+        if hasattr(os, 'pread'):
+            data = os.pread(self._file.fileno(), size, offset)
+        else:
+            self._file.seek(offset)
+            data = self._file.read(size)
+        self._stats.add(len(data))
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+class _PooledHandle:
+    """os.open + readinto 读入每线程复用的缓冲区，避免每次读取都分配新的 bytes
+
+    返回的 memoryview 只在下一次读取之前有效，调用方需要保留的数据必须自行复制。
+    """
+
+    _local = threading.local()
+
+    def __init__(self, filepath, stats):
+        flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(filepath, flags)
+        self._file = os.fdopen(self._fd, 'rb', buffering=0)
+        self._stats = stats
+
+    def _buffer(self, size):
+        buf = getattr(self._local, 'buffer', None)
+        if buf is None or len(buf) < size:
+            buf = bytearray(max(size, POOL_BUFFER_SIZE))
+            self._local.buffer = buf
+        return memoryview(buf)[:size]
+
+    def read(self, size):
+        view = self._buffer(size)
+        n = self._file.readinto(view) or 0
+        self._stats.add(n)
+        return view[:n]
+
+    def pread(self, offset, size):
+        view = self._buffer(size)
+        if hasattr(os, 'preadv'):
+            n = os.preadv(self._fd, [view], offset)
+        else:
+            self._file.seek(offset)
+            n = self._file.readinto(view) or 0
+        self._stats.add(n)
+        return view[:n]
+
+    def close(self):
+        self._file.close()
+
+
+class _FadviseHandle(_BufferedHandle):
+    """带 posix_fadvise 提示的读取：顺序预读，读过的页立即丢弃，避免大文件扫描冲掉页缓存"""
+
+    # 每次预读提示的窗口大小
+    WILLNEED_WINDOW = 4 * 1024 * 1024
+
+    def __init__(self, filepath, stats):
+        super().__init__(filepath, stats)
+        self._fd = self._file.fileno()
+        self._pos = 0
+        self._advised_until = 0
+        os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+    def _advise_window(self, offset, size):
+        if offset + size > self._advised_until:
+            os.posix_fadvise(self._fd, offset, self.WILLNEED_WINDOW, os.POSIX_FADV_WILLNEED)
+            self._advised_until = offset + self.WILLNEED_WINDOW
+
+    def read(self, size):
+        self._advise_window(self._pos, size)
+        data = super().read(size)
+        # 已经搜索过的页不再需要
+        os.posix_fadvise(self._fd, self._pos, len(data), os.POSIX_FADV_DONTNEED)
+        self._pos += len(data)
+        return data
+
+    def pread(self, offset, size):
+        self._advise_window(offset, size)
+        data = super().pread(offset, size)
+        os.posix_fadvise(self._fd, offset, len(data), os.POSIX_FADV_DONTNEED)
+        return data
+
+
+class ReadStats:
+    """读取统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.bytes_read = 0
+            self.read_calls = 0
+            self.files_opened = 0
+            self.started = time.perf_counter()
+
+    def add(self, nbytes):
+        with self._lock:
+            self.bytes_read += nbytes
+            self.read_calls += 1
+
+    def opened(self):
+        with self._lock:
+            self.files_opened += 1
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        mb = self.bytes_read / (1024 * 1024)
+        return f"读取 {self.files_opened} 个文件 {mb:.1f}MB，{mb / elapsed:.1f}MB/s"
+
+
+class ReadBackend:
+    """读取后端：open() 返回带 read/pread/close 的句柄，可用作上下文管理器"""
+
+    def __init__(self, name, handle_class):
+        self.name = name
+        self._handle_class = handle_class
+        self.stats = ReadStats()
+
+    def open(self, filepath):
+        handle = self._handle_class(filepath, self.stats)
+        self.stats.opened()
+        return _HandleContext(handle)
+
+
+class _HandleContext:
+    def __init__(self, handle):
+        self.handle = handle
+
+    def __enter__(self):
+        return self.handle
+
+    def __exit__(self, exc_type, exc, tb):
+        self.handle.close()
+        return False
+
+
+_BACKEND_CLASSES = {
+    'buffered': _BufferedHandle,
+    'pooled': _PooledHandle,
+}
+if hasattr(os, 'posix_fadvise'):
+    _BACKEND_CLASSES['fadvise'] = _FadviseHandle
+
+DEFAULT_BACKEND = 'buffered'
+
+
+def available_backends():
+    """当前平台可用的读取后端名称"""
+    return list(_BACKEND_CLASSES)
+
+
+def get_backend(name=None):
+    """按名称创建读取后端，不支持的名称回退到默认的缓冲读取"""
+    handle_class = _BACKEND_CLASSES.get(name or DEFAULT_BACKEND, _BufferedHandle)
+    return ReadBackend(name if name in _BACKEND_CLASSES else DEFAULT_BACKEND, handle_class)
+
+
+def benchmark_backends(filepaths, names=None, chunk_size=POOL_BUFFER_SIZE):
+    """用各后端完整读取同一批文件，返回 {后端名: (秒, 字节数)}
+
+    注意：先测的后端会预热页缓存，冷缓存对比需要在每轮之间清理系统缓存。
+    """
+    results = {}
+    for name in names or available_backends():
+        backend = get_backend(name)
+        start = time.perf_counter()
+        for filepath in filepaths:
+            try:
+                with backend.open(filepath) as f:
+                    while f.read(chunk_size):
+                        pass
+            except OSError:
+                continue
+        results[backend.name] = (time.perf_counter() - start, backend.stats.bytes_read)
+    return results
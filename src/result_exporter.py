@@ -0,0 +1,113 @@
+"""搜索结果流式导出模块（CSV / JSONL），结果产生时立即写入文件"""
+import os
+import csv
+import json
+from datetime import datetime
+
+from archive_searcher import split_archive_path
+
+
+# 可选的附加列
+OPTIONAL_COLUMNS = ('size', 'mtime', 'hit_offset')
+BASE_COLUMNS = ('path', 'size_kb')
+
+# 每写入多少条刷新一次文件
+FLUSH_INTERVAL = 200
+
+
+class ResultExporter:
+    """把 SearchResult 逐条写入 CSV 或 JSONL 文件，不在内存中保留结果
+
+    文件在创建时打开但不清空，第一次写入（或 begin()）时才清空并写表头；继续被停止的搜索时
+    resume(state) 把文件截断到检查点记录的位置后接着写入，停止前已导出的结果不会丢失。
+    """
+
+    def __init__(self, export_path, columns=(), fmt=None):
+        self.export_path = export_path
+        self.fmt = fmt or ('jsonl' if export_path.lower().endswith(('.jsonl', '.json')) else 'csv')
+        self.columns = BASE_COLUMNS + tuple(c for c in OPTIONAL_COLUMNS if c in columns)
+        self.count = 0
+
+        # 追加模式打开：可以立即发现无法创建的路径，又不会在决定是否续写之前清空文件
+        self._file = open(export_path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file) if self.fmt == 'csv' else None
+        self._started = False
+
+    def begin(self):
+        """开始新的导出：清空文件并写表头（已开始时无操作）"""
+        if self._started:
+            return
+        self._started = True
+        # 追加模式打开的文件位置在原来的末尾，truncate 不会移动它
+        self._file.truncate(0)
+        self._file.seek(0)
+        if self._writer is not None:
+            self._writer.writerow(self.columns)
+
+    def state(self):
+        """当前导出进度（保存到搜索检查点）"""
+        self.begin()
+        self._file.flush()
+        return {"path": os.path.abspath(self.export_path), "fmt": self.fmt, "columns": self.columns,
+                "offset": self._file.tell(), "count": self.count}
+
+    def resume(self, state):
+        """从检查点记录的进度继续写入；state 与本导出不一致或文件已被改短时返回 False"""
+        if self._started or not state:
+            return False
+        try:
+            if state["path"] != os.path.abspath(self.export_path) or state["fmt"] != self.fmt \
+                    or tuple(state["columns"]) != self.columns or os.path.getsize(self.export_path) < state["offset"]:
+                return False
+            # 截掉上次保存检查点之后写入的部分，这些文件会重新搜索
+            self._file.truncate(state["offset"])
+            self._file.seek(state["offset"])
+        except (KeyError, TypeError, OSError):
+            return False
+        self._started = True
+        self.count = state["count"]
+        return True
+
+    def _row(self, result):
+        filepath = result.path
+        # 大小未知（.bz2 压缩包成员）时留空
+        size_kb = result.size_kb
+        row = {'path': filepath, 'size_kb': round(size_kb, 2) if size_kb is not None else ''}
+        if len(self.columns) == len(BASE_COLUMNS):
+            return row
+
+        # 压缩包内的结果取压缩包本身的元数据
+        real_path, inner_path = split_archive_path(filepath)
+        try:
+            st = os.stat(real_path)
+        except OSError:
+            st = None
+        if 'size' in self.columns:
+            if st and inner_path is None:
+                row['size'] = st.st_size
+            else:
+                row['size'] = round(size_kb * 1024) if size_kb is not None else ''
+        if 'mtime' in self.columns:
+            row['mtime'] = datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds') if st else ''
+        if 'hit_offset' in self.columns:
+            # 搜索时记录的偏移；压缩包成员、文档和无法定位的命中留空
+            row['hit_offset'] = result.hit_offset if result.hit_offset is not None else ''
+        return row
+
+    def write(self, result):
+        """写入一条结果"""
+        self.begin()
+        row = self._row(result)
+        if self.fmt == 'csv':
+            self._writer.writerow([row[c] for c in self.columns])
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.count += 1
+        if self.count % FLUSH_INTERVAL == 0:
+            self._file.flush()
+
+    def close(self):
+        """关闭导出文件"""
+        if not self._file.closed:
+            self.begin()
+            self._file.close()
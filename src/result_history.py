@@ -0,0 +1,169 @@
+"""搜索结果历史：保存每次完成的搜索结果，之后可以立即重新打开
+
+结果以 PathStore 紧凑保存（路径 + 保存时的大小和修改时间），同时记录搜索条件和
+搜索时文件列表的指纹。重新打开时只 stat 每个结果：(大小, 修改时间) 未变的直接显示，
+变化过的文件重新验证，已删除的文件去掉。
+"""
+import os
+import time
+import pickle
+import hashlib
+import threading
+from array import array
+
+from archive_searcher import ARCHIVE_SEPARATOR, search_archive
+from path_store import PathStore
+from query import build_plan
+
+# 保存的搜索数上限（超出时删除最早的）
+MAX_HISTORY_ENTRIES = 20
+# 每次搜索最多保存的结果数
+MAX_HISTORY_RESULTS = 100000
+
+
+def _real_path(path):
+    """压缩包成员按所在压缩包判断是否变化"""
+    return path.split(ARCHIVE_SEPARATOR, 1)[0]
+
+
+def _current_stat(path):
+    try:
+        st = os.stat(_real_path(path))
+        return st.st_size, st.st_mtime
+    except OSError:
+        return None
+
+
+class ResultHistory:
+    """结果历史（缓存目录下的 result_history/，index.cache 为条目列表，每次搜索的结果单独一个文件）"""
+
+    def __init__(self, cache_dir):
+        self.history_dir = os.path.join(cache_dir, "result_history")
+        self._index_path = os.path.join(self.history_dir, "index.cache")
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key):
+        return os.path.join(self.history_dir, f"results_{key}.cache")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return []
+
+    def _write(self, path, data):
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def entries(self):
+        """所有保存的搜索（最新的在前）：[{key, label, folder_path, saved_at, count}, ...]"""
+        with self._lock:
+            return self._load_index()
+
+    def save(self, request, label, generation, results):
+        """保存一次完成的搜索；相同条件的搜索只保留最新一次"""
+        key = hashlib.md5(repr(sorted(request.items())).encode('utf-8', 'surrogatepass')).hexdigest()
+        store = PathStore()
+        sizes_kb = array('d')
+        stat_cache = {}
+        for result in results[:MAX_HISTORY_RESULTS]:
+            path = result.path
+            real_path = _real_path(path)
+            if real_path not in stat_cache:
+                stat_cache[real_path] = _current_stat(real_path)
+            size, mtime = stat_cache[real_path] or (-1, -1.0)
+            store.add(path, size, mtime)
+            sizes_kb.append(result.size_kb if result.size_kb is not None else -1.0)
+
+        folder_path = request["folder_path"]
+        entry = {
+            "key": key,
+            "label": label,
+            "folder_path": folder_path if isinstance(folder_path, str) else "; ".join(folder_path),
+            "saved_at": time.time(),
+            "count": len(store),
+        }
+        with self._lock:
+            try:
+                self._write(self._entry_path(key), {
+                    "request": request, "generation": generation, "store": store, "sizes_kb": sizes_kb,
+                })
+                index = [item for item in self._load_index() if item["key"] != key]
+                index.insert(0, entry)
+                for item in index[MAX_HISTORY_ENTRIES:]:
+                    try:
+                        os.remove(self._entry_path(item["key"]))
+                    except OSError:
+                        pass
+                self._write(self._index_path, index[:MAX_HISTORY_ENTRIES])
+            except Exception:
+                pass
+
+    def delete(self, key):
+        with self._lock:
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            try:
+                self._write(self._index_path, [item for item in self._load_index() if item["key"] != key])
+            except Exception:
+                pass
+
+    def load(self, key):
+        """读取保存的结果并按当前 stat 分类
+
+        返回 (request, generation, 未变化的 [(路径, 大小KB)], 变化过的路径列表, 已删除数)，不存在返回 None；
+        大小未知的结果大小KB 为 None。
+        """
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            return None
+        store, sizes_kb = data["store"], data["sizes_kb"]
+        unchanged, changed, removed = [], [], 0
+        stat_cache = {}
+        for file_id in store.ids():
+            path = store.path(file_id)
+            real_path = _real_path(path)
+            if real_path not in stat_cache:
+                stat_cache[real_path] = _current_stat(real_path)
+            current = stat_cache[real_path]
+            if current is None:
+                removed += 1
+            elif current == store.stat(file_id):
+                unchanged.append((path, sizes_kb[file_id] if sizes_kb[file_id] >= 0 else None))
+            else:
+                changed.append(path)
+        return data["request"], data["generation"], unchanged, changed, removed
+
+
+def reverify(searcher, request, paths):
+    """按保存的搜索条件重新搜索变化过的文件，返回仍然命中的 [(路径, 大小KB, 命中偏移)]
+
+    searcher 为本地 FileSearcher（使用其 search_file）；压缩包成员整包重新搜索，只保留原来命中的成员。
+    """
+    keywords, exclude_keywords = request["keywords"], request["exclude_keywords"]
+    plan = build_plan(keywords, exclude_keywords, request["max_errors"], request["query"])
+    archive_members = {}
+    hits = []
+    searcher.is_searching = True
+    try:
+        for path in paths:
+            if ARCHIVE_SEPARATOR in path:
+                archive_members.setdefault(_real_path(path), set()).add(path)
+                continue
+            result = searcher.search_file(path, keywords, exclude_keywords, request["ignore_comments"],
+                                          request["max_errors"], plan)
+            if result:
+                hits.append(result)
+        for archive_path, members in archive_members.items():
+            hits.extend((path, size_kb, None) for path, size_kb in search_archive(
+                archive_path, keywords, exclude_keywords, request["max_errors"], plan) if path in members)
+    finally:
+        searcher.is_searching = False
+    return hits
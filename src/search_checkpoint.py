@@ -0,0 +1,75 @@
+"""可续搜模块：搜索被停止、崩溃或程序关闭后，从检查点继续搜索剩余的文件
+
+检查点记录搜索条件、文件列表指纹（PathStore.fingerprint）、已完成文件的位图（按 file_id，
+每个文件 1 bit，百万文件约 125KB）和已找到的结果。只有条件和文件列表都未变化时才能继续，
+否则 file_id 不再对应同一文件，需要重新开始。
+"""
+
+# 搜索过程中保存检查点的间隔（秒），崩溃时最多重复搜索这段时间内完成的文件
+CHECKPOINT_INTERVAL = 5.0
+
+
+def search_request(folder_path, keywords, extensions, exclude_keywords, ignore_comments, search_archives,
+                   dedupe, max_errors, query, ignore_rules):
+    """决定搜索结果的参数（用于检查点和结果历史的匹配）"""
+    return {
+        "folder_path": folder_path, "keywords": list(keywords), "extensions": extensions,
+        "exclude_keywords": list(exclude_keywords or []), "ignore_comments": ignore_comments,
+        "search_archives": search_archives, "dedupe": dedupe, "max_errors": max_errors, "query": query,
+        "ignore_rules": ignore_rules.key() if ignore_rules is not None else None,
+    }
+
+
+class SearchCheckpoint:
+    """一次搜索的进度"""
+
+    def __init__(self, request, file_count, generation=None):
+        self.request = request          # 搜索条件（决定结果的参数）
+        self.generation = generation    # 文件列表指纹
+        self.done = bytearray((file_count + 7) // 8)  # 已完成的 file_id 位图
+        self.done_count = 0
+        self.results = []               # 已找到的结果 [(路径, 大小KB, 命中偏移)]
+        self.export = None              # 导出文件的进度（ResultExporter.state()），未导出为 None
+
+    @classmethod
+    def from_dict(cls, data):
+        """从缓存数据恢复，数据无效返回 None"""
+        if not data:
+            return None
+        try:
+            checkpoint = cls(data["request"], 0, data["generation"])
+            checkpoint.done = bytearray(data["done"])
+            checkpoint.done_count = data["done_count"]
+            # 旧版检查点的结果没有命中偏移
+            checkpoint.results = [tuple(result[:3]) + (None,) * (3 - len(result)) for result in data["results"]]
+            checkpoint.export = data.get("export")
+        except (KeyError, TypeError, ValueError):
+            return None
+        return checkpoint
+
+    def to_dict(self):
+        return {
+            "request": self.request,
+            "generation": self.generation,
+            "done": bytes(self.done),
+            "done_count": self.done_count,
+            "results": list(self.results),
+            "export": self.export,
+        }
+
+    def matches(self, request, generation):
+        """条件和文件列表都未变化时才能继续"""
+        return self.request == request and self.generation == generation
+
+    def mark_done(self, file_id):
+        index, bit = file_id >> 3, 1 << (file_id & 7)
+        if not self.done[index] & bit:
+            self.done[index] |= bit
+            self.done_count += 1
+
+    def is_done(self, file_id):
+        index = file_id >> 3
+        return index < len(self.done) and bool(self.done[index] & (1 << (file_id & 7)))
+
+    def add_result(self, path, size_kb, hit_offset=None):
+        self.results.append((path, size_kb, hit_offset))
@@ -0,0 +1,374 @@
+"""本地搜索服务模块：一个常驻进程持有热缓存和线程池，GUI 和命令行作为客户端
+
+通信使用 multiprocessing.connection（Unix 上为 Unix socket，Windows 上为命名管道），
+连接地址和认证密钥保存在仅当前用户可读的 ~/.file_finder_server.json 中。
+
+用法:
+    python src/search_server.py serve
+    python src/search_server.py search <文件夹> <关键字...> [--ext .py .txt] [--exclude 词...]
+"""
+import os
+import sys
+import json
+import secrets
+import logging
+import argparse
+import tempfile
+import threading
+from multiprocessing.connection import Client, Listener
+
+from cache_manager import CacheManager
+from file_searcher import FileSearcher
+from path_store import PathStore, SearchResult
+
+logger = logging.getLogger(__name__)
+
+SERVER_INFO_FILE = os.path.join(os.path.expanduser("~"), ".file_finder_server.json")
+
+# 客户端可以传给服务端的搜索选项
+SEARCH_OPTIONS = ('search_archives', 'locality_order', 'read_backend', 'dedupe', 'ignore_rules', 'max_errors',
+                  'query')
+
+
+def _default_address():
+    """按平台选择本地连接地址"""
+    if sys.platform == 'win32':
+        return r'\\.\pipe\file_finder_' + secrets.token_hex(8)
+    return os.path.join(tempfile.gettempdir(), f"file_finder_{os.getuid()}_{secrets.token_hex(4)}.sock")
+
+
+def _read_server_info():
+    try:
+        with open(SERVER_INFO_FILE, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        return info["address"], bytes.fromhex(info["authkey"])
+    except Exception:
+        return None
+
+
+def _write_server_info(address, authkey):
+    fd = os.open(SERVER_INFO_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump({"address": address, "authkey": authkey.hex(), "pid": os.getpid()}, f)
+
+
+class _ConnectionSink:
+    """把结果转发给客户端的导出器（与 ResultExporter 相同的接口）
+
+    结果只转发不保存，服务端的检查点中没有已找到的结果，因此服务端的搜索不能接续（resume 返回 False）。
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self.count = 0
+
+    def begin(self):
+        pass
+
+    def state(self):
+        return None
+
+    def resume(self, state):
+        return False
+
+    def write(self, result):
+        self._send('result', result.path, result.size_kb, result.hit_offset)
+        self.count += 1
+
+
+class SearchServer:
+    """常驻搜索服务：所有客户端共用同一个 CacheManager 和 FileSearcher 的线程池
+
+    每个搜索在自己的会话（FileSearcher.session()）中执行，多个客户端的搜索并发进行；
+    停止请求和客户端断开只停止对应的那个搜索。
+    """
+
+    def __init__(self, cache_dir=None, address=None):
+        cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), ".file_finder_cache")
+        self.cache_manager = CacheManager(cache_dir)
+        self.searcher = FileSearcher()
+        self.address = address or _default_address()
+        self.authkey = secrets.token_bytes(32)
+        self._searches = {}  # search_id -> 正在执行该搜索的会话
+        self._cancelled = set()  # 在搜索开始之前就收到停止请求的 search_id
+        self._searches_lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def serve_forever(self):
+        """监听连接，每个连接在独立线程中处理"""
+        listener = Listener(self.address, authkey=self.authkey)
+        _write_server_info(self.address, self.authkey)
+        logger.info(f"搜索服务已启动: {self.address}")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn = listener.accept()
+                except OSError:
+                    break
+                except Exception as e:
+                    # 认证失败等单个连接的错误不影响服务
+                    logger.warning(f"拒绝连接: {e}")
+                    continue
+                if self._stopping.is_set():
+                    conn.close()
+                    break
+                thread = threading.Thread(target=self._handle, args=(conn,))
+                thread.daemon = True
+                thread.start()
+        finally:
+            listener.close()
+            self.close()
+
+    def stop(self):
+        """请求服务退出：设置标志后自连一次，唤醒阻塞中的 accept"""
+        self._stopping.set()
+        self._stop_all()
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+    def close(self):
+        """关闭线程池并清理连接信息"""
+        logger.info("搜索服务已停止")
+        self._stop_all()
+        self.searcher.shutdown()
+        info = _read_server_info()
+        if info and info[0] == self.address:
+            try:
+                os.remove(SERVER_INFO_FILE)
+            except OSError:
+                pass
+
+    def _stop_all(self):
+        with self._searches_lock:
+            sessions = list(self._searches.values())
+        for session in sessions:
+            session.stop_search()
+
+    def _handle(self, conn):
+        send_lock = threading.Lock()
+        disconnected = threading.Event()
+        session = self.searcher.session()
+
+        def send(*message):
+            if disconnected.is_set():
+                return
+            try:
+                with send_lock:
+                    conn.send(message)
+            except (OSError, EOFError):
+                # 客户端已断开，只停止为这个连接进行的搜索
+                disconnected.set()
+                session.stop_search()
+
+        try:
+            request = conn.recv()
+            op = request.get("op")
+            if op == "ping":
+                send("pong")
+            elif op == "stop":
+                with self._searches_lock:
+                    target = self._searches.get(request.get("search_id"))
+                    if target is None and request.get("search_id"):
+                        self._cancelled.add(request["search_id"])
+                if target is not None:
+                    target.stop_search()
+                send("ok")
+            elif op == "shutdown":
+                send("ok")
+                self.stop()
+            elif op == "search":
+                self._run_search(session, request, send)
+            else:
+                send("error", f"未知操作: {op}")
+        except (OSError, EOFError):
+            pass
+        except Exception as e:
+            logger.error(f"处理请求失败: {e}")
+            send("error", str(e))
+        finally:
+            conn.close()
+
+    def _run_search(self, session, request, send):
+        options = {key: request[key] for key in SEARCH_OPTIONS if key in request}
+        search_id = request.get("search_id") or secrets.token_hex(8)
+        sink = _ConnectionSink(send)
+        with self._searches_lock:
+            if search_id in self._cancelled:
+                self._cancelled.discard(search_id)
+                send("done", 0)
+                return
+            self._searches[search_id] = session
+        try:
+            session.search_files_parallel(
+                request["folder_path"], request["keywords"], request.get("extensions"),
+                request.get("exclude_keywords") or [], request.get("ignore_comments", False),
+                self.cache_manager,
+                lambda message, current=0, total=0: send("progress", message, current, total),
+                lambda result: None,
+                lambda count: send("stats", count),
+                exporter=sink, export_only=True, resumable=False,
+                **options
+            )
+        finally:
+            with self._searches_lock:
+                self._searches.pop(search_id, None)
+        send("done", sink.count)
+
+
+class SearchClient:
+    """搜索服务客户端"""
+
+    def __init__(self, address, authkey):
+        self.address = address
+        self.authkey = authkey
+
+    @classmethod
+    def connect_if_running(cls):
+        """服务在运行时返回客户端，否则返回 None"""
+        info = _read_server_info()
+        if not info:
+            return None
+        client = cls(*info)
+        try:
+            if client.request({"op": "ping"}) == ("pong",):
+                return client
+        except Exception:
+            pass
+        return None
+
+    def request(self, payload):
+        """发送一个请求并返回第一条回复"""
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(payload)
+            return conn.recv()
+
+    def stream(self, payload):
+        """发送请求并逐条产出服务端消息，直到 done/error"""
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send(payload)
+            while True:
+                message = conn.recv()
+                yield message
+                if message[0] in ("done", "error"):
+                    return
+
+
+class RemoteSearcher:
+    """与 FileSearcher 接口一致的远程搜索器，供 FileFinderApp 透明使用"""
+
+    def __init__(self, client):
+        self.client = client
+        self.is_searching = False
+        self._search_id = None  # 正在进行的搜索，停止时只停止它
+
+    def search_files_parallel(self, folder_path, keywords, extensions, exclude_keywords,
+                              ignore_comments, cache_manager,
+                              progress_callback, result_callback, stats_callback,
+                              exporter=None, export_only=False, **options):
+        """由服务端执行搜索，本地只接收流式结果（cache_manager 由服务端持有，此处忽略）"""
+        if options.get("resume"):
+            # 服务端只转发结果，检查点中没有停止前已找到的结果，无法接续
+            progress_callback("通过搜索服务搜索时不能继续上次搜索，重新开始搜索", 0, 0)
+        self.is_searching = True
+        self._search_id = secrets.token_hex(8)
+        store = PathStore()
+        search_results = []
+        payload = {
+            "op": "search", "search_id": self._search_id, "folder_path": folder_path, "keywords": keywords,
+            "extensions": extensions, "exclude_keywords": exclude_keywords,
+            "ignore_comments": ignore_comments,
+        }
+        payload.update({key: value for key, value in options.items() if key in SEARCH_OPTIONS})
+        try:
+            for message in self.client.stream(payload):
+                kind = message[0]
+                if kind == "progress":
+                    progress_callback(*message[1:])
+                elif kind == "stats":
+                    stats_callback(message[1])
+                elif kind == "result":
+                    record = SearchResult(store, store.add(message[1]), message[2],
+                                          message[3] if len(message) > 3 else None)
+                    if exporter is not None:
+                        exporter.write(record)
+                    if not export_only:
+                        search_results.append(record)
+                        result_callback(record)
+                elif kind == "error":
+                    raise RuntimeError(message[1])
+        finally:
+            self.is_searching = False
+            self._search_id = None
+        return search_results
+
+    def stop_search(self):
+        """只停止本客户端正在进行的搜索，其他客户端的搜索不受影响"""
+        search_id = self._search_id
+        if search_id is None:
+            return
+        try:
+            self.client.request({"op": "stop", "search_id": search_id})
+        except Exception:
+            pass
+
+    def shutdown(self):
+        """服务端的线程池由服务进程管理，客户端无需关闭"""
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FileFinder 本地搜索服务")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", help="启动搜索服务")
+    sub.add_parser("stop", help="关闭搜索服务")
+    search = sub.add_parser("search", help="通过搜索服务搜索")
+    search.add_argument("folder", help="文件夹，多个用分号分隔")
+    search.add_argument("keywords", nargs="+")
+    search.add_argument("--ext", nargs="*", default=None, help="后缀名过滤")
+    search.add_argument("--exclude", nargs="*", default=[], help="排除关键字")
+    search.add_argument("--max-errors", type=int, default=0, help="模糊匹配允许的错误字符数")
+    args = parser.parse_args(argv)
+
+    from config_manager import setup_logging
+    from query import is_boolean_query
+    from utils import parse_extensions, parse_folders
+    setup_logging()
+
+    if args.command == "serve":
+        if SearchClient.connect_if_running():
+            print("搜索服务已在运行")
+            return 1
+        SearchServer().serve_forever()
+        return 0
+
+    client = SearchClient.connect_if_running()
+    if client is None:
+        print("搜索服务未运行，请先执行: python src/search_server.py serve")
+        return 1
+
+    if args.command == "stop":
+        client.request({"op": "shutdown"})
+        return 0
+
+    folders = parse_folders(args.folder)
+    # 关键字中使用了 AND/OR/NOT 或路径条件时整体作为查询发送
+    query_text = " ".join(args.keywords)
+    query = query_text if is_boolean_query(query_text) else None
+    searcher = RemoteSearcher(client)
+    results = searcher.search_files_parallel(
+        folders if len(folders) > 1 else folders[0], args.keywords,
+        parse_extensions(" ".join(args.ext or [])), args.exclude, False, None,
+        lambda message, current=0, total=0: print(message, file=sys.stderr),
+        lambda result: print(result.path, flush=True),
+        lambda count: None,
+        max_errors=args.max_errors,
+        query=query,
+    )
+    print(f"共找到 {len(results)} 个文件", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
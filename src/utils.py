@@ -61,3 +61,16 @@ def parse_extensions(extensions_text):
             extensions.append(ext.lower())
     
     return extensions if extensions else None
+
+
+def parse_folders(folders_text):
+    """解析文件夹路径列表，多个路径用分号分隔（去重，保持顺序）"""
+    if not folders_text or not folders_text.strip():
+        return []
+    
+    folders = []
+    for folder in folders_text.split(';'):
+        folder = folder.strip().strip('"')
+        if folder and folder not in folders:
+            folders.append(folder)
+    return folders
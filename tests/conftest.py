@@ -0,0 +1,32 @@
+"""测试配置：src/ 下的模块按顶层模块导入（与 app.py 的运行方式一致）"""
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+@pytest.fixture
+def run_search(tmp_path_factory):
+    """在新的 FileSearcher 上执行一次搜索，返回命中路径的集合（相对 folder）"""
+    from cache_manager import CacheManager
+    from file_searcher import FileSearcher
+
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    searchers = []
+
+    def run(folder, keywords, extensions=None, exclude_keywords=None, **options):
+        searcher = FileSearcher(max_workers=4)
+        searchers.append(searcher)
+        options.setdefault("resumable", False)
+        results = searcher.search_files_parallel(
+            str(folder), keywords, extensions, exclude_keywords, False, CacheManager(cache_dir),
+            lambda message, current=0, total=0: None, lambda result: None, lambda count: None, **options)
+        return {os.path.relpath(result.path, str(folder)).replace(os.sep, '/') for result in results}
+
+    yield run
+    for searcher in searchers:
+        searcher.shutdown()
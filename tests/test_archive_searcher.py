@@ -0,0 +1,163 @@
+"""archive_searcher：压缩包成员流式搜索，报告解压后的大小"""
+import bz2
+import gzip
+import io
+import lzma
+import tarfile
+import zipfile
+
+import pytest
+
+import archive_searcher
+from archive_searcher import ARCHIVE_SEPARATOR, search_archive, split_archive_path
+from query import build_plan
+
+CONTENT = b"header line\n" + b"filler " * 20000 + b"the needle is here\n"
+
+
+def _xz_multi(data, padding=b""):
+    """两个流拼接的 .xz（xz 工具允许流之间有 4 字节对齐的零填充）"""
+    half = len(data) // 2
+    return lzma.compress(data[:half]) + padding + lzma.compress(data[half:])
+
+
+@pytest.mark.parametrize("ext, compress", [(".gz", gzip.compress), (".xz", lzma.compress), (".xz", _xz_multi)])
+def test_single_file_reports_uncompressed_size(tmp_path, ext, compress):
+    path = tmp_path / f"log.txt{ext}"
+    path.write_bytes(compress(CONTENT))
+    assert path.stat().st_size < len(CONTENT) // 10
+    results = search_archive(str(path), ["needle"])
+    assert results == [(f"{path}{ARCHIVE_SEPARATOR}log.txt", len(CONTENT) / 1024)]
+    assert search_archive(str(path), ["missing"]) == []
+
+
+def test_bz2_size_unknown(tmp_path):
+    path = tmp_path / "log.txt.bz2"
+    path.write_bytes(bz2.compress(CONTENT))
+    assert search_archive(str(path), ["needle"]) == [(f"{path}{ARCHIVE_SEPARATOR}log.txt", None)]
+    # 大小未知时 size: 条件不成立，但不影响 OR 的其他分支
+    assert search_archive(str(path), [], plan=build_plan([], query="needle size:>1kb")) == []
+    assert len(search_archive(str(path), [], plan=build_plan([], query="needle OR size:>1kb"))) == 1
+
+
+def test_single_file_size_predicate_uses_metadata(tmp_path, monkeypatch):
+    path = tmp_path / "log.txt.gz"
+    path.write_bytes(gzip.compress(CONTENT))
+    big = build_plan([], query="needle size:>100kb")
+    small = build_plan([], query="size:<10kb needle")
+    assert len(search_archive(str(path), [], plan=big)) == 1
+    # 大小不满足时不解压
+    monkeypatch.setattr(archive_searcher, "_match_stream", lambda stream, evaluation: pytest.fail("解压了"))
+    assert search_archive(str(path), [], plan=small) == []
+
+
+@pytest.mark.parametrize("ext, compress", [(".gz", gzip.compress), (".xz", lzma.compress),
+                                           (".bz2", bz2.compress)])
+def test_single_file_hit_stops_decompressing(tmp_path, monkeypatch, ext, compress):
+    data = b"needle\n" + bytes(range(256)) * 8192
+    path = tmp_path / f"big.log{ext}"
+    path.write_bytes(compress(data))
+    reads = []
+    original = archive_searcher._match_stream
+
+    def counting(stream, evaluation):
+        class Counted:
+            def read(self, size=-1):
+                chunk = stream.read(size)
+                reads.append(len(chunk))
+                return chunk
+        return original(Counted(), evaluation)
+    monkeypatch.setattr(archive_searcher, "_match_stream", counting)
+    [(_, size_kb)] = search_archive(str(path), ["needle"])
+    assert size_kb == (None if ext == ".bz2" else len(data) / 1024)
+    assert sum(reads) <= archive_searcher._CHUNK_SIZE
+
+
+def test_xz_size_with_stream_padding(tmp_path):
+    path = tmp_path / "padded.xz"
+    path.write_bytes(_xz_multi(CONTENT, padding=b"\0" * 8) + b"\0" * 4)
+    assert archive_searcher._single_file_size(str(path)) == len(CONTENT)
+
+
+def test_xz_with_corrupt_index_size_unknown(tmp_path):
+    data = bytearray(lzma.compress(CONTENT))
+    data[-2:] = b"XX"
+    path = tmp_path / "bad.xz"
+    path.write_bytes(bytes(data))
+    assert archive_searcher._single_file_size(str(path)) is None
+
+
+def test_zip_and_tar_members(tmp_path):
+    zip_path = tmp_path / "a.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("dir/hit.txt", CONTENT)
+        zf.writestr("dir/miss.txt", b"nothing")
+        zf.writestr("image.png", b"needle")
+    assert search_archive(str(zip_path), ["needle"]) == [
+        (f"{zip_path}{ARCHIVE_SEPARATOR}dir/hit.txt", len(CONTENT) / 1024)]
+
+    tar_path = tmp_path / "a.tar.gz"
+    with tarfile.open(tar_path, "w:gz") as tf:
+        info = tarfile.TarInfo("inner/hit.log")
+        info.size = len(CONTENT)
+        tf.addfile(info, io.BytesIO(CONTENT))
+    results = search_archive(str(tar_path), ["needle"])
+    assert [split_archive_path(path)[1] for path, _ in results] == ["inner/hit.log"]
+
+
+def test_corrupt_archive_returns_no_results(tmp_path):
+    path = tmp_path / "broken.gz"
+    path.write_bytes(gzip.compress(CONTENT)[:200])
+    assert search_archive(str(path), ["needle"]) == []
+
+
+def test_keyword_across_stream_chunks(tmp_path):
+    data = b"x" * (archive_searcher._CHUNK_SIZE - 3) + b"needle" + b"y" * 1000
+    path = tmp_path / "a.zip"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("edge.txt", data)
+    assert len(search_archive(str(path), ["needle"])) == 1
+
+
+def test_member_path_predicates_and_utf16_members(tmp_path):
+    path = tmp_path / "a.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("src/main.py", b"needle")
+        zf.writestr("docs/readme.md", b"needle")
+        zf.writestr("docs/utf16.txt", "﻿wide needle".encode("utf-16-le"))
+        zf.writestr("docs/binary.dat", b"needle" + b"\x00" * 4096)
+    found = {split_archive_path(p)[1] for p, _ in search_archive(str(path), [], plan=build_plan(
+        [], query="needle NOT ext:py"))}
+    assert found == {"docs/readme.md", "docs/utf16.txt"}
+
+
+def test_stream_reading_stops_once_decided(tmp_path, monkeypatch):
+    data = b"needle " + b"z" * (archive_searcher._CHUNK_SIZE * 8)
+    path = tmp_path / "a.tar"
+    with tarfile.open(path, "w") as tf:
+        info = tarfile.TarInfo("big.log")
+        info.size = len(data)
+        tf.addfile(info, io.BytesIO(data))
+    reads = []
+    original = archive_searcher._match_stream
+
+    def counting(stream, evaluation):
+        class Counted:
+            def read(self, size=-1):
+                chunk = stream.read(size)
+                reads.append(len(chunk))
+                return chunk
+        return original(Counted(), evaluation)
+    monkeypatch.setattr(archive_searcher, "_match_stream", counting)
+    assert len(search_archive(str(path), ["needle"], ["absent"])) == 1
+    # 关键字在第一块中找到后不再读取成员的其余部分
+    assert len(reads) == 1
+
+
+def test_archives_searched_through_file_searcher(tmp_path, run_search):
+    with zipfile.ZipFile(tmp_path / "logs.zip", "w") as zf:
+        zf.writestr("app/today.log", b"error: needle")
+        zf.writestr("app/old.log", b"fine")
+    (tmp_path / "plain.txt").write_text("needle")
+    assert run_search(tmp_path, ["needle"]) == {"plain.txt"}
+    assert run_search(tmp_path, ["needle"], search_archives=True) == {"plain.txt", "logs.zip!/app/today.log"}
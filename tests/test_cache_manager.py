@@ -0,0 +1,88 @@
+"""启动相关：线程池和日志文件延迟创建，文件列表缓存预热后首次搜索直接复用；统计缓存的原子写入"""
+import logging
+import os
+import pickle
+
+import cache_manager
+from cache_manager import CacheManager
+from config_manager import _LazyFileHandler
+from file_searcher import FileSearcher
+from path_store import PathStore
+
+
+def test_searcher_creates_pools_on_first_use():
+    searcher = FileSearcher(max_workers=2)
+    try:
+        assert searcher._executor is None and searcher._device_pools is None
+        assert searcher.executor is searcher.executor
+    finally:
+        searcher.shutdown()
+
+
+def test_log_file_opened_on_first_record(tmp_path):
+    log_file = tmp_path / "logs" / "app.log"
+    handler = _LazyFileHandler(str(log_file), encoding="utf-8", delay=True)
+    try:
+        assert not log_file.parent.exists()
+        handler.emit(logging.LogRecord("t", logging.INFO, __file__, 1, "hello", None, None))
+        assert "hello" in log_file.read_text(encoding="utf-8")
+    finally:
+        handler.close()
+
+
+def test_prefetch_scans_once_and_keeps_list_in_memory(tmp_path, monkeypatch):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    (folder / "a.txt").write_text("a")
+    manager = CacheManager(str(tmp_path / "cache"))
+    scans = []
+
+    def scan(path):
+        scans.append(path)
+        return PathStore.from_paths([str(folder / "a.txt")])
+
+    warmed = manager.prefetch_file_cache(str(folder), scan)
+    # 预热后的列表留在内存中，第一次搜索不再读取缓存文件
+    monkeypatch.setattr(pickle, "load", lambda f: (_ for _ in ()).throw(AssertionError("不应读取缓存文件")))
+    assert manager.prefetch_file_cache(str(folder), scan) is warmed
+    assert manager.load_file_cache(str(folder)) is warmed
+    assert scans == [str(folder)]
+
+
+def test_file_list_cache_invalidated_by_new_file(tmp_path):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    (folder / "a.txt").write_text("a")
+    manager = CacheManager(str(tmp_path / "cache"))
+    manager.save_file_cache(str(folder), PathStore.from_paths([str(folder / "a.txt")]))
+    assert CacheManager(str(tmp_path / "cache")).load_file_cache(str(folder)) is not None
+    (folder / "b.txt").write_text("b")
+    assert manager.load_file_cache(str(folder)) is None
+
+
+def test_match_history_saved_atomically(tmp_path, monkeypatch):
+    cache = CacheManager(str(tmp_path))
+    cache.save_match_history({"ext": {".txt": [1, 2]}, "hits": ["/a.txt"]})
+
+    def fail_dump(obj, f, *args, **kwargs):
+        f.write(b"partial")
+        raise OSError("disk full")
+    monkeypatch.setattr(cache_manager.pickle, "dump", fail_dump)
+    cache.save_match_history({"ext": {}, "hits": []})
+    monkeypatch.undo()
+    # 写入失败时保留原文件，也不留下临时文件
+    assert cache.load_match_history() == {"ext": {".txt": [1, 2]}, "hits": ["/a.txt"]}
+    assert os.listdir(tmp_path) == ["match_history.cache"]
+
+
+def test_term_stats_saved_atomically(tmp_path, monkeypatch):
+    cache = CacheManager(str(tmp_path))
+    cache.save_term_stats({"needle": [3, 10]})
+
+    def fail_replace(src, dst):
+        raise OSError("busy")
+    monkeypatch.setattr(cache_manager.os, "replace", fail_replace)
+    cache.save_term_stats({"needle": [0, 0]})
+    monkeypatch.undo()
+    assert cache.load_term_stats() == {"needle": [3, 10]}
+    assert os.listdir(tmp_path) == ["term_stats.cache"]
@@ -0,0 +1,73 @@
+"""config_manager：内存为准、合并延迟写盘、原子写入保留文件权限"""
+import json
+import os
+import stat
+
+import pytest
+
+import config_manager
+from config_manager import ConfigManager
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_changes_are_coalesced_into_one_write(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    manager = ConfigManager(str(path), flush_delay=60)
+    writes = []
+    original = manager._write_atomic
+    monkeypatch.setattr(manager, "_write_atomic", lambda config: (writes.append(config), original(config)))
+    for i in range(5):
+        manager.add_search_history(f"keyword {i}")
+    assert writes == [] and not path.exists()
+    manager.close()
+    assert len(writes) == 1
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["search_history"][:2] == ["keyword 4", "keyword 3"]
+    assert ConfigManager(str(path)).config["search_history"] == saved["search_history"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX 权限位")
+@pytest.mark.parametrize("mode", [0o644, 0o640, 0o600])
+def test_atomic_write_keeps_existing_mode(tmp_path, mode):
+    path = tmp_path / "config.json"
+    path.write_text("{}", encoding="utf-8")
+    os.chmod(path, mode)
+    manager = ConfigManager(str(path), flush_delay=0)
+    manager.add_folder_history("/data")
+    manager.close()
+    assert _mode(path) == mode
+    assert json.loads(path.read_text(encoding="utf-8"))["folder_history"] == ["/data"]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX 权限位")
+def test_new_config_file_uses_umask_default(tmp_path):
+    path = tmp_path / "sub" / "config.json"
+    manager = ConfigManager(str(path), flush_delay=0)
+    manager.add_folder_history("/data")
+    manager.close()
+    assert _mode(path) == 0o666 & ~config_manager._UMASK
+
+
+def test_failed_write_leaves_old_file_and_no_temp(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text('{"version": 2, "folder_history": ["/old"]}', encoding="utf-8")
+    manager = ConfigManager(str(path), flush_delay=60)
+    manager.add_folder_history("/new")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(config_manager.json, "dump", fail)
+    assert manager.flush() is False
+    assert json.loads(path.read_text(encoding="utf-8"))["folder_history"] == ["/old"]
+    assert os.listdir(tmp_path) == ["config.json"]
+
+
+def test_broken_config_backed_up(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{not json", encoding="utf-8")
+    manager = ConfigManager(str(path))
+    assert manager.config["search_history"] == []
+    assert (tmp_path / "config.json.broken").exists()
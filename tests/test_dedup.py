@@ -0,0 +1,93 @@
+"""dedup：按 大小 → 部分哈希 → 完整哈希 分组"""
+import os
+
+import dedup
+from dedup import PARTIAL_HASH_SIZE, DuplicateFinder
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def _find(paths):
+    return DuplicateFinder().find_groups(range(len(paths)), paths.__getitem__)
+
+
+def test_identical_files_grouped(tmp_path):
+    data = os.urandom(20000)
+    paths = [_write(tmp_path / f"{i}.txt", data) for i in range(3)]
+    assert _find(paths) == {0: [1, 2]}
+
+
+def test_small_files_differing_in_tail_not_grouped(tmp_path):
+    head = b"a" * (PARTIAL_HASH_SIZE + 100)
+    paths = [_write(tmp_path / "a.txt", head + b"x" * 1000),
+             _write(tmp_path / "b.txt", head + b"y" * 1000)]
+    assert _find(paths) == {}
+
+
+def test_small_identical_files_grouped(tmp_path):
+    data = b"b" * (PARTIAL_HASH_SIZE * 2)
+    paths = [_write(tmp_path / "a.txt", data), _write(tmp_path / "b.txt", data)]
+    assert _find(paths) == {0: [1]}
+
+
+def test_large_files_differing_in_middle_not_grouped(tmp_path):
+    size = PARTIAL_HASH_SIZE * 4
+    first = bytearray(b"c" * size)
+    second = bytearray(first)
+    second[size // 2] = ord("d")
+    paths = [_write(tmp_path / "a.txt", bytes(first)), _write(tmp_path / "b.txt", bytes(second))]
+    assert _find(paths) == {}
+
+
+def test_different_extensions_not_grouped(tmp_path):
+    data = b"same content" * 100
+    paths = [_write(tmp_path / "a.txt", data), _write(tmp_path / "a.log", data)]
+    assert _find(paths) == {}
+
+
+def test_full_hash_cached(tmp_path):
+    data = os.urandom(PARTIAL_HASH_SIZE * 3)
+    paths = [_write(tmp_path / "a.bin", data), _write(tmp_path / "b.bin", data)]
+    cache = {}
+    DuplicateFinder(cache).find_groups(range(2), paths.__getitem__)
+    assert len(cache) == 2
+
+
+def _meta(paths):
+    """模拟文件列表中记录的 (st_dev, st_ino, 大小, mtime)"""
+    metas = []
+    for path in paths:
+        st = os.stat(path)
+        metas.append((st.st_dev, st.st_ino, st.st_size, st.st_mtime))
+    return metas.__getitem__
+
+
+def test_recorded_metadata_used_without_stat(tmp_path, monkeypatch):
+    data = os.urandom(20000)
+    paths = [_write(tmp_path / f"{i}.txt", data) for i in range(3)]
+    meta_of = _meta(paths)
+
+    def no_stat(path, *args, **kwargs):
+        raise AssertionError(f"stat {path}")
+    monkeypatch.setattr(dedup.os, "stat", no_stat)
+    assert DuplicateFinder().find_groups(range(3), paths.__getitem__, meta_of) == {0: [1, 2]}
+
+
+def test_cached_full_hash_skips_partial_hash(tmp_path, monkeypatch):
+    data = os.urandom(PARTIAL_HASH_SIZE * 3)
+    paths = [_write(tmp_path / f"{i}.bin", data) for i in range(3)]
+    meta_of = _meta(paths)
+    cache = {}
+    DuplicateFinder(cache).find_groups(range(2), paths.__getitem__, meta_of)
+    assert len(cache) == 2
+
+    def no_partial(filepath, size):
+        raise AssertionError(f"partial hash {filepath}")
+    monkeypatch.setattr(dedup, "_partial_hash", no_partial)
+    assert DuplicateFinder(cache).find_groups(range(2), paths.__getitem__, meta_of) == {0: [1]}
+    # 新文件与已缓存的文件比较完整哈希
+    assert DuplicateFinder(cache).find_groups(range(3), paths.__getitem__, meta_of) == {0: [1, 2]}
+    assert len(cache) == 3
@@ -0,0 +1,112 @@
+"""device_pools：看门狗跳过没有进展或总耗时过长的任务，并补充线程"""
+import os
+import threading
+import time
+
+import pytest
+
+import device_pools
+from device_pools import DevicePools, SearchStats, current_task
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(device_pools, "WATCHDOG_INTERVAL", 0.05)
+    created = []
+
+    def make(**options):
+        created.append(DevicePools(1, **options))
+        return created[-1]
+
+    yield make
+    for item in created:
+        item.shutdown()
+
+
+def _trickle(release):
+    """每 20ms 报告一次进展（模拟每次只返回几个字节的读取），直到 release 被设置"""
+    task = current_task()
+    while not release.wait(0.02):
+        task.beat()
+    return "done"
+
+
+def test_trickling_task_abandoned_after_deadline(pools):
+    release = threading.Event()
+    try:
+        pool = pools(stall_timeout=10.0, task_deadline=0.3).pool(0)
+        started = time.monotonic()
+        slow = pool.submit(_trickle, release)
+        with pytest.raises(TimeoutError):
+            slow.result(timeout=5)
+        assert time.monotonic() - started < 3
+        assert pool.stats.stalled == 1
+        # 唯一的线程被占住，补充的线程接手后续任务
+        assert pool.submit(lambda: 42).result(timeout=5) == 42
+    finally:
+        release.set()
+
+
+def test_stalled_task_abandoned_without_progress(pools):
+    release = threading.Event()
+    try:
+        pool = pools(stall_timeout=0.2, task_deadline=60.0).pool(0)
+        blocked = pool.submit(release.wait)
+        with pytest.raises(TimeoutError):
+            blocked.result(timeout=5)
+        assert pool.submit(lambda: "next").result(timeout=5) == "next"
+    finally:
+        release.set()
+
+
+def test_progressing_task_within_deadline_completes(pools):
+    release = threading.Event()
+    pool = pools(stall_timeout=0.2, task_deadline=60.0).pool(0)
+    future = pool.submit(_trickle, release)
+    time.sleep(0.5)
+    release.set()
+    assert future.result(timeout=5) == "done"
+    assert pool.stats.stalled == 0
+
+
+def test_slow_devices_get_fewer_workers(monkeypatch):
+    kinds = {1: device_pools.DEVICE_SSD, 2: device_pools.DEVICE_ROTATIONAL,
+             3: device_pools.DEVICE_NETWORK, 4: device_pools.DEVICE_UNKNOWN}
+    monkeypatch.setattr(device_pools, "device_kind", kinds.__getitem__)
+    pools = DevicePools(16)
+    try:
+        assert pools.pool(1).max_workers == 16
+        assert pools.pool(2).max_workers == device_pools.SLOW_DEVICE_WORKERS
+        assert pools.pool(3).max_workers == device_pools.SLOW_DEVICE_WORKERS
+        assert pools.pool(4).max_workers == 16
+    finally:
+        pools.shutdown()
+
+
+def test_network_filesystem_detected_from_mount_table():
+    dev = os.makedev(0, 77)
+    assert device_pools.device_kind(dev, {"0:77": "nfs4"}) == device_pools.DEVICE_NETWORK
+    assert device_pools.device_kind(dev, {"0:77": "tmpfs"}) == device_pools.DEVICE_UNKNOWN
+
+
+def test_device_kind_of_local_directory(tmp_path):
+    kind = device_pools.device_kind(os.stat(tmp_path).st_dev)
+    assert kind in (device_pools.DEVICE_SSD, device_pools.DEVICE_ROTATIONAL,
+                    device_pools.DEVICE_NETWORK, device_pools.DEVICE_UNKNOWN)
+
+
+def test_search_stats_kept_per_search(pools):
+    release = threading.Event()
+    try:
+        pool = pools(stall_timeout=0.2, task_deadline=60.0).pool(0)
+        first, second = SearchStats(), SearchStats()
+        blocked = pool.submit_tracked(first.device(0), release.wait)
+        with pytest.raises(TimeoutError):
+            blocked.result(timeout=5)
+        assert pool.submit_tracked(second.device(0), lambda: 1).result(timeout=5) == 1
+        # 两次搜索共用线程池，但卡住和完成的任务各自只计入提交它的搜索
+        assert first.stalled_count() == 1 and first.device(0).count == 0
+        assert second.stalled_count() == 0 and second.device(0).count == 1
+        assert pool.stats.stalled == 1
+    finally:
+        release.set()
@@ -0,0 +1,170 @@
+"""document_text：docx/xlsx/pptx/pdf 的文字提取、提取缓存的淘汰，以及在文档中搜索"""
+import os
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import document_text
+import file_searcher
+from document_text import DocumentTextCache, extract_text, extract_to_file, is_document
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+A = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+S = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def _zip(path, parts):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def _docx(path, paragraphs):
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    return _zip(path, {
+        "[Content_Types].xml": "<Types/>",
+        "word/document.xml": f"<w:document {W}><w:body>{body}</w:body></w:document>",
+        "word/header1.xml": f"<w:hdr {W}><w:p><w:r><w:t>页眉文字</w:t></w:r></w:p></w:hdr>",
+    })
+
+
+def _pdf(path, content, compress=False, extra_objects=()):
+    """最小的 PDF：一个页面内容流（可选 FlateDecode 压缩）和额外的对象"""
+    stream = zlib.compress(content) if compress else content
+    filters = b" /Filter /FlateDecode" if compress else b""
+    objects = [b"<< /Type /Catalog >>",
+               b"<< /Length %d%s >>\nstream\n" % (len(stream), filters) + stream + b"\nendstream"]
+    objects.extend(extra_objects)
+    body = b"".join(b"%d 0 obj\n" % (i + 1) + obj + b"\nendobj\n" for i, obj in enumerate(objects))
+    path.write_bytes(b"%PDF-1.4\n" + body + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n")
+    return str(path)
+
+
+def test_is_document():
+    assert is_document("/a/Report.DOCX") and is_document("b.pdf")
+    assert not is_document("c.doc") and not is_document("d.txt")
+
+
+def test_docx_paragraphs_and_headers(tmp_path):
+    text = extract_text(_docx(tmp_path / "a.docx", ["第一段 alpha", "second paragraph"]))
+    assert "第一段 alpha\nsecond paragraph" in text
+    assert "页眉文字" in text
+
+
+def test_pptx_slides_in_numeric_order(tmp_path):
+    slide = '<p:sld xmlns:p="p" {A}><a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>'
+    path = _zip(tmp_path / "a.pptx", {
+        "ppt/slides/slide10.xml": slide.format(A=A, text="slide ten"),
+        "ppt/slides/slide2.xml": slide.format(A=A, text="slide two"),
+        "ppt/notesSlides/notesSlide2.xml": slide.format(A=A, text="speaker notes"),
+        "ppt/slideLayouts/slideLayout1.xml": slide.format(A=A, text="layout placeholder"),
+    })
+    text = extract_text(path)
+    assert text.index("slide two") < text.index("slide ten")
+    assert "speaker notes" in text and "layout placeholder" not in text
+
+
+def test_xlsx_shared_and_inline_strings(tmp_path):
+    path = _zip(tmp_path / "a.xlsx", {
+        "xl/sharedStrings.xml": f'<sst {S}><si><t>共享文本</t></si><si><r><t>rich </t></r><r><t>run</t></r></si></sst>',
+        "xl/worksheets/sheet1.xml": (
+            f'<worksheet {S}><sheetData>'
+            '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1"><v>42</v></c></row>'
+            '<row r="2"><c r="A2" t="s"><v>1</v></c><c r="B2" t="inlineStr"><is><t>inline</t></is></c></row>'
+            '</sheetData></worksheet>'),
+    })
+    assert extract_text(path).splitlines()[:2] == ["共享文本\t42", "rich run\tinline"]
+
+
+def test_pdf_plain_and_compressed_streams(tmp_path):
+    content = b"BT /F1 12 Tf 72 700 Td (Hello \\(pdf\\) world) Tj 0 -14 Td [(spa) -300 (ced)] TJ ET"
+    assert "Hello (pdf) world\nspa ced" in extract_text(_pdf(tmp_path / "a.pdf", content))
+    assert "Hello (pdf) world" in extract_text(_pdf(tmp_path / "b.pdf", content, compress=True))
+
+
+def test_pdf_tounicode_cmap(tmp_path):
+    cmap = (b"/CIDInit /ProcSet findresource begin begincmap\n"
+            b"2 beginbfchar\n<0001> <4E2D>\n<0002> <6587>\nendbfchar\n"
+            b"1 beginbfrange\n<0010> <0012> <0041>\nendbfrange\nendcmap")
+    cmap_object = b"<< /Length %d >>\nstream\n" % len(cmap) + cmap + b"\nendstream"
+    content = b"BT /F1 12 Tf <00010002> Tj 0 -14 Td <001000110012> Tj ET"
+    text = extract_text(_pdf(tmp_path / "c.pdf", content, compress=True, extra_objects=[cmap_object]))
+    assert "中文\nABC" in text
+
+
+def test_pdf_stream_decompressed_size_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_text, "MAX_PDF_STREAM_SIZE", 1000)
+    content = b"BT (head) Tj ET\n" + b" " * 100000 + b"BT (tail) Tj ET"
+    text = extract_text(_pdf(tmp_path / "big.pdf", content, compress=True))
+    assert "head" in text and "tail" not in text
+
+
+@pytest.mark.parametrize("name, data", [("bad.docx", b"not a zip"), ("bad.pdf", b"%PDF-1.4 garbage"),
+                                        ("bad.xlsx", b"")])
+def test_unreadable_documents_give_empty_text(tmp_path, name, data):
+    (tmp_path / name).write_bytes(data)
+    assert extract_text(str(tmp_path / name)) == ""
+
+
+def test_extract_to_file_strips_control_characters(tmp_path):
+    path = _pdf(tmp_path / "a.pdf", b"BT (nul\\000ctl\\001here) Tj ET")
+    text_path = str(tmp_path / "cache" / "a.txt")
+    size = extract_to_file(path, text_path)
+    with open(text_path, "rb") as f:
+        data = f.read()
+    assert size == len(data) and b"nulctlhere" in data
+
+
+def test_cache_lookup_and_lru_eviction(tmp_path):
+    cache = DocumentTextCache(str(tmp_path / "cache"), max_bytes=1000)
+    assert cache.lookup("/a.docx", 10, 1.0) is None
+    paths = []
+    for i in range(4):
+        text_path = cache.text_path(f"/doc{i}.docx", 10, 1.0)
+        os.makedirs(os.path.dirname(text_path), exist_ok=True)
+        with open(text_path, "wb") as f:
+            f.write(b"x" * 300)
+        os.utime(text_path, (i, i))
+        paths.append(text_path)
+        if i == 2:
+            # 最早写入的文档刚被使用过，不应被淘汰
+            assert cache.lookup("/doc0.docx", 10, 1.0) == paths[0]
+        cache.added(300)
+    remaining = [os.path.exists(path) for path in paths]
+    assert remaining[0] and remaining[3] and not remaining[1]
+    assert sum(os.path.getsize(path) for path, exists in zip(paths, remaining) if exists) <= 800
+    # 文档修改后（大小或修改时间变化）对应不同的缓存文件
+    assert cache.text_path("/doc0.docx", 11, 1.0) != paths[0]
+
+
+def test_search_finds_text_inside_documents(tmp_path, run_search):
+    _docx(tmp_path / "report.docx", ["季度报告 needle 结论"])
+    _pdf(tmp_path / "scan.pdf", b"BT (pdf needle) Tj ET")
+    _docx(tmp_path / "other.docx", ["nothing here"])
+    (tmp_path / "binary.docx").write_bytes(b"PK needle but not a real zip")
+    assert run_search(tmp_path, ["needle"]) == {"report.docx", "scan.pdf"}
+    assert run_search(tmp_path, ["季度报告"]) == {"report.docx"}
+
+
+def test_extraction_deadline_writes_empty_text(tmp_path, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(file_searcher, "EXTRACT_TIMEOUT", 0)
+    monkeypatch.setattr(file_searcher, "extract_to_file", lambda filepath, text_path: release.wait(10))
+    path = _pdf(tmp_path / "slow.pdf", b"BT (needle) Tj ET")
+    searcher = file_searcher.FileSearcher(max_workers=1)
+    searcher._document_executor = ThreadPoolExecutor(max_workers=1)
+    searcher.document_cache = cache = DocumentTextCache(str(tmp_path / "cache"))
+    searcher.is_searching = True
+    try:
+        st = os.stat(path)
+        assert searcher._document_text(path, st) is None
+        # 超时的文档记为无文字，之后的搜索不再等待提取
+        text_path = cache.lookup(path, st.st_size, st.st_mtime)
+        assert text_path is not None and os.path.getsize(text_path) == 0
+    finally:
+        release.set()
+        searcher.shutdown()
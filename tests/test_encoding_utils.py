@@ -0,0 +1,65 @@
+"""encoding_utils：编码检测和各编码下的字节模式匹配（不整体解码）"""
+import codecs
+
+import pytest
+
+from encoding_utils import (ASCII, GBK, UTF8, UTF16BE, UTF16LE, ChunkMatcher, KeywordPattern,
+                            candidate_encodings, detect_encoding, make_decoder)
+
+TEXT = "日志：连接数据库失败 Error 42\n" * 20
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"", ASCII),
+    (b"plain ascii text", ASCII),
+    (TEXT.encode(UTF8), UTF8),
+    (TEXT.encode(GBK), GBK),
+    (codecs.BOM_UTF8 + TEXT.encode(UTF8), UTF8),
+    (codecs.BOM_UTF16_LE + TEXT.encode(UTF16LE), UTF16LE),
+    (("abc " * 50).encode(UTF16LE), UTF16LE),
+    (("abc " * 50).encode(UTF16BE), UTF16BE),
+])
+def test_detect_encoding(data, expected):
+    assert detect_encoding(data) == expected
+
+
+def test_truncated_multibyte_sample_still_utf8():
+    data = TEXT.encode(UTF8)
+    assert detect_encoding(data[:-1]) == UTF8
+
+
+@pytest.mark.parametrize("encoding", [UTF8, GBK, UTF16LE, UTF16BE])
+def test_keyword_matched_on_raw_bytes(encoding):
+    data = TEXT.encode(encoding)
+    matcher = ChunkMatcher(data, candidate_encodings(detect_encoding(data)))
+    assert matcher.contains(KeywordPattern("数据库"))
+    assert matcher.contains(KeywordPattern("ERROR"))  # ASCII 大小写不敏感
+    assert not matcher.contains(KeywordPattern("不存在"))
+
+
+def test_ascii_sample_matches_both_utf8_and_gbk():
+    assert candidate_encodings(ASCII) == (UTF8, GBK)
+    keyword = KeywordPattern("数据库")
+    for encoding in (UTF8, GBK):
+        assert ChunkMatcher(TEXT.encode(encoding), candidate_encodings(ASCII)).contains(keyword)
+
+
+def test_utf16_match_must_be_aligned():
+    # "愀戀\0" 的 UTF-16LE 字节为 00 61 00 62 00 00，奇数偏移 1 处恰好是 "ab" 的模式 61 00 62 00
+    data = "愀戀\x00c".encode(UTF16LE)
+    assert data.find("ab".encode(UTF16LE)) == 1
+    matcher = ChunkMatcher(data, (UTF16LE,))
+    assert not matcher.contains(KeywordPattern("ab"))
+    assert matcher.find(KeywordPattern("c")) == 6
+
+
+def test_non_ascii_case_folding_decodes():
+    keyword = KeywordPattern("ÄRGER")
+    assert keyword.needs_decode
+    assert ChunkMatcher("großer ärger".encode(UTF8), (UTF8,)).contains(keyword)
+
+
+def test_fallback_decoder_switches_to_gbk():
+    decoder = make_decoder(ASCII)
+    assert decoder.decode(b"abc") == "abc"
+    assert "数据库" in decoder.decode("数据库".encode(GBK))
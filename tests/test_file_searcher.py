@@ -0,0 +1,57 @@
+"""FileSearcher.search_files_parallel 的端到端行为"""
+import os
+import shutil
+import zipfile
+
+import file_searcher
+from file_searcher import FileSearcher
+
+
+def test_dedupe_reports_copies(tmp_path, run_search):
+    (tmp_path / "a.txt").write_text("needle here " * 100)
+    shutil.copy(tmp_path / "a.txt", tmp_path / "b.txt")
+    (tmp_path / "c.txt").write_text("nothing " * 100)
+    assert run_search(tmp_path, ["needle"], dedupe=True) == {"a.txt", "b.txt"}
+
+
+def test_dedupe_reports_archive_copy_members(tmp_path, run_search):
+    with zipfile.ZipFile(tmp_path / "a.zip", "w") as archive:
+        archive.writestr("inner/notes.txt", "needle inside " * 50)
+    shutil.copy(tmp_path / "a.zip", tmp_path / "b.zip")
+    found = run_search(tmp_path, ["needle"], dedupe=True, search_archives=True)
+    assert found == {"a.zip!/inner/notes.txt", "b.zip!/inner/notes.txt"}
+
+
+def test_dedupe_with_path_predicate_evaluates_each_copy(tmp_path, run_search):
+    (tmp_path / "orig.txt").write_text("plain text " * 100)
+    shutil.copy(tmp_path / "orig.txt", tmp_path / "copy.txt")
+    found = run_search(tmp_path, ["needle"], dedupe=True, query="needle OR name:copy*")
+    assert found == {"copy.txt"}
+
+
+def test_fifo_skipped_without_blocking(tmp_path, run_search):
+    (tmp_path / "a.txt").write_text("needle")
+    os.mkfifo(tmp_path / "pipe.txt")
+    # 文件列表中不会出现 FIFO；即使缓存的列表中该路径已被替换为 FIFO，打开它也会永久阻塞，必须跳过
+    assert run_search(tmp_path, ["needle"]) == {"a.txt"}
+    searcher = FileSearcher(max_workers=1)
+    searcher.is_searching = True
+    try:
+        assert searcher.search_file(str(tmp_path / "pipe.txt"), ["needle"]) is None
+        assert searcher.search_file(str(tmp_path / "a.txt"), ["needle"])[0] == str(tmp_path / "a.txt")
+    finally:
+        searcher.shutdown()
+
+
+def test_encoding_cache_bounded_and_shared_with_sessions(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_searcher, "ENCODING_CACHE_SIZE", 3)
+    searcher = FileSearcher(max_workers=2)
+    session = searcher.session()
+    for i in range(5):
+        path = tmp_path / f"{i}.txt"
+        path.write_text("hello")
+        owner = session if i % 2 else searcher
+        assert owner._get_encoding(str(path), os.stat(path), b"hello")
+    # 只保留最近使用的 3 个文件，会话写入的记录在所有者中可见
+    assert list(searcher._encoding_cache) == [str(tmp_path / f"{i}.txt") for i in (2, 3, 4)]
+    assert session._encoding_cache is searcher._encoding_cache
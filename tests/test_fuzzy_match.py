@@ -0,0 +1,88 @@
+"""fuzzy_match：分段过滤 + Myers 位并行验证与逐字符动态规划的结果一致"""
+import random
+
+import pytest
+
+from fuzzy_match import FuzzyPattern, _split_pieces, effective_max_errors, myers_search
+
+
+def _best_distance(pattern, text):
+    """模式与 text 任意子串的最小编辑距离（半全局动态规划，作为对照）"""
+    previous = list(range(len(pattern) + 1))
+    best = previous[-1]
+    for symbol in text:
+        current = [0]
+        for i, p in enumerate(pattern, 1):
+            current.append(min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (p != symbol)))
+        previous = current
+        best = min(best, previous[-1])
+    return best
+
+
+def test_effective_max_errors_limits_short_patterns():
+    assert effective_max_errors(3, 2) == 0
+    assert effective_max_errors(4, 2) == 1
+    assert effective_max_errors(6, 2) == 2
+    assert effective_max_errors(20, 2) == 2
+
+
+def test_pieces_cover_pattern():
+    for pieces in range(1, 5):
+        parts = _split_pieces("abcdefghij", pieces)
+        assert "".join(piece for _, piece in parts) == "abcdefghij"
+        assert all("abcdefghij"[offset:offset + len(piece)] == piece for offset, piece in parts)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("the quick brown fox", True),      # 精确
+    ("the qiuxk brown fox", False),     # 换位加替换需要 2 次以上编辑
+    ("the quck brown fox", True),       # 删除
+    ("the quiick brown fox", True),     # 插入
+    ("the qwick brown fox", True),      # 替换
+    ("the qxxck brown fox", False),
+])
+def test_single_edit(text, expected):
+    assert FuzzyPattern("quick", 1).contains(text) is expected
+
+
+def test_myers_reports_match_end():
+    assert myers_search("abc", "xxabcxx", 0) == 5
+    assert myers_search("abc", "xxabxx", 1) == 4
+    assert myers_search("abc", "xxxxxx", 1) == -1
+    assert myers_search("abc", "abcabc", 0, start=1) == 6
+
+
+def test_find_returns_position_near_match():
+    pattern = FuzzyPattern("keyword", 1)
+    text = "......kyword......"
+    pos = pattern.find(text)
+    assert abs(pos - text.index("kyword")) <= 1
+    assert pattern.find("......keyword......") == 6
+
+
+@pytest.mark.parametrize("kind", [str, bytes])
+def test_matches_dynamic_programming_reference(kind):
+    rng = random.Random(1234)
+    for _ in range(400):
+        pattern = "".join(rng.choice("abcd") for _ in range(rng.randint(4, 12)))
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 60)))
+        max_errors = rng.randint(0, 3)
+        fuzzy = FuzzyPattern(kind(pattern, "ascii") if kind is bytes else pattern, max_errors)
+        subject = kind(text, "ascii") if kind is bytes else text
+        expected = _best_distance(pattern, text) <= fuzzy.max_errors
+        assert fuzzy.contains(subject) is expected, (pattern, text, fuzzy.max_errors)
+
+
+def test_long_pattern_beyond_machine_word():
+    pattern = "x" * 40 + "needle" + "y" * 40
+    text = "z" * 100 + pattern.replace("needle", "nedle") + "z" * 100
+    assert FuzzyPattern(pattern, 1).contains(text)
+    assert not FuzzyPattern(pattern, 0).contains(text)
+
+
+def test_search_with_typo_tolerance(tmp_path, run_search):
+    (tmp_path / "typo.txt").write_text("this has a mispelled word")
+    (tmp_path / "exact.txt").write_text("this has a misspelled word")
+    (tmp_path / "other.txt").write_text("nothing relevant")
+    assert run_search(tmp_path, ["misspelled"]) == {"exact.txt"}
+    assert run_search(tmp_path, ["misspelled"], max_errors=1) == {"exact.txt", "typo.txt"}
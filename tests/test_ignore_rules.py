@@ -0,0 +1,103 @@
+"""ignore_rules：gitignore 模式语义、目录剪枝和子树遍历时上层规则仍然生效"""
+import os
+
+import pytest
+
+from ignore_rules import IgnoreRules, _Rule, walk
+
+
+def _files(top, rules, base=None):
+    found = []
+    for root, _, files in walk(str(top), rules, str(base) if base else None):
+        found.extend(os.path.relpath(os.path.join(root, name), str(base or top)).replace(os.sep, '/')
+                     for name in files)
+    return sorted(found)
+
+
+def _touch(root, *paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("x")
+
+
+@pytest.mark.parametrize("pattern, rel_path, is_dir, expected", [
+    ("*.log", "a/b/x.log", False, True),
+    ("*.log", "a/b/x.txt", False, False),
+    ("/build", "build", True, True),
+    ("/build", "src/build", True, False),
+    ("build/", "src/build", True, True),
+    ("build/", "src/build", False, False),
+    ("doc/*.txt", "doc/a.txt", False, True),
+    ("doc/*.txt", "doc/sub/a.txt", False, False),
+    ("doc/**/*.txt", "doc/sub/deep/a.txt", False, True),
+    ("doc/**/*.txt", "doc/a.txt", False, True),
+    ("**/cache", "x/y/cache", True, True),
+    ("file?.c", "file1.c", False, True),
+    ("file?.c", "file10.c", False, False),
+    ("[!a]*.c", "b.c", False, True),
+    ("[!a]*.c", "a.c", False, False),
+    (r"\#hash", "#hash", False, True),
+    ("trailing\\ ", "trailing ", False, True),
+])
+def test_rule_matching(pattern, rel_path, is_dir, expected):
+    rule = _Rule.parse(pattern)
+    assert rule.matches(rel_path, rel_path.rsplit('/', 1)[-1], is_dir) is expected
+
+
+def test_comments_and_blank_lines_ignored():
+    assert _Rule.parse("# comment") is None
+    assert _Rule.parse("   ") is None
+    assert _Rule.parse("/") is None
+    assert _Rule.parse("!keep.log").negate
+
+
+def test_gitignore_negation_and_nested_files(tmp_path):
+    _touch(tmp_path, "a.log", "keep.log", "a.txt", "sub/b.log", "sub/c.tmp", "sub/d.txt")
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\n")
+    (tmp_path / "sub" / ".ignore").write_text("*.tmp\n!b.log\n")
+    assert _files(tmp_path, IgnoreRules()) == [".gitignore", "a.txt", "keep.log", "sub/.ignore",
+                                              "sub/b.log", "sub/d.txt"]
+
+
+def test_ignored_directories_are_not_entered(tmp_path, monkeypatch):
+    _touch(tmp_path, "node_modules/pkg/index.js", "out/gen.c", "src/main.c", "src/out/keep.c")
+    (tmp_path / ".gitignore").write_text("/out/\n")
+    listed = []
+    original = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: listed.append(os.path.relpath(path, tmp_path)) or original(path))
+    assert _files(tmp_path, IgnoreRules()) == [".gitignore", "src/main.c", "src/out/keep.c"]
+    assert "node_modules" not in listed and "out" not in listed
+
+
+def test_user_patterns_and_custom_blacklist(tmp_path):
+    _touch(tmp_path, "a.bak", "b.txt", "vendor/lib.c", "node_modules/x.js")
+    rules = IgnoreRules(exclude_patterns=["*.bak"], dir_blacklist=["vendor"], use_ignore_files=False)
+    assert _files(tmp_path, rules) == ["b.txt", "node_modules/x.js"]
+
+
+def test_ignore_files_can_be_disabled(tmp_path):
+    _touch(tmp_path, "a.log")
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    assert _files(tmp_path, IgnoreRules(use_ignore_files=False)) == [".gitignore", "a.log"]
+
+
+def test_subtree_walk_applies_rules_from_base(tmp_path):
+    _touch(tmp_path, "proj/sub/deep/a.log", "proj/sub/deep/a.txt", "proj/sub/gen/x.c", "proj/sub/y.c")
+    (tmp_path / "proj" / ".gitignore").write_text("*.log\n")
+    rules = IgnoreRules(exclude_patterns=["sub/gen/"])
+    subtree = tmp_path / "proj" / "sub"
+    assert _files(subtree, rules, base=tmp_path / "proj") == ["sub/deep/a.txt", "sub/y.c"]
+    # 不指定 base 时排除模式相对于子树根目录，sub/gen/ 不再匹配，上层的 .gitignore 也不加载
+    assert _files(subtree, rules) == ["deep/a.log", "deep/a.txt", "gen/x.c", "y.c"]
+
+
+def test_key_distinguishes_rule_sets():
+    assert IgnoreRules().key() == IgnoreRules().key()
+    assert IgnoreRules(["*.log"]).key() != IgnoreRules().key()
+    assert IgnoreRules(use_ignore_files=False).key() != IgnoreRules().key()
+
+
+def test_walk_without_rules_is_os_walk(tmp_path):
+    _touch(tmp_path, "node_modules/x.js")
+    assert _files(tmp_path, None) == ["node_modules/x.js"]
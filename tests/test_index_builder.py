@@ -0,0 +1,111 @@
+"""index_builder：分片按规划顺序合并，检查点按目录修改时间校验"""
+import os
+import pickle
+import time
+
+import index_builder
+from ignore_rules import IgnoreRules, scandir_walk
+from index_builder import ShardedIndexBuilder
+
+
+def _make_tree(root, shards=10, files=5):
+    for i in range(shards):
+        sub = root / f"d{i:02d}" / "inner"
+        sub.mkdir(parents=True)
+        for j in range(files):
+            (sub / f"f{j}.txt").write_text(f"{i} {j}")
+    (root / "top.txt").write_text("top")
+
+
+def test_scandir_walk_matches_os_walk(tmp_path):
+    _make_tree(tmp_path, shards=3, files=2)
+    (tmp_path / "d00" / "link").symlink_to(tmp_path / "d01")
+    expected = [(root, sorted(dirs), sorted(files)) for root, dirs, files in os.walk(tmp_path)]
+    actual = [(root, sorted(dirs), sorted(entry.name for entry in entries))
+              for root, dirs, entries in scandir_walk(str(tmp_path))]
+    assert sorted(actual) == sorted(expected)
+
+
+def test_parallel_build_is_deterministic(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 2)
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree)
+    builder = ShardedIndexBuilder(checkpoint_dir=str(tmp_path / "ckpt"), max_workers=4)
+    serial = ShardedIndexBuilder(max_workers=4)
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 1000)
+    expected = serial.build(str(tree), IgnoreRules())
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 2)
+    first = builder.build(str(tree), IgnoreRules())
+    second = builder.build(str(tree), IgnoreRules())
+    assert len(first) == 51
+    assert first.fingerprint() == second.fingerprint() == expected.fingerprint()
+
+
+def test_stale_shard_checkpoint_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 2)
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree)
+    builder = ShardedIndexBuilder(checkpoint_dir=str(tmp_path / "ckpt"), max_workers=4)
+    _, shards = builder.plan(str(tree))
+    build_dir = builder._checkpoint_dir_for(str(tree), None)
+    os.makedirs(build_dir)
+    # 模拟中断前完成的分片检查点，之后该分片中新增了文件
+    shard_path = builder._shard_path(build_dir, shards[0])
+    index_builder._build_shard(shards[0], None, str(tree), shard_path)
+    assert builder._load_shard(shard_path) is not None
+    new_file = os.path.join(shards[0], "inner", "new.txt")
+    with open(new_file, "w") as f:
+        f.write("new")
+    os.utime(os.path.dirname(new_file), ns=(0, 0))
+    assert builder._load_shard(shard_path) is None
+
+    store = builder.build(str(tree))
+    assert new_file in set(store)
+
+
+def test_unreadable_checkpoint_falls_back_to_rescan(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 2)
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree)
+    builder = ShardedIndexBuilder(checkpoint_dir=str(tmp_path / "ckpt"), max_workers=4)
+    monkeypatch.setattr(builder, "_load_shard", lambda shard_path: None)
+    store = builder.build(str(tree))
+    assert len(store) == 51
+
+
+def test_old_format_checkpoint_ignored(tmp_path):
+    shard_path = tmp_path / "old.shard"
+    with open(shard_path, "wb") as f:
+        pickle.dump(index_builder.PathStore(), f)
+    assert ShardedIndexBuilder()._load_shard(str(shard_path)) is None
+
+
+def _blocked_shard(top, rules, base, shard_path):
+    """一直遍历不完的分片：等待 base 下出现 release 文件"""
+    deadline = time.monotonic() + 10
+    while not os.path.exists(os.path.join(base, "release")) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return 0
+
+
+def test_stop_does_not_wait_for_running_shards(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_builder, "MIN_PARALLEL_SHARDS", 2)
+    monkeypatch.setattr(index_builder, "_build_shard", _blocked_shard)
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    _make_tree(tree, shards=3, files=1)
+    builder = ShardedIndexBuilder(checkpoint_dir=str(tmp_path / "ckpt"), max_workers=2)
+    calls = []
+
+    def should_stop():
+        calls.append(None)
+        return len(calls) > 2
+    try:
+        started = time.monotonic()
+        assert builder.build(str(tree), should_stop=should_stop) is None
+        assert time.monotonic() - started < 5
+    finally:
+        (tree / "release").write_text("")
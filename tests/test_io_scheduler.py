@@ -0,0 +1,75 @@
+"""io_scheduler：提交顺序、每个设备的在途上限和命中历史"""
+import os
+
+from io_scheduler import FirstResultScorer, LocalityScheduler, MatchHistory, PriorityScheduler
+
+
+def _drain(scheduler):
+    """不断取出批次并立即完成，返回提交顺序"""
+    order = []
+    while scheduler.has_pending():
+        batch = scheduler.next_batch()
+        assert batch
+        order.extend(batch)
+        for file_id in batch:
+            scheduler.task_done(file_id)
+    return order
+
+
+def test_priority_scheduler_orders_by_score():
+    scores = [5.0, 1.0, 3.0, 2.0]
+    scheduler = PriorityScheduler(range(4), str, lambda file_id: None,
+                                  lambda path, stat: scores[int(path)], window=2)
+    assert scheduler.next_batch() == [1, 3]
+    assert scheduler.next_batch() == []
+    scheduler.task_done(3)
+    assert scheduler.next_batch() == [2]
+    scheduler.task_done(1)
+    scheduler.task_done(2)
+    assert _drain(scheduler) == [0]
+
+
+def test_priority_scheduler_limits_each_device():
+    devices = {0: "slow", 1: "slow", 2: "slow", 3: "fast", 4: "fast", 5: "fast"}
+    scheduler = PriorityScheduler(range(6), str, lambda file_id: None, lambda path, stat: int(path),
+                                  window=8, device_of=devices.__getitem__,
+                                  window_of=lambda dev: 1 if dev == "slow" else 3)
+    assert sorted(scheduler.next_batch()) == [0, 3, 4, 5]
+    # 快设备的任务完成不会释放慢设备的名额
+    scheduler.task_done(3)
+    assert scheduler.next_batch() == []
+    scheduler.task_done(0)
+    assert scheduler.next_batch() == [1]
+
+
+def test_default_limit_is_window():
+    scheduler = PriorityScheduler(range(10), str, lambda file_id: None, lambda path, stat: 0, window=3)
+    assert len(scheduler.next_batch()) == 3
+
+
+def test_locality_scheduler_orders_by_device_dir_inode_without_stat(monkeypatch):
+    def no_stat(*args, **kwargs):
+        raise AssertionError("不应逐个文件 stat")
+    monkeypatch.setattr(os, "stat", no_stat)
+    dirs = {0: "/b", 1: "/a", 2: "/a", 3: "/a", 4: "/c"}
+    devices = {0: 1, 1: 1, 2: 1, 3: 1, 4: 2}
+    inodes = {0: 5, 1: 30, 2: 10, 3: 20, 4: 1}
+    scheduler = LocalityScheduler(range(5), dirs.__getitem__, devices.__getitem__, inodes.__getitem__,
+                                  reads_per_device=1)
+    assert sorted(scheduler.next_batch()) == [2, 4]
+    scheduler.task_done(2)
+    scheduler.task_done(4)
+    assert _drain(scheduler) == [3, 1, 0]
+
+
+def test_match_history_prefers_hit_extensions_and_paths():
+    history = MatchHistory()
+    for i in range(10):
+        history.record(f"{i}.log", f"/logs/{i}.log")
+        history.record(f"{i}.bin")
+    assert history.ext_rate(".log") > history.ext_rate(".bin")
+    restored = MatchHistory(history.to_dict())
+    assert restored.was_hit("/logs/3.log")
+    scorer = FirstResultScorer(restored, now=1000.0)
+    assert scorer("/new/a.log", (100, 0.0)) < scorer("/new/a.bin", (100, 0.0))
+    assert scorer("/new/a.log", (100, 0.0)) < scorer("/new/a.log", (100 * 1024 * 1024, 0.0))
@@ -0,0 +1,55 @@
+"""大文件按字节区间并行搜索：跨区间边界的关键字、分布在不同区间的关键字和排除关键字"""
+import pytest
+
+import file_searcher
+from file_searcher import FileSearcher
+from query import build_plan
+
+RANGE = 64 * 1024
+
+
+@pytest.fixture
+def searcher(monkeypatch):
+    monkeypatch.setattr(file_searcher, "LARGE_FILE_THRESHOLD", 4 * RANGE)
+    monkeypatch.setattr(file_searcher, "LARGE_FILE_RANGE_SIZE", RANGE)
+    searcher = FileSearcher(max_workers=4)
+    searcher.is_searching = True
+    calls = []
+    original = searcher._search_large_file
+    monkeypatch.setattr(searcher, "_search_large_file", lambda *args: calls.append(args) or original(*args))
+    searcher.large_file_calls = calls
+    yield searcher
+    searcher.shutdown()
+
+
+def _large_file(path, inserts, size=10 * RANGE):
+    data = bytearray(b"." * size)
+    for offset, text in inserts:
+        data[offset:offset + len(text)] = text
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+def test_keyword_across_range_boundary(tmp_path, searcher):
+    path = _large_file(tmp_path / "big.log", [(3 * RANGE - 3, b"boundary")])
+    hit = searcher.search_file(path, ["boundary"])
+    assert hit is not None and searcher.large_file_calls
+
+
+def test_keywords_in_different_ranges(tmp_path, searcher):
+    path = _large_file(tmp_path / "big.log", [(100, b"first"), (9 * RANGE + 5, b"second")])
+    assert searcher.search_file(path, ["first", "second"]) is not None
+    assert searcher.search_file(path, ["first", "third"]) is None
+
+
+def test_negated_term_in_late_range(tmp_path, searcher):
+    path = _large_file(tmp_path / "big.log", [(10, b"wanted"), (8 * RANGE, b"rejected")])
+    # 前面区间找到 wanted 后结果仍未确定，要等所有区间都确认没有 NOT 的关键字
+    assert searcher.search_file(path, [], plan=build_plan([], query="wanted AND NOT rejected")) is None
+    assert searcher.search_file(path, [], plan=build_plan([], query="wanted AND NOT missing")) is not None
+
+
+def test_small_file_scanned_sequentially(tmp_path, searcher):
+    path = _large_file(tmp_path / "small.log", [(10, b"needle")], size=RANGE)
+    assert searcher.search_file(path, ["needle"]) is not None
+    assert not searcher.large_file_calls
@@ -0,0 +1,92 @@
+"""live_search：目录树快照跳过未变化的目录，冷文件隔几次才检查"""
+import os
+import time
+
+import pytest
+
+import live_search
+from cache_manager import CacheManager
+from config_manager import LIVE_INTERVAL, ConfigManager
+from ignore_rules import IgnoreRules
+from live_search import LiveSearchMonitor, _TreeSnapshot
+
+
+def _write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_unchanged_directories_are_not_relisted(tmp_path, monkeypatch):
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    _write(sub / "a.log", "one")
+    snapshot = _TreeSnapshot(str(tmp_path), IgnoreRules(), None)
+    assert [path for path, _ in snapshot.changed_files(0)] == [str(sub / "a.log")]
+
+    def no_listing(root):
+        raise AssertionError(f"不应重新列出 {root}")
+    monkeypatch.setattr(snapshot, "_list_dir", no_listing)
+    since = time.time()
+    assert snapshot.changed_files(since) == []
+    # 原地追加不改变目录的修改时间，仍能通过 stat 发现
+    _write(sub / "a.log", "one two", since + 1)
+    assert [path for path, _ in snapshot.changed_files(since)] == [str(sub / "a.log")]
+
+
+def test_new_file_in_changed_directory_found(tmp_path):
+    (tmp_path / "sub").mkdir()
+    snapshot = _TreeSnapshot(str(tmp_path), IgnoreRules(), frozenset({".log"}))
+    snapshot.changed_files(0)
+    since = time.time() - 1
+    _write(tmp_path / "sub" / "new.log", "x")
+    _write(tmp_path / "sub" / "new.bin", "x")
+    os.utime(tmp_path / "sub", ns=(0, 0))
+    assert [path for path, _ in snapshot.changed_files(since)] == [str(tmp_path / "sub" / "new.log")]
+
+
+def test_cold_files_checked_every_few_rounds(tmp_path, monkeypatch):
+    old = time.time() - 3 * 86400
+    _write(tmp_path / "cold.txt", "x", old)
+    snapshot = _TreeSnapshot(str(tmp_path), IgnoreRules(), None)
+    snapshot.changed_files(time.time())
+    # 修改后的时间仍早于 since，但与快照中记录的不同
+    _write(tmp_path / "cold.txt", "changed", old + 3600)
+    since = time.time()
+    found = [snapshot.changed_files(since) for _ in range(live_search.COLD_CHECK_ROUNDS - 1)]
+    assert [len(changed) for changed in found[:-1]] == [0] * (live_search.COLD_CHECK_ROUNDS - 2)
+    assert [path for path, _ in found[-1]] == [str(tmp_path / "cold.txt")]
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    config = ConfigManager(str(tmp_path / "config.json"), flush_delay=0)
+    hits = []
+    monitor = LiveSearchMonitor(config, CacheManager(str(tmp_path / "cache")),
+                                lambda name, results: hits.extend(r.path for r in results))
+    yield config, monitor, hits
+    monitor.stop()
+    config.close()
+
+
+def test_evaluate_reports_only_new_matches(tmp_path, monitor):
+    config, monitor, hits = monitor
+    folder = tmp_path / "data"
+    folder.mkdir()
+    _write(folder / "old.txt", "needle")
+    config.save_saved_search("s", str(folder), "needle", "", "")
+    saved = config.get_saved_searches()[0]
+    assert monitor.evaluate(saved) == 0
+    _write(folder / "new.txt", "a needle here")
+    _write(folder / "other.txt", "nothing")
+    assert monitor.evaluate(config.get_saved_searches()[0]) == 1
+    assert hits == [str(folder / "new.txt")]
+
+
+def test_live_interval_setting(monitor):
+    config, _, _ = monitor
+    assert config.get_live_interval() == LIVE_INTERVAL
+    config.set_live_interval(1)
+    assert config.get_live_interval() == 5.0
+    config.set_live_interval(120)
+    assert config.get_live_interval() == 120.0
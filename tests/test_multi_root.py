@@ -0,0 +1,66 @@
+"""多根目录搜索：根目录去重、子目录合并以及跨根目录的硬链接只搜索一次"""
+import os
+
+import pytest
+
+from cache_manager import CacheManager
+from file_searcher import FileSearcher
+
+
+@pytest.fixture
+def searcher():
+    searcher = FileSearcher(max_workers=4)
+    yield searcher
+    searcher.shutdown()
+
+
+def _search(searcher, roots, keywords, cache_dir):
+    results = searcher.search_files_parallel(
+        [str(root) for root in roots], keywords, None, None, False, CacheManager(str(cache_dir)),
+        lambda message, current=0, total=0: None, lambda result: None, lambda count: None, resumable=False)
+    return sorted(result.path for result in results)
+
+
+def test_normalize_roots_drops_duplicates_and_nested(tmp_path, searcher):
+    a, b = tmp_path / "a", tmp_path / "b"
+    (a / "sub").mkdir(parents=True)
+    b.mkdir()
+    (tmp_path / "alias").symlink_to(a)
+    roots = [str(a / "sub"), str(b), str(a), str(tmp_path / "alias"), str(a) + os.sep]
+    assert searcher._normalize_roots(roots) == [str(b), str(a)]
+
+
+def test_normalize_roots_keeps_sibling_with_common_prefix(tmp_path, searcher):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data2").mkdir()
+    roots = [str(tmp_path / "data"), str(tmp_path / "data2")]
+    assert searcher._normalize_roots(roots) == roots
+
+
+def test_search_several_roots(tmp_path, searcher):
+    a, b = tmp_path / "a", tmp_path / "b"
+    (a / "sub").mkdir(parents=True)
+    b.mkdir()
+    (a / "one.txt").write_text("needle one")
+    (a / "sub" / "two.txt").write_text("needle two")
+    (b / "three.txt").write_text("needle three")
+    (b / "other.txt").write_text("nothing")
+    found = _search(searcher, [a, a / "sub", b], ["needle"], tmp_path / "cache")
+    assert found == sorted([str(a / "one.txt"), str(a / "sub" / "two.txt"), str(b / "three.txt")])
+
+
+def test_hardlink_across_roots_searched_once(tmp_path, searcher):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    (a / "file.txt").write_text("needle")
+    os.link(a / "file.txt", b / "link.txt")
+    found = _search(searcher, [a, b], ["needle"], tmp_path / "cache")
+    assert len(found) == 1
+
+
+def test_single_root_reports_hardlinks(tmp_path, searcher):
+    (tmp_path / "file.txt").write_text("needle")
+    os.link(tmp_path / "file.txt", tmp_path / "link.txt")
+    found = _search(searcher, [tmp_path], ["needle"], tmp_path.parent / (tmp_path.name + "-cache"))
+    assert len(found) == 2
@@ -0,0 +1,94 @@
+"""path_store：紧凑存储的路径、元数据列、合并与旧版缓存兼容"""
+import os
+import pickle
+
+from cache_manager import CacheManager
+from file_searcher import FileSearcher
+from index_builder import ShardedIndexBuilder
+from path_store import PathStore, SearchResult
+
+
+def test_paths_and_columns_round_trip():
+    store = PathStore()
+    first = store.add(os.path.join("/data", "a.txt"), 10, 1.0, 7, 3)
+    second = store.add(os.path.join("/data", "子目录", "b.log"))
+    assert store.path(first) == os.path.join("/data", "a.txt")
+    assert store.name(second) == "b.log"
+    assert store.stat(first) == (10, 1.0) and store.stat(second) is None
+    assert store.inode(first) == 7 and store.inode(second) == 0
+    assert store.device(first) == 3 and store.device(second) == 0
+    restored = pickle.loads(pickle.dumps(store))
+    assert list(restored) == list(store)
+    assert restored.fingerprint() == store.fingerprint()
+
+
+def test_extend_keeps_columns():
+    store, other = PathStore(), PathStore()
+    store.add("/a/x", 1, 1.0, 11, 5)
+    other.add("/b/y", 2, 2.0, 22, 6)
+    store.extend(other)
+    assert list(store) == [os.path.join("/a", "x"), os.path.join("/b", "y")]
+    assert [store.stat(i) for i in range(2)] == [(1, 1.0), (2, 2.0)]
+    assert [store.inode(i) for i in range(2)] == [11, 22]
+    assert [store.device(i) for i in range(2)] == [5, 6]
+
+
+def test_old_cache_without_columns_loads():
+    store = PathStore()
+    store.add("/a/x", 1, 1.0, 11)
+    state = dict(store.__dict__)
+    for key in ("_sizes", "_mtimes", "_inodes", "_devs"):
+        del state[key]
+    old = PathStore.__new__(PathStore)
+    old.__setstate__(state)
+    assert old.stat(0) is None and old.inode(0) == 0 and old.device(0) == 0
+
+
+def test_index_records_size_inode_and_device(tmp_path):
+    (tmp_path / "a.txt").write_text("hello")
+    os.mkfifo(tmp_path / "pipe")
+    store = ShardedIndexBuilder().build(str(tmp_path))
+    assert list(store) == [str(tmp_path / "a.txt")]
+    st = os.stat(tmp_path / "a.txt")
+    assert store.stat(0) == (st.st_size, st.st_mtime)
+    assert store.inode(0) == st.st_ino
+    assert store.device(0) == st.st_dev
+
+
+def test_directories_interned_and_ids_compact():
+    store = PathStore.from_paths([os.path.join("/data", f"f{i}.txt") for i in range(1000)])
+    assert len(store) == 1000 and len(store._dirs) == 1
+    assert store.ids().typecode == 'I' and list(store.ids()) == list(range(1000))
+    assert store.name(999) == "f999.txt" and store.dir_path(999) == "/data"
+
+
+def test_undecodable_name_round_trips():
+    # Linux 文件名可以是任意字节，os 以代理字符表示，存储和还原不能出错
+    name = os.fsdecode(b"bad\xff.txt")
+    store = PathStore()
+    file_id = store.add(os.path.join("/data", name))
+    assert store.name(file_id) == name
+    assert os.fsencode(store.path(file_id)) == b"/data/bad\xff.txt"
+
+
+def test_search_result_resolves_path_lazily():
+    store = PathStore()
+    file_id = store.add("/data/x.log", 2048, 1.0)
+    result = SearchResult(store, file_id, 2.0)
+    assert result.path == "/data/x.log" and result.hit_offset is None
+    assert not hasattr(result, "__dict__")
+
+
+def test_legacy_list_cache_is_converted(tmp_path):
+    (tmp_path / "a.txt").write_text("needle")
+    (tmp_path / "b.txt").write_text("nothing")
+    cache_dir = tmp_path.parent / (tmp_path.name + "-cache")
+    CacheManager(str(cache_dir)).save_file_cache(
+        str(tmp_path), [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")])
+    searcher = FileSearcher(max_workers=2)
+    try:
+        store = searcher._load_file_list(str(tmp_path), CacheManager(str(cache_dir)), lambda *args: None)
+    finally:
+        searcher.shutdown()
+    assert isinstance(store, PathStore)
+    assert sorted(store) == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
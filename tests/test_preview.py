@@ -0,0 +1,94 @@
+"""preview：只读取命中附近的窗口，按行裁剪，翻页不丢失也不重复内容"""
+import codecs
+
+import pytest
+
+import preview
+from encoding_utils import UTF16BE, UTF16LE
+from preview import FilePreview, first_hit_offset
+
+
+def _log(path, lines, hits=(), encoding="utf-8", bom=b""):
+    text = "".join(f"line {i:06d} {'needle ' if i in hits else ''}padding\n" for i in range(lines))
+    path.write_bytes(bom + text.encode(encoding))
+    return str(path), text
+
+
+def test_first_hit_offset(tmp_path):
+    path, text = _log(tmp_path / "a.log", 5000, hits=(10, 3000))
+    offset = first_hit_offset(path, ["NEEDLE"])
+    assert offset == text.index("needle")
+    # 小块读取时命中跨越块边界也能找到
+    assert first_hit_offset(path, ["needle"], chunk_size=100, overlap_size=10, start=offset + 1) == \
+        text.index("needle", offset + 1)
+    assert first_hit_offset(path, ["absent"]) is None
+
+
+def test_next_hit_reads_only_around_hits(tmp_path):
+    path, text = _log(tmp_path / "big.log", 200000, hits=(100, 150000))
+    file_preview = FilePreview(path, ["needle"])
+    first = file_preview.next_hit()
+    assert first.hit_offset == text.index("needle")
+    assert "line 000100 needle" in first.text
+    assert first.text.endswith("\n") and first.text.startswith("line ")
+    second = file_preview.next_hit()
+    assert second.hit_offset == text.index("needle", first.hit_offset + 1)
+    assert "line 150000 needle" in second.text
+    # 查找第二处命中时扫描了中间的内容，但没有再读取其余部分
+    scanned = file_preview.bytes_read
+    assert file_preview.next_hit() is None
+    assert file_preview.next_hit() is None
+    assert scanned < file_preview.file_size
+
+
+def test_pages_continue_without_gaps_or_overlap(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview, "PAGE_SIZE", 1000)
+    path, text = _log(tmp_path / "a.log", 2000, hits=(50,))
+    file_preview = FilePreview(path, ["needle"])
+    window = file_preview.next_hit()
+    collected = window.text
+    end = window.end
+    for _ in range(5):
+        page = file_preview.page_after(end)
+        assert page.start == end and page.hit_offset is None
+        collected += page.text
+        end = page.end
+    assert text.encode()[window.start:end].decode() == collected
+    assert file_preview.page_after(file_preview.file_size) is None
+
+
+def test_hit_on_line_longer_than_window_is_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview, "PREVIEW_CONTEXT", 64)
+    path = tmp_path / "long.txt"
+    path.write_bytes(b"x" * 5000 + b"needle" + b"y" * 5000 + b"\nnext\n")
+    window = FilePreview(str(path), ["needle"]).next_hit()
+    assert "needle" in window.text and window.start < 5000 < window.end
+
+
+@pytest.mark.parametrize("encoding, bom", [(UTF16LE, codecs.BOM_UTF16_LE), (UTF16BE, codecs.BOM_UTF16_BE)])
+def test_utf16_windows_aligned(tmp_path, encoding, bom):
+    path, _ = _log(tmp_path / "u16.log", 3000, hits=(1500,), encoding=encoding, bom=bom)
+    file_preview = FilePreview(path, ["needle"])
+    window = file_preview.next_hit()
+    assert window.start % 2 == 0 and window.end % 2 == 0
+    assert "line 001500 needle padding" in window.text
+    assert all(line.startswith("line ") for line in window.text.splitlines())
+    page = file_preview.page_after(window.end)
+    assert page.text.startswith("line ")
+
+
+def test_gbk_text_decoded(tmp_path):
+    path = tmp_path / "gbk.txt"
+    path.write_bytes(("中文日志 命中 needle 结束\n" * 200).encode("gb18030"))
+    window = FilePreview(str(path), ["命中"]).next_hit()
+    assert "中文日志 命中 needle" in window.text
+
+
+def test_text_path_used_for_documents(tmp_path):
+    document = tmp_path / "report.docx"
+    document.write_bytes(b"PK binary")
+    extracted = tmp_path / "report.txt"
+    extracted.write_text("extracted needle text\n")
+    file_preview = FilePreview(str(document), ["needle"], text_path=str(extracted))
+    assert file_preview.filepath == str(document)
+    assert "extracted needle text" in file_preview.next_hit().text
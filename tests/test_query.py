@@ -0,0 +1,198 @@
+"""query：查询语法的切分和解析、计划中子节点的代价排序以及按块的三值求值"""
+import os
+import time
+
+import pytest
+
+import query
+from encoding_utils import ASCII, ChunkMatcher, TextMatcher, candidate_encodings
+from query import (And, Not, Or, PathPredicate, QuerySyntaxError, Term, TermStats, build_plan,
+                   is_boolean_query, parse_query, positive_terms, tokenize)
+
+
+def _shape(node):
+    """表达式树的简写形式，便于比较"""
+    if isinstance(node, Term):
+        return node.text
+    if isinstance(node, PathPredicate):
+        return f"{node.field}:{node.pattern}"
+    if isinstance(node, Not):
+        return ("NOT", _shape(node.child))
+    return ("AND" if isinstance(node, And) else "OR", [_shape(child) for child in node.children])
+
+
+def _run(query, chunks, excludes=(), path="/data/file.txt", stat=None):
+    """按块求值，返回 (最终结果, 读取的块数)"""
+    evaluation = build_plan([], excludes, query=query).evaluate(path, stat)
+    state = evaluation.state()
+    read = 0
+    for chunk in chunks:
+        if state is not None:
+            break
+        read += 1
+        state = evaluation.scan(TextMatcher(chunk.lower()))
+    if state is None:
+        state = evaluation.finish()
+    return state, read
+
+
+def test_tokenize():
+    assert tokenize('a AND (b OR "c d") NOT ext:py path:"My Docs/*" and') == [
+        ('term', 'a'), ('op', 'AND'), ('lparen', '('), ('term', 'b'), ('op', 'OR'), ('term', 'c d'),
+        ('rparen', ')'), ('op', 'NOT'), ('field', ('ext', 'py')), ('field', ('path', 'My Docs/*')),
+        ('term', 'and')]
+    assert tokenize('name:"a (1).txt"x') == [('field', ('name', 'a (1).txt')), ('term', 'x')]
+    assert tokenize('“中文 短语” url:http://x') == [('term', '中文 短语'), ('term', 'url:http://x')]
+
+
+@pytest.mark.parametrize("text", ['"open', 'a OR', '(a b', 'a )', 'ext:', '', 'NOT', 'path:"x'])
+def test_syntax_errors(text):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(text)
+
+
+def test_is_boolean_query():
+    assert is_boolean_query("error OR warning")
+    assert is_boolean_query("ext:py assert")
+    assert not is_boolean_query("error and warning")
+    assert not is_boolean_query('"unterminated OR')
+
+
+def test_precedence():
+    assert _shape(parse_query("a b OR c")) == ("OR", [("AND", ["a", "b"]), "c"])
+    assert _shape(parse_query("a OR b c")) == ("OR", ["a", ("AND", ["b", "c"])])
+    assert _shape(parse_query("NOT a b")) == ("AND", [("NOT", "a"), "b"])
+    assert _shape(parse_query("a AND (b OR c)")) == ("AND", ["a", ("OR", ["b", "c"])])
+    assert _shape(parse_query("NOT NOT a")) == ("NOT", ("NOT", "a"))
+
+
+def test_positive_terms():
+    assert positive_terms(parse_query("a NOT (b OR NOT c) d")) == ["a", "c", "d"]
+
+
+def test_planner_orders_cheap_and_selective_first():
+    plan = build_plan([], query="common ext:py rareword")
+    # 路径条件代价为 0 总是最先；长关键字估计更少见，在 AND 中更可能为假，排在前面
+    assert _shape(plan.root) == ("AND", ["ext:.py", "rareword", "common"])
+    stats = TermStats({"rareword": [95, 100], "common": [1, 100]})
+    plan = build_plan([], query="common rareword", term_stats=stats)
+    assert _shape(plan.root) == ("AND", ["common", "rareword"])
+    plan = build_plan([], query="common OR rareword", term_stats=stats)
+    assert _shape(plan.root) == ("OR", ["rareword", "common"])
+
+
+def test_repeated_terms_share_id_but_negation_is_exact():
+    plan = build_plan([], max_errors=2, query="keyword OR (Keyword NOT keyword)")
+    assert len(plan.terms) == 2
+    positive, negative = sorted(plan.terms, key=lambda term: term.keyword.max_errors, reverse=True)
+    assert positive.keyword.max_errors == 2 and negative.keyword.max_errors == 0
+    assert [term.text for term in plan.hit_terms] == ["keyword"]
+
+
+@pytest.mark.parametrize("query, chunks, expected, read", [
+    ("a OR b", ["x a", "b"], True, 1),                  # OR 命中一项即停止读取
+    ("a b", ["a", "x", "b"], True, 3),
+    ("a b", ["a", "x"], False, 2),
+    ("a NOT b", ["a", "x"], True, 2),                   # NOT 需读完才能确定
+    ("a NOT b", ["a", "b"], False, 2),
+    ("ext:log a", ["a"], False, 0),                     # 路径条件不满足，不读取内容
+    ("ext:txt OR a", ["x"], True, 0),
+    ("(a OR b) (c OR NOT d)", ["b", "c"], True, 2),
+])
+def test_chunked_evaluation(query, chunks, expected, read):
+    assert _run(query, chunks) == (expected, read)
+
+
+def test_exclude_keywords_checked_each_chunk():
+    assert _run("a", ["x", "skip a"], excludes=["SKIP"]) == (False, 2)
+    # 关键字已全部找到后即命中，后面的块不再读取
+    assert _run("a", ["a", "skip"], excludes=["skip"]) == (True, 1)
+
+
+def test_path_state_without_reading():
+    plan = build_plan([], query="name:test_* OR path:*/src/*.py")
+    assert plan.path_state("/repo/src/main.py") is True
+    assert plan.path_state("/repo/lib/main.py") is False
+    assert plan.path_state("/repo/lib/TEST_x.c") is True
+    assert build_plan([], query="ext:py needle").path_state("/a.py") is None
+    assert not build_plan(["x"]).path_predicates
+
+
+def test_hit_offset_recorded_in_first_hit_chunk():
+    plan = build_plan([], query="beta OR alpha NOT gamma")
+    evaluation = plan.evaluate("/f.txt")
+    encodings = candidate_encodings(ASCII)
+    assert evaluation.scan(ChunkMatcher(b"nothing here", encodings), base=0) is None
+    evaluation.scan(ChunkMatcher(b"gamma.. alpha .. beta", encodings), base=100)
+    assert evaluation.hit_offset == 108
+
+
+def test_term_stats_record_and_trim(monkeypatch):
+    stats = TermStats()
+    before = stats.probability("abc")
+    for _ in range(20):
+        stats.record(["abc"], ["xyz"])
+    assert stats.probability("abc") > before > stats.probability("xyz")
+    stats.record(["abc"], [])
+    assert stats.to_dict()["xyz"] == [0, 20]
+    monkeypatch.setattr(query, "MAX_TERM_STATS", 1)
+    assert list(stats.to_dict()) == ["abc"]
+
+
+def test_boolean_query_end_to_end(tmp_path, run_search):
+    (tmp_path / "a.log").write_text("error: connection reset by peer")
+    (tmp_path / "b.log").write_text("error: timeout")
+    (tmp_path / "c.log").write_text("error: timeout (debug)")
+    (tmp_path / "d.txt").write_text("error: timeout")
+    found = run_search(tmp_path, [], query='ext:log error AND (timeout OR "connection reset") NOT debug')
+    assert found == {"a.log", "b.log"}
+
+
+@pytest.mark.parametrize("field, spec, bounds", [
+    ("size", ">1mb", (1024 ** 2, None, True, False)),
+    ("size", "<=10k", (None, 10 * 1024, False, False)),
+    ("size", "=100", (100, 100, False, False)),
+    ("size", "1k..1.5m", (1024, 1.5 * 1024 ** 2, False, False)),
+    ("size", "..2g", (None, 2 * 1024 ** 3, False, False)),
+    ("mtime", "7d", (None, 7 * 86400, False, False)),
+    ("mtime", "<2h", (None, 7200, False, True)),
+    ("mtime", ">1w", (7 * 86400, None, True, False)),
+    ("mtime", "30m..", (1800, None, False, False)),
+])
+def test_parse_range(field, spec, bounds):
+    assert query._parse_range(field, spec) == bounds
+
+
+@pytest.mark.parametrize("text", ["size:10mb", "size:>10xb", "mtime:<abc", "size:>"])
+def test_invalid_stat_predicates(text):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(text)
+
+
+def test_stat_predicates_use_recorded_stat():
+    size = PathPredicate("size", ">1k")
+    assert size.needs_stat and not PathPredicate("ext", "py").needs_stat
+    assert size.matches("/a", (2048, 0.0)) is True
+    assert size.matches("/a", (1024, 0.0)) is False  # > 不含边界
+    assert PathPredicate("size", ">=1k").matches("/a", (1024, 0.0)) is True
+    assert PathPredicate("size", "<1k").matches("/a", (1024, 0.0)) is False
+    assert PathPredicate("size", "1k..2k").matches("/a", (2048, 0.0)) is True
+    assert size.matches("/a", None) is None
+    recent = PathPredicate("mtime", "<1d")
+    assert recent.matches("/a", (0, recent.now - 3600)) is True
+    assert recent.matches("/a", (0, recent.now - 2 * 86400)) is False
+    plan = build_plan([], query="size:<1k OR ext:log")
+    assert plan.path_state("/x.txt", (10, 0.0)) is True
+    assert plan.path_state("/x.txt", (4096, 0.0)) is False
+    assert plan.path_state("/x.txt") is None  # 未记录 stat 时需读取文件时再确定
+
+
+def test_stat_predicates_end_to_end(tmp_path, run_search):
+    (tmp_path / "small.log").write_text("timeout")
+    (tmp_path / "big.log").write_text("timeout " * 1000)
+    (tmp_path / "old.log").write_text("timeout")
+    old = time.time() - 30 * 86400
+    os.utime(tmp_path / "old.log", (old, old))
+    assert run_search(tmp_path, [], query="size:<1k timeout") == {"small.log", "old.log"}
+    assert run_search(tmp_path, [], query="mtime:<7d timeout") == {"small.log", "big.log"}
+    assert run_search(tmp_path, [], query="size:>1k OR mtime:>7d") == {"big.log", "old.log"}
@@ -0,0 +1,70 @@
+"""读取后端：各后端读到相同的内容、统计读取量，并在搜索中给出相同的结果"""
+import pytest
+
+import read_backends
+from read_backends import DEFAULT_BACKEND, available_backends, benchmark_backends, get_backend
+
+BACKENDS = available_backends()
+
+
+def _data_file(tmp_path, size=300000):
+    data = bytes(range(256)) * (size // 256) + b"tail"
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    return str(path), data
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_sequential_read(tmp_path, name):
+    path, data = _data_file(tmp_path)
+    backend = get_backend(name)
+    chunks = []
+    with backend.open(path) as f:
+        while True:
+            chunk = f.read(65536)
+            if not chunk:
+                break
+            chunks.append(bytes(chunk))  # 复用缓冲区的后端只保证在下一次读取之前有效
+    assert b"".join(chunks) == data
+    assert backend.stats.bytes_read == len(data)
+    assert backend.stats.files_opened == 1
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_pread(tmp_path, name):
+    path, data = _data_file(tmp_path)
+    with get_backend(name).open(path) as f:
+        assert bytes(f.pread(200000, 1000)) == data[200000:201000]
+        assert bytes(f.pread(10, 5)) == data[10:15]
+        assert bytes(f.pread(len(data) - 2, 100)) == data[-2:]
+
+
+def test_unknown_backend_falls_back_to_default():
+    assert get_backend("nonexistent").name == DEFAULT_BACKEND
+    assert get_backend().name == DEFAULT_BACKEND
+    assert DEFAULT_BACKEND in BACKENDS
+
+
+def test_pooled_buffer_grows_for_large_reads(tmp_path):
+    path, data = _data_file(tmp_path, size=read_backends.POOL_BUFFER_SIZE * 3)
+    with get_backend("pooled").open(path) as f:
+        assert bytes(f.read(len(data))) == data
+
+
+def test_benchmark_reports_every_backend(tmp_path):
+    path, data = _data_file(tmp_path)
+    results = benchmark_backends([path, str(tmp_path / "missing")])
+    assert set(results) == set(BACKENDS)
+    assert all(nbytes == len(data) for _, nbytes in results.values())
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_search_results_identical_across_backends(tmp_path, run_search, name):
+    # 关键字跨越块边界、只在文件末尾出现，以及排除关键字出现在命中之前的文件
+    filler = b"x" * (131072 - 3)
+    (tmp_path / "edge.txt").write_bytes(filler + b"needle" + b"y" * 1000)
+    (tmp_path / "end.txt").write_bytes(b"z" * 400000 + b"needle")
+    (tmp_path / "excluded.txt").write_bytes(b"a" * 200000 + b"skipme " + b"b" * 200000 + b"needle")
+    (tmp_path / "none.txt").write_bytes(b"nothing" * 1000)
+    found = run_search(tmp_path, ["needle"], exclude_keywords=["skipme"], read_backend=name)
+    assert found == {"edge.txt", "end.txt"}
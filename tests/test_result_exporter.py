@@ -0,0 +1,94 @@
+"""result_exporter：结果逐条写入，命中偏移取自搜索时的记录"""
+import csv
+import json
+
+import pytest
+
+from file_searcher import FileSearcher
+from path_store import PathStore, SearchResult
+from query import build_plan
+from result_exporter import ResultExporter
+
+
+@pytest.fixture
+def searcher():
+    searcher = FileSearcher(max_workers=2)
+    searcher.is_searching = True
+    yield searcher
+    searcher.shutdown()
+
+
+def test_search_file_records_first_hit_offset(tmp_path, searcher):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"x" * 200000 + b"beta" + b"y" * 100 + b"alpha")
+    plan = build_plan(["alpha", "beta"])
+    hit = searcher.search_file(str(path), ["alpha", "beta"], plan=plan)
+    assert hit[2] == 200000
+
+
+def test_hit_offset_ignores_negated_terms(tmp_path, searcher):
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"other " * 10 + b"needle")
+    plan = build_plan([], query="needle AND NOT missing")
+    assert searcher.search_file(str(path), ["needle"], plan=plan)[2] == 60
+
+
+def test_export_uses_recorded_offset_without_reading(tmp_path):
+    store = PathStore()
+    results = [SearchResult(store, store.add(str(tmp_path / "gone.txt")), 1.5, 42),
+               SearchResult(store, store.add(str(tmp_path / "doc.docx")), 2.0)]
+    export_path = tmp_path / "out.csv"
+    exporter = ResultExporter(str(export_path), ["hit_offset"])
+    for result in results:
+        exporter.write(result)
+    exporter.close()
+    rows = list(csv.reader(export_path.open(encoding="utf-8")))
+    assert rows[0] == ["path", "size_kb", "hit_offset"]
+    assert [row[2] for row in rows[1:]] == ["42", ""]
+
+
+def test_jsonl_export(tmp_path):
+    store = PathStore()
+    export_path = tmp_path / "out.jsonl"
+    exporter = ResultExporter(str(export_path))
+    exporter.write(SearchResult(store, store.add("/x/y.txt"), 3.0))
+    exporter.close()
+    assert json.loads(export_path.read_text(encoding="utf-8")) == {"path": "/x/y.txt", "size_kb": 3.0}
+
+
+def test_unknown_member_size_left_empty(tmp_path):
+    archive = tmp_path / "log.txt.bz2"
+    archive.write_bytes(b"compressed")
+    store = PathStore()
+    export_path = tmp_path / "out.csv"
+    exporter = ResultExporter(str(export_path), ["size"])
+    exporter.write(SearchResult(store, store.add(f"{archive}!/log.txt"), None))
+    exporter.close()
+    rows = list(csv.reader(export_path.open(encoding="utf-8")))
+    assert rows[1][1:] == ["", ""]
+
+
+@pytest.mark.parametrize("name", ["old.jsonl", "old.csv"])
+def test_existing_export_file_restarts_at_zero(tmp_path, name):
+    export_path = tmp_path / name
+    export_path.write_text("#" * 5000)
+    exporter = ResultExporter(str(export_path))
+    state = exporter.state()
+    assert state["offset"] == export_path.stat().st_size < 5000
+    store = PathStore()
+    exporter.write(SearchResult(store, store.add("/a.txt"), 1.0))
+    state = exporter.state()
+    exporter.close()
+    assert state["offset"] == export_path.stat().st_size
+    assert "#" not in export_path.read_text(encoding="utf-8")
+
+    # 检查点之后又写入了一条，继续时截掉它并从记录的位置接着写
+    with open(export_path, "a", encoding="utf-8") as f:
+        f.write("partial row\n")
+    resumed = ResultExporter(str(export_path))
+    assert resumed.resume(state)
+    assert resumed.state()["offset"] == state["offset"]
+    resumed.write(SearchResult(store, store.add("/b.txt"), 2.0))
+    resumed.close()
+    text = export_path.read_text(encoding="utf-8")
+    assert "partial" not in text and "/a.txt" in text and "/b.txt" in text
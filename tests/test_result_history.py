@@ -0,0 +1,97 @@
+"""result_history：保存的结果按当前 stat 分类，变化过的文件（含压缩包成员）按原条件重新验证"""
+import os
+import zipfile
+
+import pytest
+
+import result_history
+from file_searcher import FileSearcher
+from path_store import PathStore, SearchResult
+from result_history import ResultHistory, reverify
+from search_checkpoint import search_request
+
+
+def _request(folder, keywords, query=None):
+    return search_request(str(folder), keywords, None, [], False, True, False, 0, query, None)
+
+
+def _results(paths):
+    store = PathStore()
+    return [SearchResult(store, store.add(str(path)), 1.0) for path in paths]
+
+
+@pytest.fixture
+def searcher():
+    searcher = FileSearcher(max_workers=2)
+    yield searcher
+    searcher.shutdown()
+
+
+def test_load_classifies_by_current_stat(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for name in ("same.txt", "changed.txt", "removed.txt"):
+        (data / name).write_text("needle")
+    history = ResultHistory(str(tmp_path / "cache"))
+    request = _request(data, ["needle"])
+    history.save(request, "needle", "gen", _results(data / name for name in
+                                                    ("same.txt", "changed.txt", "removed.txt")))
+    (data / "changed.txt").write_text("needle, now longer")
+    (data / "removed.txt").unlink()
+
+    [entry] = history.entries()
+    assert entry["count"] == 3 and entry["label"] == "needle"
+    loaded_request, generation, unchanged, changed, removed = history.load(entry["key"])
+    assert loaded_request == request and generation == "gen"
+    assert unchanged == [(str(data / "same.txt"), 1.0)]
+    assert changed == [str(data / "changed.txt")]
+    assert removed == 1
+
+
+def test_same_request_replaces_entry_and_old_entries_trimmed(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_history, "MAX_HISTORY_ENTRIES", 2)
+    history = ResultHistory(str(tmp_path / "cache"))
+    history.save(_request(tmp_path, ["a"]), "a", None, [])
+    history.save(_request(tmp_path, ["a"]), "a again", None, [])
+    assert [entry["label"] for entry in history.entries()] == ["a again"]
+    first_key = history.entries()[0]["key"]
+    history.save(_request(tmp_path, ["b"]), "b", None, [])
+    history.save(_request(tmp_path, ["c"]), "c", None, [])
+    assert [entry["label"] for entry in history.entries()] == ["c", "b"]
+    assert history.load(first_key) is None
+    history.delete(history.entries()[0]["key"])
+    assert [entry["label"] for entry in history.entries()] == ["b"]
+
+
+def test_reverify_keeps_only_files_still_matching(tmp_path, searcher):
+    (tmp_path / "still.txt").write_text("xx needle")
+    (tmp_path / "gone.txt").write_text("no longer")
+    hits = reverify(searcher, _request(tmp_path, ["needle"]),
+                    [str(tmp_path / "still.txt"), str(tmp_path / "gone.txt")])
+    assert hits == [(str(tmp_path / "still.txt"), pytest.approx(9 / 1024), 3)]
+    assert not searcher.is_searching
+
+
+def test_reverify_archive_members(tmp_path, searcher):
+    archive = tmp_path / "a.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("hit.txt", "needle")
+        zf.writestr("new.txt", "needle")
+        zf.writestr("miss.txt", "other")
+    member = f"{archive}{result_history.ARCHIVE_SEPARATOR}"
+    hits = reverify(searcher, _request(tmp_path, ["needle"]), [member + "hit.txt", member + "miss.txt"])
+    # 只报告原来就在结果中的成员，新命中的成员需要重新搜索才会出现
+    assert [(path, offset) for path, _, offset in hits] == [(member + "hit.txt", None)]
+
+
+def test_archive_member_changes_follow_archive(tmp_path):
+    archive = tmp_path / "a.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("inner.txt", "needle")
+    history = ResultHistory(str(tmp_path / "cache"))
+    member = f"{archive}{result_history.ARCHIVE_SEPARATOR}inner.txt"
+    history.save(_request(tmp_path, ["needle"]), "needle", None, _results([member]))
+    key = history.entries()[0]["key"]
+    assert history.load(key)[2] == [(member, 1.0)]
+    os.utime(archive, (0, 0))
+    assert history.load(key)[3] == [member]
@@ -0,0 +1,136 @@
+"""search_checkpoint：检查点的位图、序列化，以及停止后继续搜索"""
+import csv
+
+from cache_manager import CacheManager
+from file_searcher import FileSearcher
+from result_exporter import ResultExporter
+from search_checkpoint import SearchCheckpoint, search_request
+
+
+def test_bitmap_marks_each_file_once():
+    checkpoint = SearchCheckpoint({}, 20)
+    for file_id in (0, 7, 8, 19, 7):
+        checkpoint.mark_done(file_id)
+    assert checkpoint.done_count == 4
+    assert [file_id for file_id in range(20) if checkpoint.is_done(file_id)] == [0, 7, 8, 19]
+    assert not checkpoint.is_done(1000)
+
+
+def test_round_trip_and_matching():
+    request = search_request("/data", ["a"], None, [], False, False, False, 0, None, None)
+    checkpoint = SearchCheckpoint(request, 10, "gen")
+    checkpoint.mark_done(3)
+    checkpoint.add_result("/data/x.txt", 1.5, 12)
+    checkpoint.export = {"path": "/tmp/out.csv", "offset": 10, "count": 1}
+    restored = SearchCheckpoint.from_dict(checkpoint.to_dict())
+    assert restored.is_done(3) and restored.done_count == 1
+    assert restored.results == [("/data/x.txt", 1.5, 12)]
+    assert restored.export == checkpoint.export
+    assert restored.matches(request, "gen")
+    assert not restored.matches(request, "other")
+    # 旧版检查点的结果没有命中偏移
+    old = dict(checkpoint.to_dict(), results=[["/data/y.txt", 2.0]])
+    assert SearchCheckpoint.from_dict(old).results == [("/data/y.txt", 2.0, None)]
+    assert SearchCheckpoint.from_dict(None) is None
+    assert SearchCheckpoint.from_dict({"request": {}}) is None
+
+
+def _search(folder, cache_manager, exporter, resume, stop_after=None):
+    searcher = FileSearcher(max_workers=2)
+
+    def stats(count):
+        if stop_after is not None and count >= stop_after:
+            searcher.stop_search()
+    try:
+        searcher.search_files_parallel(
+            str(folder), ["needle"], None, [], False, cache_manager,
+            lambda message, current=0, total=0: None, lambda result: None, stats,
+            exporter=exporter, export_only=True, resume=resume)
+    finally:
+        exporter.close()
+        searcher.shutdown()
+
+
+def test_resumed_export_only_search_keeps_earlier_rows(tmp_path):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    for i in range(80):
+        (folder / f"{i:02d}.txt").write_text("needle" if i % 2 == 0 else "other")
+    cache_manager = CacheManager(str(tmp_path / "cache"))
+    export_path = str(tmp_path / "out.csv")
+
+    _search(folder, cache_manager, ResultExporter(export_path), resume=False, stop_after=5)
+    checkpoint = SearchCheckpoint.from_dict(cache_manager.load_search_checkpoint())
+    assert checkpoint is not None and checkpoint.export is not None
+    assert checkpoint.done_count < 80
+
+    _search(folder, cache_manager, ResultExporter(export_path), resume=True)
+    with open(export_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["path", "size_kb"]
+    paths = [row[0] for row in rows[1:]]
+    assert len(paths) == len(set(paths)) == 40
+    assert cache_manager.load_search_checkpoint() is None
+
+
+def test_resume_with_missing_export_file_restarts(tmp_path):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    for i in range(40):
+        (folder / f"{i:02d}.txt").write_text("needle")
+    cache_manager = CacheManager(str(tmp_path / "cache"))
+
+    _search(folder, cache_manager, ResultExporter(str(tmp_path / "first.csv")), resume=False, stop_after=3)
+    second = str(tmp_path / "second.csv")
+    _search(folder, cache_manager, ResultExporter(second), resume=True)
+    with open(second, encoding="utf-8", newline="") as f:
+        assert len(list(csv.reader(f))) == 41
+
+
+def _interactive(folder, cache_manager, keywords, resume, stop_after=None):
+    """普通（非仅导出）搜索，返回 (结果路径列表, 进度消息列表)"""
+    searcher = FileSearcher(max_workers=2)
+    messages = []
+
+    def stats(count):
+        if stop_after is not None and count >= stop_after:
+            searcher.stop_search()
+    try:
+        results = searcher.search_files_parallel(
+            str(folder), keywords, None, [], False, cache_manager,
+            lambda message, current=0, total=0: messages.append(message), lambda result: None, stats,
+            resume=resume)
+    finally:
+        searcher.shutdown()
+    return [result.path for result in results], messages
+
+
+def test_resumed_search_reports_earlier_results_and_skips_done_files(tmp_path):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    for i in range(60):
+        (folder / f"{i:02d}.txt").write_text("needle")
+    cache_manager = CacheManager(str(tmp_path / "cache"))
+
+    first, _ = _interactive(folder, cache_manager, ["needle"], resume=False, stop_after=4)
+    checkpoint = SearchCheckpoint.from_dict(cache_manager.load_search_checkpoint())
+    assert checkpoint is not None and 0 < checkpoint.done_count < 60
+    assert sorted(path for path, _, _ in checkpoint.results) == sorted(first)
+
+    second, messages = _interactive(folder, cache_manager, ["needle"], resume=True)
+    assert sorted(second) == sorted(str(folder / f"{i:02d}.txt") for i in range(60))
+    assert any(message.startswith("继续上次搜索") for message in messages)
+
+
+def test_checkpoint_for_other_request_not_resumed(tmp_path):
+    folder = tmp_path / "data"
+    folder.mkdir()
+    for i in range(40):
+        (folder / f"{i:02d}.txt").write_text("needle other")
+    cache_manager = CacheManager(str(tmp_path / "cache"))
+    _interactive(folder, cache_manager, ["needle"], resume=False, stop_after=2)
+    assert cache_manager.load_search_checkpoint() is not None
+
+    results, messages = _interactive(folder, cache_manager, ["other"], resume=True)
+    assert len(results) == 40
+    assert any("重新开始搜索" in message for message in messages)
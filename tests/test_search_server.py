@@ -0,0 +1,82 @@
+"""search_server：多个客户端并发搜索，停止只影响自己的搜索"""
+import os
+import threading
+import time
+
+import pytest
+
+import search_server
+from file_searcher import FileSearcher
+from search_server import RemoteSearcher, SearchClient, SearchServer
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_server, "SERVER_INFO_FILE", str(tmp_path / "server.json"))
+    instance = SearchServer(cache_dir=str(tmp_path / "cache"),
+                            address=str(tmp_path / "server.sock"))
+    instance.searcher = FileSearcher(max_workers=4)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        client = SearchClient.connect_if_running()
+        if client is not None:
+            break
+        time.sleep(0.02)
+    yield instance, client
+    instance.stop()
+    thread.join(5)
+
+
+def _search(client, folder, results, done):
+    searcher = RemoteSearcher(client)
+
+    def run():
+        found = searcher.search_files_parallel(
+            str(folder), ["needle"], None, [], False, None,
+            lambda message, current=0, total=0: None, lambda result: None, lambda count: None)
+        results.extend(result.path for result in found)
+        done.set()
+    threading.Thread(target=run, daemon=True).start()
+    return searcher
+
+
+def test_concurrent_clients_and_per_search_stop(tmp_path, server, monkeypatch):
+    instance, client = server
+    slow = tmp_path / "slow"
+    fast = tmp_path / "fast"
+    slow.mkdir()
+    fast.mkdir()
+    for i in range(200):
+        (slow / f"{i}.txt").write_text("needle")
+    (fast / "hit.txt").write_text("needle")
+
+    original = FileSearcher.search_file
+
+    def slow_search_file(self, filepath, *args, **kwargs):
+        if os.sep + "slow" + os.sep in filepath:
+            time.sleep(0.5)
+        return original(self, filepath, *args, **kwargs)
+    monkeypatch.setattr(FileSearcher, "search_file", slow_search_file)
+
+    slow_results, slow_done = [], threading.Event()
+    slow_searcher = _search(client, slow, slow_results, slow_done)
+    time.sleep(0.3)
+
+    # 第二个客户端不需要排队等待第一个搜索
+    fast_results, fast_done = [], threading.Event()
+    _search(client, fast, fast_results, fast_done)
+    assert fast_done.wait(5)
+    assert fast_results == [str(fast / "hit.txt")]
+    assert not slow_done.is_set()
+
+    # 停止第一个客户端的搜索，它提前结束
+    slow_searcher.stop_search()
+    assert slow_done.wait(5)
+    assert len(slow_results) < 200
+
+
+def test_stop_without_running_search_is_noop(server):
+    instance, client = server
+    RemoteSearcher(client).stop_search()
+    assert client.request({"op": "ping"}) == ("pong",)
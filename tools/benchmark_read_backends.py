@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""对比各读取后端读取同一文件夹的速度
+
+用法: python tools/benchmark_read_backends.py <文件夹> [后端名 ...]
+"""
+
+import sys
+import os
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(base_dir, "..", "src"))
+
+from read_backends import available_backends, benchmark_backends  # noqa: E402
+
+if len(sys.argv) < 2:
+    print(__doc__)
+    sys.exit(1)
+
+folder = sys.argv[1]
+names = sys.argv[2:] or available_backends()
+
+files = []
+for root, dirs, filenames in os.walk(folder):
+    for name in filenames:
+        files.append(os.path.join(root, name))
+
+print(f"文件数: {len(files)}，后端: {', '.join(names)}")
+print("注意：先测的后端会预热页缓存，冷缓存对比请在每轮之间清理系统缓存")
+
+for name, (seconds, nbytes) in benchmark_backends(files, names).items():
+    mb = nbytes / (1024 * 1024)
+    print(f"  {name:<10} {seconds:8.3f}s  {mb:10.1f}MB  {mb / max(seconds, 1e-9):8.1f}MB/s")